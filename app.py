@@ -1,22 +1,468 @@
-from flask import Flask, render_template, request, jsonify
+from flask import (
+    Flask,
+    Response,
+    g,
+    render_template,
+    request,
+    jsonify,
+    stream_with_context,
+)
+from flask.json.provider import DefaultJSONProvider
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
 import numpy as np
+import base64
+import cProfile
+import io
 import json
 import math
+import os
+import pstats
+import threading
+import time
+import uuid
 
 # นำเข้าคลาส core จากโปรแกรมเดิม
-from simulation import BallPhysics, TargetArea, StrikerSettings, Simulation
+from simulation import (
+    BallPhysics,
+    TargetArea,
+    StrikerSettings,
+    PhysicsConfig,
+    ShotConfig,
+    NoiseModel,
+    StrategyTable,
+    simulate_shot,
+    monte_carlo_shot,
+    optimize_zone_shot,
+    optimize_shot,
+    iter_optimize_shot,
+    find_shot_options,
+    landing_sensitivity,
+    landing_sweep,
+    SWEEP_PARAMETERS,
+    shared_cache_stats,
+    StageTimings,
+    timed_stage,
+)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider ที่จับเวลาการแปลงเป็น JSON เป็น stage serialization"""
+
+    def dumps(self, obj, **kwargs):
+        with timed_stage("serialization"):
+            return super().dumps(obj, **kwargs)
+
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 
-# สร้าง simulation object สำหรับใช้งาน
+# สถานะที่ใช้ร่วมกันระหว่าง request เป็นแบบอ่านอย่างเดียว
+# ค่าของแต่ละ request (ShotConfig / PhysicsConfig) ถูกส่งเข้าฟังก์ชันโดยตรง จึงรันแบบหลาย thread ได้
 # ห่อด้วย try-except เพื่อดักจับ error ตอนสร้าง instance (เช่น AttributeError ที่เคยเจอ)
 try:
-    simulation = Simulation()
+    # สนามปัจจุบัน: /api/change_field จะสร้าง TargetArea ใหม่แล้วสลับ reference แทนการแก้ของเดิม
+    target_area = TargetArea()
+    striker_limits = StrikerSettings()  # ใช้อ่านขีดจำกัดของ striker เท่านั้น
 except Exception as e:
     print(f"CRITICAL ERROR during Simulation object instantiation: {e}")
     # ในกรณีนี้ โปรแกรมอาจจะไม่สามารถทำงานต่อได้เลย
     # อาจจะต้องมี fallback หรือแสดงข้อความให้ผู้ใช้ทราบอย่างชัดเจน
-    simulation = None  # ตั้งเป็น None เพื่อให้ตรวจสอบได้ใน route
+    target_area = None  # ตั้งเป็น None เพื่อให้ตรวจสอบได้ใน route
+    striker_limits = None
+
+# Process pool สำหรับแบ่งการคำนวณ grid ของ optimizer สร้างครั้งเดียวตอนเริ่มแอปแล้วใช้ซ้ำ
+# กำหนดจำนวน worker ได้ด้วย environment variable OPTIMIZER_WORKERS (1 = ไม่ใช้ pool)
+OPTIMIZER_WORKERS = int(os.environ.get("OPTIMIZER_WORKERS", os.cpu_count() or 1))
+optimizer_pool = None
+if target_area is not None and OPTIMIZER_WORKERS > 1:
+    optimizer_pool = ProcessPoolExecutor(max_workers=OPTIMIZER_WORKERS)
+
+
+
+class JobStore:
+    """เก็บสถานะของงานเบื้องหลัง (queued / running / done / failed) แบบ thread-safe
+
+    งานที่จบแล้วจะถูกลบทิ้งเมื่อเก่ากว่า ttl_seconds (ตรวจตอน create / get)
+    """
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _evict_expired(self):
+        now = time.time()
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None
+            and now - job["finished_at"] > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def create(self):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._evict_expired()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "progress": None,
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "finished_at": None,
+            }
+        return job_id
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if job["status"] in ("done", "failed") and job["finished_at"] is None:
+                job["finished_at"] = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            self._evict_expired()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+
+# งานที่ใช้เวลานาน (เช่นหาทางเลือกหลายแบบ) รันใน thread pool แยกจาก request แล้วให้ client poll สถานะ
+# JOB_WORKERS = จำนวนงานที่รันพร้อมกัน, JOB_TTL_SECONDS = อายุของงานที่จบแล้วก่อนถูกลบ
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_TTL_SECONDS = float(os.environ.get("JOB_TTL_SECONDS", 600))
+job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS)
+job_store = JobStore(JOB_TTL_SECONDS)
+
+# ตารางกลยุทธ์ที่คำนวณไว้ล่วงหน้า (สร้างด้วย precompute_strategies.py หรือ /api/jobs/strategy_table)
+strategy_table = StrategyTable.load()
+strategy_rebuild_lock = threading.Lock()
+
+
+def vector_from_request(value, name):
+    """เวกเตอร์ (x, y, z) จาก list ใน request"""
+    if not isinstance(value, (list, tuple)) or len(value) != 3:
+        raise ValueError(f"{name} ต้องเป็นเวกเตอร์ [x, y, z]")
+    return tuple(float(v) for v in value)
+
+
+def choice_from_request(value, name, choices):
+    """ค่าที่ต้องเป็นหนึ่งใน choices (เช่น integrator, landing_point)"""
+    if value not in choices:
+        raise ValueError(f"{name} ต้องเป็นหนึ่งใน {', '.join(choices)} (ได้รับ: {value})")
+    return value
+
+
+def physics_config_from_request(data):
+    """PhysicsConfig ของ request นี้ (ถ้าไม่ส่ง physics มาจะใช้ค่าเริ่มต้น)"""
+    if "physics" not in data:
+        return PhysicsConfig()
+    physics_data = data["physics"]
+    defaults = PhysicsConfig()
+    max_bounces = int(physics_data.get("max_bounces", defaults.max_bounces))
+    if max_bounces < 0:
+        raise ValueError(f"max_bounces ต้องไม่ติดลบ (ได้รับ: {max_bounces})")
+    return PhysicsConfig(
+        gravity=float(physics_data.get("gravity", 9.81)),
+        ball_mass=float(physics_data.get("ball_mass", 0.024)),
+        air_density=float(physics_data.get("air_density", 1.225)),
+        drag_coefficient=float(physics_data.get("drag_coefficient", 0.5)),
+        elasticity=float(physics_data.get("elasticity", 0.4)),
+        integrator=choice_from_request(
+            physics_data.get("integrator", defaults.integrator),
+            "integrator",
+            BallPhysics.INTEGRATORS,
+        ),  # "euler", "rk4" หรือ "rk45_adaptive"
+        wind=vector_from_request(physics_data.get("wind", defaults.wind), "wind"),  # m/s
+        spin=vector_from_request(physics_data.get("spin", defaults.spin), "spin"),  # rad/s
+        magnus_coefficient=float(
+            physics_data.get("magnus_coefficient", defaults.magnus_coefficient)
+        ),
+        max_bounces=max_bounces,  # 0 = หยุดที่จุดตกแรก
+        ground_friction=float(physics_data.get("ground_friction", defaults.ground_friction)),
+        rolling_resistance=float(
+            physics_data.get("rolling_resistance", defaults.rolling_resistance)
+        ),
+        landing_point=choice_from_request(
+            physics_data.get("landing_point", defaults.landing_point),
+            "landing_point",
+            BallPhysics.LANDING_POINTS,
+        ),  # "first_contact" หรือ "rest"
+    )
+
+
+def noise_model_from_request(data):
+    """NoiseModel ของ request นี้ (ถ้าไม่ส่ง noise มาจะใช้ค่าเริ่มต้น)"""
+    noise_data = data.get("noise", {})
+    defaults = NoiseModel()
+    return NoiseModel(
+        voltage_std=float(noise_data.get("voltage_std", defaults.voltage_std)),
+        elevation_std=float(noise_data.get("elevation_std", defaults.elevation_std)),
+        azimuth_std=float(noise_data.get("azimuth_std", defaults.azimuth_std)),
+        timing_std=float(noise_data.get("timing_std", defaults.timing_std)),
+    )
+
+
+def parse_optimize_request(data):
+    """แปลง body ของ optimize เป็น (target_x, target_z, kwargs ร่วมของ optimizer: shot, physics, fixed_params)"""
+    target_x = float(data.get("target_x", 0.0))
+    target_z = float(data.get("target_z", 1.7))
+    release_height = float(data.get("release_height", 2.0))
+    strike_height = float(data.get("strike_height", 0.35))
+    current_elevation_angle = float(data.get("current_elevation_angle", 45.0))
+    current_azimuth_angle = float(data.get("current_azimuth_angle", 0.0))
+    current_velocity = float(data.get("current_velocity", 5.25))
+
+    fixed_params_input = data.get("fixed_params", {})
+    fixed_params = {}
+    if fixed_params_input.get("elevation_angle"):
+        fixed_params["elevation_angle"] = current_elevation_angle
+    if fixed_params_input.get("azimuth_angle"):
+        fixed_params["azimuth_angle"] = current_azimuth_angle
+    if fixed_params_input.get("velocity"):
+        fixed_params["velocity"] = current_velocity
+
+    shot = ShotConfig(
+        release_height=release_height,
+        strike_height=strike_height,
+        strike_angle_elevation=current_elevation_angle,
+        strike_azimuth_angle=current_azimuth_angle,
+        strike_velocity=current_velocity,
+    )
+    return (
+        target_x,
+        target_z,
+        {
+            "shot": shot,
+            "physics": physics_config_from_request(data),
+            "fixed_params": fixed_params,
+        },
+    )
+
+
+def dumps_with_raw_json(payload, key, raw_json):
+    """app.json.dumps({**payload, key: value}) where value is already-serialized JSON.
+
+    key is first set to a unique placeholder string; its serialized form
+    occurs exactly once in the output and is replaced by raw_json, so the
+    result does not depend on how the provider formats the rest.
+    """
+    placeholder = f"raw-json-{uuid.uuid4().hex}"
+    body = app.json.dumps({**payload, key: placeholder})
+    return body.replace(json.dumps(placeholder), raw_json, 1)
+
+
+def jsonify_with_zones(payload, key, field, client_etag=None, mimetype=None):
+    """jsonify(payload) plus payload[key] = the zone list of field.
+
+    The zones come from FieldSummary.zones_json, which is serialized once
+    per field configuration instead of on every response. payload also
+    gets "zones_etag" (a body field, not the HTTP ETag); the zones are left
+    out when client_etag already matches it.
+    """
+    summary = field.get_field_summary()
+    payload = {**payload, "zones_etag": summary.zones_etag}
+    if client_etag != summary.zones_etag:
+        body = dumps_with_raw_json(payload, key, summary.zones_json)
+    else:
+        body = app.json.dumps(payload)
+    return app.response_class(body + "\n", mimetype=mimetype or app.json.mimetype)
+
+
+# รูปแบบ trajectory ใน /api/calculate: "json" = list ของ float, "float32" = base64 ของ float32 little-endian
+TRAJECTORY_FORMATS = ("json", "float32")
+TRAJECTORY_FLOAT32_MIMETYPE = "application/vnd.squash-sim.float32+json"
+TRAJECTORY_KEYS = ("trajectory_x", "trajectory_y", "trajectory_z")
+
+
+def trajectory_format_from_request(data):
+    """รูปแบบ trajectory จาก body["trajectory_format"] หรือจาก Accept header"""
+    trajectory_format = data.get("trajectory_format")
+    if trajectory_format is None:
+        best = request.accept_mimetypes.best_match(
+            [app.json.mimetype, TRAJECTORY_FLOAT32_MIMETYPE]
+        )
+        trajectory_format = "float32" if best == TRAJECTORY_FLOAT32_MIMETYPE else "json"
+    return trajectory_format
+
+
+def decimation_indices(ys, max_points):
+    """ดัชนีของจุดที่เก็บไว้เมื่อลดจำนวนจุดเหลือประมาณ max_points (None = เก็บทุกจุด)
+
+    เก็บจุดแรก จุดสุดท้าย และจุดที่แตะพื้น (จุดตกและจุดเด้ง) ไว้เสมอ
+    """
+    if max_points is None or len(ys) <= max_points:
+        return None
+    keep = np.round(np.linspace(0, len(ys) - 1, max_points)).astype(int)
+    return np.union1d(keep, np.flatnonzero(np.asarray(ys) == 0.0))
+
+
+def encode_trajectory(values, indices, trajectory_format):
+    """แปลงพิกัดหนึ่งแกนของ trajectory (array จาก Trajectory) ตามรูปแบบที่ขอ"""
+    with timed_stage("serialization"):
+        array = np.asarray(values, dtype=float)
+        if indices is not None:
+            array = array[indices]
+        if trajectory_format == "float32":
+            return base64.b64encode(array.astype("<f4").tobytes()).decode("ascii")
+        return array.tolist()
+
+
+class RequestMetrics:
+    """เก็บเวลาของ request ล่าสุดแยกตาม endpoint (ไม่เกิน max_samples ต่อ endpoint) แบบ thread-safe
+
+    แต่ละตัวอย่างคือเวลารวมกับ StageTimings.as_dict() ของ request นั้น
+    summary() คืน percentile ของเวลา (ms) และจำนวนการ integrate ทั้งรวมและแยกตาม stage
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, max_samples):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, timings):
+        sample = (timings.total_seconds, timings.as_dict())
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.max_samples)
+            samples.append(sample)
+            self._counts[endpoint] = self._counts.get(endpoint, 0) + 1
+
+    @classmethod
+    def _percentiles(cls, values):
+        result = np.percentile(np.asarray(values, dtype=float), cls.PERCENTILES)
+        return {
+            **{f"p{p}": float(v) for p, v in zip(cls.PERCENTILES, result)},
+            "max": float(np.max(values)),
+        }
+
+    def summary(self):
+        with self._lock:
+            snapshot = {
+                endpoint: (self._counts[endpoint], list(samples))
+                for endpoint, samples in self._samples.items()
+            }
+        summary = {}
+        for endpoint, (count, samples) in snapshot.items():
+            by_stage = {}
+            for _, stages in samples:
+                for name, stage in stages.items():
+                    by_stage.setdefault(name, []).append(stage)
+            summary[endpoint] = {
+                "requests": count,
+                "samples": len(samples),
+                "total_ms": self._percentiles([total * 1000 for total, _ in samples]),
+                "integrations": self._percentiles(
+                    [
+                        sum(stage["integrations"] for stage in stages.values())
+                        for _, stages in samples
+                    ]
+                ),
+                "stages": {
+                    name: {
+                        "requests": len(stages),
+                        "ms": self._percentiles([s["seconds"] * 1000 for s in stages]),
+                        "integrations": self._percentiles(
+                            [s["integrations"] for s in stages]
+                        ),
+                    }
+                    for name, stages in by_stage.items()
+                },
+            }
+        return summary
+
+
+class ProfileStore:
+    """เก็บผล cProfile ของ request ล่าสุดไม่เกิน max_profiles รายการ แบบ thread-safe"""
+
+    def __init__(self, max_profiles):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, profiler, endpoint):
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._profiles[profile_id] = (endpoint, profiler)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+# เวลาของทุก /api/ route: header Server-Timing ต่อ request และสรุป percentile ที่ /api/metrics
+# ส่ง ?profile=1 เพื่อรัน cProfile เฉพาะ request นั้น ผลดูได้ที่ /api/metrics/profiles/<X-Profile-Id>
+# METRICS_MAX_SAMPLES = จำนวน request ล่าสุดที่เก็บต่อ endpoint
+# ?profile=1 ปิดไว้โดยค่าเริ่มต้น (ผล profile เผยโครงสร้างภายในของเซิร์ฟเวอร์) เปิดด้วย PROFILING_ENABLED=1
+METRICS_MAX_SAMPLES = int(os.environ.get("METRICS_MAX_SAMPLES", 1000))
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+request_metrics = RequestMetrics(METRICS_MAX_SAMPLES)
+profile_store = ProfileStore(int(os.environ.get("PROFILE_MAX_STORED", 20)))
+
+
+def server_timing_header(timings):
+    """ค่า Server-Timing: หนึ่งรายการต่อ stage (ms, จำนวนครั้ง และจำนวนการ integrate) และ total"""
+    entries = [
+        f'{name};dur={stage["seconds"] * 1000:.3f};'
+        f'desc="{stage["calls"]} calls, {stage["integrations"]} integrations"'
+        for name, stage in timings.stages.items()
+    ]
+    entries.append(f"total;dur={timings.total_seconds * 1000:.3f}")
+    return ", ".join(entries)
+
+
+@app.before_request
+def start_request_timing():
+    if not request.path.startswith("/api/"):
+        return
+    g.stage_timings = StageTimings().start()
+    if PROFILING_ENABLED and request.args.get("profile") in ("1", "true"):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def finish_request_timing():
+    """ปิด profiler และ StageTimings ของ request นี้ (ถ้ามี) แล้วคืน (timings, profiler)"""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+    timings = g.pop("stage_timings", None)
+    if timings is not None:
+        timings.stop()
+    return timings, profiler
+
+
+@app.after_request
+def add_server_timing(response):
+    # response แบบ stream จะคำนวณหลังจากนี้ จึงมีแค่เวลาก่อนเริ่มส่ง
+    timings, profiler = finish_request_timing()
+    if timings is None:
+        return response
+    if profiler is not None:
+        response.headers["X-Profile-Id"] = profile_store.put(profiler, request.endpoint)
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    request_metrics.record(request.endpoint or request.path, timings)
+    return response
+
+
+@app.teardown_request
+def clear_request_timing(exc):
+    # กรณี error ที่ไม่ถูกจับ after_request จะไม่ถูกเรียก
+    finish_request_timing()
 
 
 @app.route("/")
@@ -26,7 +472,7 @@ def index():
 
 @app.route("/api/calculate", methods=["POST"])
 def calculate():
-    if simulation is None:
+    if target_area is None:
         return (
             jsonify(
                 {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
@@ -42,6 +488,22 @@ def calculate():
         strike_velocity = float(data.get("strike_velocity", 5.25))
         strike_height = float(data.get("strike_height", 0.35))
         show_ideal = data.get("show_ideal", False)
+        trajectory_format = trajectory_format_from_request(data)
+        if trajectory_format not in TRAJECTORY_FORMATS:
+            return (
+                jsonify(
+                    {"error": f"trajectory_format ต้องเป็นหนึ่งใน {', '.join(TRAJECTORY_FORMATS)} (ได้รับ: {trajectory_format})"}
+                ),
+                400,
+            )
+        max_points = data.get("max_points")
+        if max_points is not None:
+            max_points = int(max_points)
+            if max_points < 2:
+                return (
+                    jsonify({"error": f"max_points ต้องไม่น้อยกว่า 2 (ได้รับ: {max_points})"}),
+                    400,
+                )
 
         # ตรวจสอบขีดจำกัดแรงดัน (ไม่เกิน 15V)
         if "strike_voltage" in data:
@@ -85,64 +547,77 @@ def calculate():
                 400,
             )
 
-        simulation.striker_settings.release_height = release_height
-        simulation.striker_settings.strike_angle_elevation = strike_angle_elevation
-        simulation.striker_settings.strike_azimuth_angle = strike_azimuth_angle
-        simulation.striker_settings.strike_velocity = strike_velocity
-        simulation.striker_settings.strike_height = strike_height
-        simulation.toggle_ideal_comparison(show_ideal)
-
-        if "physics" in data:
-            physics_data = data["physics"]
-            simulation.ball_physics.gravity = float(physics_data.get("gravity", 9.81))
-            simulation.ball_physics.ball_mass = float(
-                physics_data.get("ball_mass", 0.024)
-            )
-            simulation.air_density = float(physics_data.get("air_density", 1.225))
-            simulation.drag_coefficient = float(
-                physics_data.get("drag_coefficient", 0.5)
-            )
-            simulation.ball_physics.elasticity = float(
-                physics_data.get("elasticity", 0.4)
-            )
+        shot = ShotConfig(
+            release_height=release_height,
+            strike_height=strike_height,
+            strike_angle_elevation=strike_angle_elevation,
+            strike_azimuth_angle=strike_azimuth_angle,
+            strike_velocity=strike_velocity,
+        )
+        physics = physics_config_from_request(data)
+        field = target_area  # อ่าน reference ครั้งเดียว เผื่อมีการเปลี่ยนสนามระหว่าง request
 
-        success, message_or_result = simulation.start_simulation()
+        success, message_or_result = simulate_shot(shot, physics, field, show_ideal)
 
         if success:
-            # message_or_result คือ message string ที่ได้จาก start_simulation
+            # message_or_result คือ dict ผลลัพธ์ที่ได้จาก simulate_shot
+            shot_result = message_or_result
+            target_zone = shot_result["target_zone"]
+            indices = decimation_indices(shot_result["trajectory_y"], max_points)
             result = {
-                "landing_position_x": simulation.landing_position[0],
-                "landing_position_z": simulation.landing_position[1],
-                "landing_distance_radial": simulation.landing_distance_radial,
-                "trajectory_x": simulation.trajectory_x,
-                "trajectory_y": simulation.trajectory_y,
-                "trajectory_z": simulation.trajectory_z,
+                "landing_position_x": shot_result["landing_position"][0],
+                "landing_position_z": shot_result["landing_position"][1],
+                "landing_distance_radial": shot_result["landing_distance_radial"],
+                "trajectory_format": trajectory_format,
+                **{
+                    key: encode_trajectory(shot_result[key], indices, trajectory_format)
+                    for key in TRAJECTORY_KEYS
+                },
                 "target_zone": (
-                    simulation.target_zone + 1
-                    if simulation.target_zone >= 0
-                    and simulation.target_zone < len(simulation.target_area.zones)
+                    target_zone + 1
+                    if target_zone >= 0 and target_zone < len(field.zones)
                     else None
                 ),
-                "message": message_or_result,  # message จาก start_simulation
-                "strike_time": simulation.strike_time,
-                "target_zones_data": simulation.target_area.get_field_dimensions()[
-                    "raw_zones_data"
-                ],
+                "message": shot_result["message"],  # message จาก start_simulation
+                "strike_time": shot_result["strike_time"],
+                # จุดตกแรกและจุดที่ลูกหยุด (เท่ากันเมื่อ max_bounces = 0)
+                "first_contact_x": shot_result["first_contact_position"][0],
+                "first_contact_z": shot_result["first_contact_position"][1],
+                "rest_position_x": shot_result["rest_position"][0],
+                "rest_position_z": shot_result["rest_position"][1],
+                "bounce_count": shot_result["bounce_count"],
             }
-            if show_ideal and simulation.ideal_trajectory_x:
-                result["ideal_trajectory_x"] = simulation.ideal_trajectory_x
-                result["ideal_trajectory_y"] = simulation.ideal_trajectory_y
-                result["ideal_trajectory_z"] = simulation.ideal_trajectory_z
-                result["ideal_landing_position_x"] = simulation.ideal_landing_position[
-                    0
-                ]
-                result["ideal_landing_position_z"] = simulation.ideal_landing_position[
-                    1
-                ]
-            return jsonify(result)
+            if show_ideal and len(shot_result["ideal_trajectory_x"]):
+                ideal_indices = decimation_indices(
+                    shot_result["ideal_trajectory_y"], max_points
+                )
+                for key in TRAJECTORY_KEYS:
+                    result[f"ideal_{key}"] = encode_trajectory(
+                        shot_result[f"ideal_{key}"], ideal_indices, trajectory_format
+                    )
+                result["ideal_landing_position_x"] = shot_result[
+                    "ideal_landing_position"
+                ][0]
+                result["ideal_landing_position_z"] = shot_result[
+                    "ideal_landing_position"
+                ][1]
+            return jsonify_with_zones(
+                result,
+                "target_zones_data",
+                field,
+                client_etag=data.get("zones_etag"),
+                mimetype=(
+                    TRAJECTORY_FLOAT32_MIMETYPE
+                    if trajectory_format == "float32" and "trajectory_format" not in data
+                    else None
+                ),
+            )
         else:
             # message_or_result คือ error message string
             return jsonify({"error": message_or_result}), 400
+    except (ValueError, TypeError) as e:
+        # ข้อมูลจาก client ไม่ถูกต้อง (เช่น เวกเตอร์ผิดรูปหรือ integrator ที่ไม่รู้จัก)
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Error in /api/calculate: {e}", exc_info=True)
         return (
@@ -151,9 +626,29 @@ def calculate():
         )
 
 
+# ช่วงที่แนะนำของแต่ละพารามิเตอร์ = ค่าที่ทำให้จุดตกเลื่อนไม่เกินระยะนี้ (ประมาณเชิงเส้นจาก Jacobian)
+TOLERANCE_LANDING_SHIFT = 0.05  # m
+
+
+def tolerance_half_widths(jacobian, values):
+    """Half-widths for (velocity, elevation, azimuth) from the landing Jacobian.
+
+    Each half-width moves the landing point by TOLERANCE_LANDING_SHIFT on its
+    own; parameters the landing barely depends on fall back to 5% of values.
+    """
+    half_widths = []
+    for column, value in enumerate(values):
+        norm = math.hypot(jacobian[0][column], jacobian[1][column])
+        if norm > 1e-9:
+            half_widths.append(TOLERANCE_LANDING_SHIFT / norm)
+        else:
+            half_widths.append(abs(value * 0.05))
+    return half_widths
+
+
 @app.route("/api/optimize", methods=["POST"])
 def optimize():
-    if simulation is None:
+    if target_area is None:
         return (
             jsonify(
                 {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
@@ -162,55 +657,17 @@ def optimize():
         )
     try:
         data = request.json
-        target_x = float(data.get("target_x", 0.0))
-        target_z = float(data.get("target_z", 1.7))
-        release_height = float(data.get("release_height", 2.0))
-        strike_height = float(data.get("strike_height", 0.35))
-        current_elevation_angle = float(data.get("current_elevation_angle", 45.0))
-        current_azimuth_angle = float(data.get("current_azimuth_angle", 0.0))
-        current_velocity = float(data.get("current_velocity", 5.25))
-
-        fixed_params_input = data.get("fixed_params", {})  # Default to empty dict
-        fixed_params = {}
-        if fixed_params_input.get("elevation_angle"):
-            fixed_params["elevation_angle"] = current_elevation_angle
-        if fixed_params_input.get("azimuth_angle"):
-            fixed_params["azimuth_angle"] = current_azimuth_angle
-        if fixed_params_input.get("velocity"):
-            fixed_params["velocity"] = current_velocity
-
-        simulation.striker_settings.release_height = release_height
-        simulation.striker_settings.strike_height = strike_height
-        simulation.striker_settings.strike_angle_elevation = current_elevation_angle
-        simulation.striker_settings.strike_azimuth_angle = current_azimuth_angle
-        simulation.striker_settings.strike_velocity = current_velocity
-
-        if "physics" in data:
-            physics_data = data["physics"]
-            simulation.ball_physics.gravity = float(physics_data.get("gravity", 9.81))
-            simulation.ball_physics.ball_mass = float(
-                physics_data.get("ball_mass", 0.024)
-            )
-            simulation.air_density = float(physics_data.get("air_density", 1.225))
-            simulation.drag_coefficient = float(
-                physics_data.get("drag_coefficient", 0.5)
-            )
-            simulation.ball_physics.elasticity = float(
-                physics_data.get("elasticity", 0.4)
-            )
-
-        if not hasattr(simulation, "calculate_optimal_parameters"):
-            return (
-                jsonify(
-                    {
-                        "error": "ไม่พบฟังก์ชันการปรับให้เหมาะสม (calculate_optimal_parameters) ในแกนกลางของระบบจำลอง"
-                    }
-                ),
-                501,
-            )
+        target_x, target_z, options = parse_optimize_request(data)
+        fixed_params = options["fixed_params"]
+        solver = data.get("solver", "table")  # "table" (ค่าเริ่มต้น), "analytic" หรือ "grid"
 
-        success, opt_result_data = simulation.calculate_optimal_parameters(
-            target_x, target_z, fixed_params=fixed_params
+        success, opt_result_data = optimize_shot(
+            target_x,
+            target_z,
+            solver=solver,
+            grid_executor=optimizer_pool,
+            grid_workers=OPTIMIZER_WORKERS,
+            **options,
         )
 
         if success:
@@ -230,11 +687,19 @@ def optimize():
                     400,
                 )
 
-            el_angle_tolerance = el_angle * 0.05
-            az_angle_tolerance = abs(
-                az_angle * 0.05
-            )  # abs for cases where angle is negative
-            vel_tolerance = vel * 0.05
+            # ความกว้างของช่วงมาจากความไวของจุดตกต่อแต่ละพารามิเตอร์ ณ คำตอบ
+            _, _, landing_jacobian = landing_sensitivity(
+                replace(
+                    options["shot"],
+                    strike_velocity=vel,
+                    strike_angle_elevation=el_angle,
+                    strike_azimuth_angle=az_angle,
+                ),
+                options["physics"],
+            )
+            vel_tolerance, el_angle_tolerance, az_angle_tolerance = (
+                tolerance_half_widths(landing_jacobian, (vel, el_angle, az_angle))
+            )
 
             error_distance = opt_result_data["error"]
             target_radial_dist = math.sqrt(target_x**2 + target_z**2)
@@ -292,12 +757,20 @@ def optimize():
                     "target_z": target_z,
                     "error_distance": error_distance,
                     "error_percent": error_percent,
+                    "landing_jacobian": landing_jacobian,
+                    "solver": opt_result_data.get("solver"),
+                    # มีเฉพาะเมื่อ solver=grid ต้องปรับละเอียดด้วย Levenberg-Marquardt
+                    "refine_iterations": opt_result_data.get("refine_iterations"),
+                    "refine_evaluations": opt_result_data.get("refine_evaluations"),
                     "message": "พบค่าพารามิเตอร์ที่เหมาะสมที่สุดแล้ว",
                 }
             )
         else:
             # opt_result_data is an error message string
             return jsonify({"error": opt_result_data}), 400
+    except (ValueError, TypeError) as e:
+        # ข้อมูลจาก client ไม่ถูกต้อง (เช่น เวกเตอร์ผิดรูปหรือ integrator ที่ไม่รู้จัก)
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Error in /api/optimize: {e}", exc_info=True)
         return (
@@ -306,9 +779,126 @@ def optimize():
         )
 
 
-@app.route("/api/optimize_multiple", methods=["POST"])
-def optimize_multiple():
-    if simulation is None:
+def format_shot_options(success, solutions_data, target_x, target_z):
+    """จัดรูปผลของ find_shot_options เป็น (payload, status_code) สำหรับตอบกลับ"""
+    if not success:
+        return {"error": solutions_data}, 400
+
+    # กรองเฉพาะทางเลือกที่แรงดันไม่เกิน 15V
+    valid_solutions = []
+    for solution in solutions_data:
+        required_voltage = solution["required_voltage"]
+        if required_voltage <= 15.0:
+            valid_solutions.append(solution)
+
+    if not valid_solutions:
+        return {"error": "ไม่พบทางเลือกใดที่อยู่ภายในขีดจำกัดแรงดัน 15V"}, 400
+
+    formatted_solutions = []
+    for i, solution in enumerate(valid_solutions):
+        el_angle = solution["elevation_angle"]
+        az_angle = solution["azimuth_angle"]
+        vel = solution["velocity"]
+        required_voltage = solution["required_voltage"]
+        error_distance = solution["error"]
+
+        target_radial_dist = math.sqrt(target_x**2 + target_z**2)
+        error_percent = (
+            (error_distance / target_radial_dist) * 100
+            if target_radial_dist > 1e-6
+            else 0
+        )
+
+        formatted_solutions.append(
+            {
+                "option_number": i + 1,
+                "strike_angle_elevation": el_angle,
+                "strike_azimuth_angle": az_angle,
+                "strike_velocity": vel,
+                "required_voltage": required_voltage,
+                "actual_landing_x": solution["landing_x"],
+                "actual_landing_z": solution["landing_z"],
+                "error_distance": error_distance,
+                "error_percent": error_percent,
+                "description": f"ตัวเลือก {i+1}: {required_voltage:.1f}V, {el_angle:.1f}°, ความเร็ว {vel:.1f}m/s",
+            }
+        )
+
+    return (
+        {
+            "solutions": formatted_solutions,
+            "target_x": target_x,
+            "target_z": target_z,
+            "total_options": len(formatted_solutions),
+            "message": f"พบทางเลือก {len(formatted_solutions)} แบบสำหรับการตีไปยังเป้าหมาย",
+        },
+        200,
+    )
+
+
+def optimize_request_from_query(args):
+    """แปลง query string ของ /api/optimize/stream เป็น dict รูปแบบเดียวกับ body ของ /api/optimize
+
+    EventSource ส่งได้แค่ GET จึงรับ fix_<ชื่อ>=1 แทน fixed_params และค่าฟิสิกส์เป็น query แยกตัว
+    เวกเตอร์ (wind, spin) ส่งเป็นค่าคั่นด้วยจุลภาค เช่น wind=1,0,2 (รูปแบบเดียวกับ URLSearchParams ของ array)
+    """
+    data = {
+        key: args[key]
+        for key in (
+            "target_x",
+            "target_z",
+            "release_height",
+            "strike_height",
+            "current_elevation_angle",
+            "current_azimuth_angle",
+            "current_velocity",
+        )
+        if key in args
+    }
+    data["fixed_params"] = {
+        name: args.get(f"fix_{name}", "").lower() in ("1", "true", "yes")
+        for name in ("elevation_angle", "azimuth_angle", "velocity")
+    }
+    # ต้องครบทุกฟิลด์ที่ physics_config_from_request อ่าน ไม่อย่างนั้น stream จะตอบด้วยฟิสิกส์คนละแบบกับ /api/optimize
+    physics_keys = (
+        "gravity",
+        "ball_mass",
+        "air_density",
+        "drag_coefficient",
+        "elasticity",
+        "integrator",
+        "wind",
+        "spin",
+        "magnus_coefficient",
+        "max_bounces",
+        "ground_friction",
+        "rolling_resistance",
+        "landing_point",
+    )
+    vector_keys = ("wind", "spin")
+    if any(key in args for key in physics_keys):
+        data["physics"] = {
+            key: args[key].split(",") if key in vector_keys else args[key]
+            for key in physics_keys
+            if key in args
+        }
+    return data
+
+
+def sse_event(event, payload):
+    """จัดรูปหนึ่ง event ของ Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route("/api/optimize/stream", methods=["GET"])
+def optimize_stream():
+    """ส่งผลที่ดีที่สุดระหว่างค้นหาแบบ live ผ่าน Server-Sent Events
+
+    event coarse / refine มีจุดที่ดีที่สุดจนถึงตอนนี้ (best) และความคืบหน้าของรอบนั้น
+    event final เป็นผลสุดท้าย (มุมเงยถูกปัดแล้ว) หรือ error
+    ค่าเริ่มต้นใช้ solver=grid เพราะ table / analytic ตอบทันทีและมีแค่ event final
+    """
+    if target_area is None:
         return (
             jsonify(
                 {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
@@ -316,111 +906,127 @@ def optimize_multiple():
             500,
         )
     try:
-        data = request.json
-        target_x = float(data.get("target_x", 0.0))
-        target_z = float(data.get("target_z", 1.7))
-        release_height = float(data.get("release_height", 2.0))
-        strike_height = float(data.get("strike_height", 0.35))
-        current_elevation_angle = float(data.get("current_elevation_angle", 45.0))
-        current_azimuth_angle = float(data.get("current_azimuth_angle", 0.0))
-        current_velocity = float(data.get("current_velocity", 5.25))
-        max_solutions = int(data.get("max_solutions", 5))
-
-        fixed_params_input = data.get("fixed_params", {})
-        fixed_params = {}
-        if fixed_params_input.get("elevation_angle"):
-            fixed_params["elevation_angle"] = current_elevation_angle
-        if fixed_params_input.get("azimuth_angle"):
-            fixed_params["azimuth_angle"] = current_azimuth_angle
-        if fixed_params_input.get("velocity"):
-            fixed_params["velocity"] = current_velocity
-
-        simulation.striker_settings.release_height = release_height
-        simulation.striker_settings.strike_height = strike_height
-        simulation.striker_settings.strike_angle_elevation = current_elevation_angle
-        simulation.striker_settings.strike_azimuth_angle = current_azimuth_angle
-        simulation.striker_settings.strike_velocity = current_velocity
-
-        if "physics" in data:
-            physics_data = data["physics"]
-            simulation.ball_physics.gravity = float(physics_data.get("gravity", 9.81))
-            simulation.ball_physics.ball_mass = float(
-                physics_data.get("ball_mass", 0.024)
-            )
-            simulation.air_density = float(physics_data.get("air_density", 1.225))
-            simulation.drag_coefficient = float(
-                physics_data.get("drag_coefficient", 0.5)
-            )
-            simulation.ball_physics.elasticity = float(
-                physics_data.get("elasticity", 0.4)
-            )
+        target_x, target_z, options = parse_optimize_request(
+            optimize_request_from_query(request.args)
+        )
+    except Exception as e:
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
+    solver = request.args.get("solver", "grid")
 
-        if not hasattr(simulation, "find_multiple_optimal_solutions"):
-            return (
-                jsonify(
+    def generate():
+        try:
+            for event in iter_optimize_shot(
+                target_x,
+                target_z,
+                solver=solver,
+                grid_executor=optimizer_pool,
+                grid_workers=OPTIMIZER_WORKERS,
+                **options,
+            ):
+                if event["stage"] != "final":
+                    yield sse_event(event["stage"], event)
+                    continue
+
+                result = event["result"]
+                if not event["success"]:
+                    yield sse_event("final", {"stage": "final", "error": result})
+                    continue
+                required_voltage = result.get("required_voltage")
+                # ตรวจสอบว่าแรงดันที่ต้องการไม่เกิน 15V (เหมือน /api/optimize)
+                if required_voltage and required_voltage > 15.0:
+                    yield sse_event(
+                        "final",
+                        {
+                            "stage": "final",
+                            "error": f"ไม่สามารถหาค่าที่เหมาะสมได้ภายในขีดจำกัดแรงดัน 15V (ต้องการ: {required_voltage:.2f}V)",
+                        },
+                    )
+                    continue
+                yield sse_event(
+                    "final",
                     {
-                        "error": "ไม่พบฟังก์ชันการค้นหาทางเลือกหลายแบบ (find_multiple_optimal_solutions) ในแกนกลางของระบบจำลอง"
-                    }
-                ),
-                501,
+                        "stage": "final",
+                        "strike_angle_elevation": float(result["elevation_angle"]),
+                        "strike_azimuth_angle": float(result["azimuth_angle"]),
+                        "strike_velocity": float(result["velocity"]),
+                        "required_voltage": float(required_voltage),
+                        "actual_landing_x": float(result["landing_x"]),
+                        "actual_landing_z": float(result["landing_z"]),
+                        "error_distance": float(result["error"]),
+                        "solver": result.get("solver", solver),
+                    },
+                )
+        except Exception as e:
+            app.logger.error(f"Error in /api/optimize/stream: {e}", exc_info=True)
+            yield sse_event(
+                "final",
+                {"stage": "final", "error": f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API การปรับให้เหมาะสม: {str(e)}"},
             )
 
-        success, solutions_data = simulation.find_multiple_optimal_solutions(
-            target_x, target_z, fixed_params=fixed_params, max_solutions=max_solutions
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/optimize_multiple", methods=["POST"])
+def optimize_multiple():
+    if target_area is None:
+        return (
+            jsonify(
+                {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
+            ),
+            500,
         )
+    try:
+        data = request.json
+        target_x, target_z, options = parse_optimize_request(data)
+        options["max_solutions"] = int(data.get("max_solutions", 5))
 
-        if success:
-            # กรองเฉพาะทางเลือกที่แรงดันไม่เกิน 15V
-            valid_solutions = []
-            for solution in solutions_data:
-                required_voltage = solution["required_voltage"]
-                if required_voltage <= 15.0:
-                    valid_solutions.append(solution)
-
-            if not valid_solutions:
-                return jsonify({"error": "ไม่พบทางเลือกใดที่อยู่ภายในขีดจำกัดแรงดัน 15V"}), 400
-
-            formatted_solutions = []
-            for i, solution in enumerate(valid_solutions):
-                el_angle = solution["elevation_angle"]
-                az_angle = solution["azimuth_angle"]
-                vel = solution["velocity"]
-                required_voltage = solution["required_voltage"]
-                error_distance = solution["error"]
-
-                target_radial_dist = math.sqrt(target_x**2 + target_z**2)
-                error_percent = (
-                    (error_distance / target_radial_dist) * 100
-                    if target_radial_dist > 1e-6
-                    else 0
+        # zone_id: เล็งที่ target_point ของโซน และตอบจากตารางกลยุทธ์ถ้ามีผลของ input ชุดนี้อยู่แล้ว
+        zone_id = data.get("zone_id")
+        if zone_id is not None:
+            field = target_area  # อ่าน reference ครั้งเดียว เผื่อมีการเปลี่ยนสนามระหว่าง request
+            zone = next((zone for zone in field.zones if zone.id == zone_id), None)
+            if zone is None:
+                return jsonify({"error": f"ไม่พบโซน {zone_id} ในสนาม {field.field_type}"}), 400
+            target_x, target_z = zone.target_x, zone.target_z
+            entry = None
+            if not options["fixed_params"]:
+                entry = strategy_table.lookup(
+                    field.field_type,
+                    options["shot"].release_height,
+                    zone_id,
+                    StrategyTable.inputs_key(
+                        options["shot"], options["physics"], zone, options["max_solutions"]
+                    ),
                 )
-
-                formatted_solutions.append(
-                    {
-                        "option_number": i + 1,
-                        "strike_angle_elevation": el_angle,
-                        "strike_azimuth_angle": az_angle,
-                        "strike_velocity": vel,
-                        "required_voltage": required_voltage,
-                        "actual_landing_x": solution["landing_x"],
-                        "actual_landing_z": solution["landing_z"],
-                        "error_distance": error_distance,
-                        "error_percent": error_percent,
-                        "description": f"ตัวเลือก {i+1}: {required_voltage:.1f}V, {el_angle:.1f}°, ความเร็ว {vel:.1f}m/s",
-                    }
+            if entry is not None:
+                payload, status = format_shot_options(
+                    entry["success"],
+                    entry["solutions"] if entry["success"] else entry["error"],
+                    target_x,
+                    target_z,
                 )
+                payload["source"] = "strategy_table"
+                return jsonify(payload), status
 
-            return jsonify(
-                {
-                    "solutions": formatted_solutions,
-                    "target_x": target_x,
-                    "target_z": target_z,
-                    "total_options": len(formatted_solutions),
-                    "message": f"พบทางเลือก {len(formatted_solutions)} แบบสำหรับการตีไปยังเป้าหมาย",
-                }
-            )
-        else:
-            return jsonify({"error": solutions_data}), 400
+        success, solutions_data = find_shot_options(
+            target_x,
+            target_z,
+            grid_executor=optimizer_pool,
+            grid_workers=OPTIMIZER_WORKERS,
+            **options,
+        )
+        payload, status = format_shot_options(
+            success, solutions_data, target_x, target_z
+        )
+        payload["source"] = "computed"
+        return jsonify(payload), status
+    except (ValueError, TypeError) as e:
+        # ข้อมูลจาก client ไม่ถูกต้อง (เช่น เวกเตอร์ผิดรูปหรือ integrator ที่ไม่รู้จัก)
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Error in /api/optimize_multiple: {e}", exc_info=True)
         return (
@@ -431,9 +1037,152 @@ def optimize_multiple():
         )
 
 
+def run_optimize_multiple_job(job_id, target_x, target_z, options):
+    """งานเบื้องหลังของ /api/jobs/optimize_multiple (รันใน job_pool)"""
+    job_store.update(job_id, status="running")
+    try:
+        success, solutions_data = find_shot_options(
+            target_x,
+            target_z,
+            grid_executor=optimizer_pool,
+            grid_workers=OPTIMIZER_WORKERS,
+            progress_callback=lambda progress: job_store.update(
+                job_id, progress=progress
+            ),
+            **options,
+        )
+        payload, status = format_shot_options(
+            success, solutions_data, target_x, target_z
+        )
+        if status == 200:
+            job_store.update(job_id, status="done", result=payload)
+        else:
+            job_store.update(job_id, status="failed", error=payload["error"])
+    except Exception as e:
+        app.logger.error(f"Error in optimize_multiple job {job_id}: {e}", exc_info=True)
+        job_store.update(
+            job_id,
+            status="failed",
+            error=f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API การหาทางเลือกหลายแบบ: {str(e)}",
+        )
+
+
+@app.route("/api/jobs/optimize_multiple", methods=["POST"])
+def submit_optimize_multiple_job():
+    if target_area is None:
+        return (
+            jsonify(
+                {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
+            ),
+            500,
+        )
+    try:
+        data = request.json
+        target_x, target_z, options = parse_optimize_request(data)
+        options["max_solutions"] = int(data.get("max_solutions", 5))
+    except Exception as e:
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
+
+    job_id = job_store.create()
+    job_pool.submit(run_optimize_multiple_job, job_id, target_x, target_z, options)
+    return (
+        jsonify(
+            {
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/jobs/{job_id}",
+            }
+        ),
+        202,
+    )
+
+
+def run_strategy_table_job(job_id, physics, rebuild_options):
+    """งานเบื้องหลังของ /api/jobs/strategy_table (รันใน job_pool ทีละงาน)"""
+    with strategy_rebuild_lock:
+        job_store.update(job_id, status="running")
+        try:
+            summary = strategy_table.rebuild(
+                physics,
+                executor=optimizer_pool,
+                progress_callback=lambda done, total: job_store.update(
+                    job_id, progress={"entries_done": done, "entries_total": total}
+                ),
+                **rebuild_options,
+            )
+            job_store.update(job_id, status="done", result=summary)
+        except Exception as e:
+            app.logger.error(f"Error in strategy_table job {job_id}: {e}", exc_info=True)
+            job_store.update(
+                job_id,
+                status="failed",
+                error=f"เกิดข้อผิดพลาดที่ไม่คาดคิดระหว่างสร้างตารางกลยุทธ์: {str(e)}",
+            )
+
+
+@app.route("/api/jobs/strategy_table", methods=["POST"])
+def submit_strategy_table_job():
+    """สร้าง/อัปเดตตารางกลยุทธ์ คำนวณใหม่เฉพาะรายการที่ input เปลี่ยน (force=true คำนวณทั้งหมด)"""
+    if strategy_rebuild_lock.locked():
+        return jsonify({"error": "กำลังสร้างตารางกลยุทธ์อยู่ กรุณารอให้เสร็จก่อน"}), 409
+    try:
+        data = request.json or {}
+        field_types = data.get("field_types") or list(StrategyTable.FIELD_TYPES)
+        unknown = [name for name in field_types if name not in StrategyTable.FIELD_TYPES]
+        if unknown:
+            return jsonify({"error": f"ไม่รู้จักประเภทสนาม: {', '.join(unknown)}"}), 400
+        rebuild_options = {
+            "field_types": field_types,
+            "release_heights": [float(h) for h in data.get("release_heights", [])] or None,
+            "strike_height": float(data.get("strike_height", 0.35)),
+            "max_solutions": int(data.get("max_solutions", 5)),
+            "force": bool(data.get("force", False)),
+        }
+        physics = physics_config_from_request(data)
+    except Exception as e:
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
+
+    job_id = job_store.create()
+    job_pool.submit(run_strategy_table_job, job_id, physics, rebuild_options)
+    return (
+        jsonify(
+            {
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/jobs/{job_id}",
+            }
+        ),
+        202,
+    )
+
+
+@app.route("/api/strategy_table", methods=["GET"])
+def strategy_table_info():
+    """ข้อมูลของตารางกลยุทธ์ปัจจุบัน (revision, เวลาอัปเดต, จำนวนรายการ)"""
+    return jsonify(
+        {
+            "format_version": StrategyTable.FORMAT_VERSION,
+            "revision": strategy_table.revision,
+            "updated_at": strategy_table.updated_at,
+            "entries": len(strategy_table.entries),
+            "field_types": sorted(
+                {key.split("|", 1)[0] for key in strategy_table.entries}
+            ),
+        }
+    )
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "ไม่พบงานที่ระบุ หรืองานหมดอายุแล้ว"}), 404
+    return jsonify(job)
+
+
 @app.route("/api/field_info", methods=["GET"])
 def field_info():
-    if simulation is None:
+    if target_area is None:
         return (
             jsonify(
                 {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
@@ -441,7 +1190,8 @@ def field_info():
             500,
         )
     try:
-        field_data = simulation.target_area.get_field_dimensions()
+        field = target_area  # อ่าน reference ครั้งเดียว เผื่อมีการเปลี่ยนสนามระหว่าง request
+        field_data = field.get_field_dimensions()
 
         # Prepare dimensions part of the response
         response_dimensions = {
@@ -449,17 +1199,16 @@ def field_info():
             "max_radial_distance": field_data.get("max_distance_overall"),
             "zone_width_radial": field_data.get("zone_width_radial"),
             "field_type": field_data.get("field_type"),
-            "azimuth_angle_min": simulation.striker_settings.azimuth_angle_min,
-            "azimuth_angle_max": simulation.striker_settings.azimuth_angle_max,
+            "azimuth_angle_min": striker_limits.azimuth_angle_min,
+            "azimuth_angle_max": striker_limits.azimuth_angle_max,
             "elevation_angle_min": 45.0,  # มุมเงยขั้นต่ำ 45 องศา
             "elevation_angle_max": 90.0,  # มุมเงยสูงสุด 90 องศา
-            "velocity_min": simulation.striker_settings.velocity_min,
-            "velocity_max": simulation.striker_settings.velocity_max,
+            "velocity_min": striker_limits.velocity_min,
+            "velocity_max": striker_limits.velocity_max,
         }
-        return jsonify(
+        response = jsonify_with_zones(
             {
                 "dimensions": response_dimensions,
-                "zones_data": field_data.get("raw_zones_data"),
                 "available_field_types": [
                     "standard",
                     "extra1",
@@ -468,8 +1217,13 @@ def field_info():
                     "extramap1",
                     "extramap2",
                 ],
-            }
+            },
+            "zones_data",
+            field,
         )
+        # body นี้ขึ้นกับการตั้งค่าสนามอย่างเดียว จึงใช้ zones_etag เป็น ETag ได้
+        response.set_etag(field.get_field_summary().zones_etag)
+        return response.make_conditional(request)
     except Exception as e:
         app.logger.error(f"Error in /api/field_info: {e}", exc_info=True)
         return (
@@ -480,7 +1234,8 @@ def field_info():
 
 @app.route("/api/change_field", methods=["POST"])
 def change_field():
-    if simulation is None:
+    global target_area
+    if target_area is None:
         return (
             jsonify(
                 {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
@@ -490,27 +1245,30 @@ def change_field():
     try:
         data = request.json
         field_type = data.get("field_type", "standard")
-        simulation.target_area.load_field_configuration(field_type)
+        new_target_area = TargetArea()
+        new_target_area.load_field_configuration(field_type)
+        target_area = new_target_area  # สลับ reference ทีเดียว request อื่นจะไม่เห็นสนามที่ตั้งค่าไม่ครบ
 
-        new_field_data = simulation.target_area.get_field_dimensions()
+        new_field_data = new_target_area.get_field_dimensions()
         response_dimensions = {
             "min_radial_distance": new_field_data.get("min_distance_overall"),
             "max_radial_distance": new_field_data.get("max_distance_overall"),
             "zone_width_radial": new_field_data.get("zone_width_radial"),
             "field_type": new_field_data.get("field_type"),
-            "azimuth_angle_min": simulation.striker_settings.azimuth_angle_min,
-            "azimuth_angle_max": simulation.striker_settings.azimuth_angle_max,
+            "azimuth_angle_min": striker_limits.azimuth_angle_min,
+            "azimuth_angle_max": striker_limits.azimuth_angle_max,
             "elevation_angle_min": 45.0,  # มุมเงยขั้นต่ำ 45 องศา
             "elevation_angle_max": 90.0,  # มุมเงยสูงสุด 90 องศา
-            "velocity_min": simulation.striker_settings.velocity_min,
-            "velocity_max": simulation.striker_settings.velocity_max,
+            "velocity_min": striker_limits.velocity_min,
+            "velocity_max": striker_limits.velocity_max,
         }
-        return jsonify(
+        return jsonify_with_zones(
             {
                 "dimensions": response_dimensions,
-                "zones_data": new_field_data.get("raw_zones_data"),
                 "message": f"เปลี่ยนประเภทสนามเป็น {field_type} แล้ว",
-            }
+            },
+            "zones_data",
+            new_target_area,
         )
     except Exception as e:
         app.logger.error(f"Error in /api/change_field: {e}", exc_info=True)
@@ -521,9 +1279,44 @@ def change_field():
 
 
 # Sensitivity analysis might need more robust error handling too if kept
+# ขนาดสูงสุดของการกวาด (จำนวนจุดรวมทุกแกน) ต่อหนึ่ง request
+SWEEP_MAX_CELLS = int(os.environ.get("SWEEP_MAX_CELLS", 250_000))
+# คอลัมน์ของ landing Jacobian สำหรับ method="linear"
+JACOBIAN_COLUMNS = {
+    "strike_velocity": 0,
+    "strike_angle_elevation": 1,
+    "strike_azimuth_angle": 2,
+}
+
+
+def sweep_axes_from_request(data, base_elevation_angle):
+    """{name: values} for /api/sensitivity_analysis.
+
+    data["parameters"] maps each swept parameter to {"min", "max"} and an
+    optional "steps" (default data["resolution"]). Without it the sweep is
+    the original one: elevation +/- variation_elevation in 21 steps.
+    """
+    resolution = int(data.get("resolution", 21))
+    parameters = data.get("parameters")
+    if not parameters:
+        variation_elevation = float(data.get("variation_elevation", 5.0))
+        parameters = {
+            "strike_angle_elevation": {
+                "min": base_elevation_angle - variation_elevation,
+                "max": base_elevation_angle + variation_elevation,
+            }
+        }
+    return {
+        name: np.linspace(
+            float(spec["min"]), float(spec["max"]), int(spec.get("steps", resolution))
+        )
+        for name, spec in parameters.items()
+    }
+
+
 @app.route("/api/sensitivity_analysis", methods=["POST"])
 def sensitivity_analysis():
-    if simulation is None:
+    if target_area is None:
         return (
             jsonify(
                 {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
@@ -534,70 +1327,104 @@ def sensitivity_analysis():
         data = request.json
         base_elevation_angle = float(data.get("base_elevation_angle", 45.0))
         base_azimuth_angle = float(data.get("base_azimuth_angle", 0.0))
-        variation_elevation = float(data.get("variation_elevation", 5.0))
 
         release_height = float(data.get("release_height", 2.0))
         strike_velocity = float(data.get("strike_velocity", 5.25))
         strike_height = float(data.get("strike_height", 0.35))
+        # "simulate" = จำลองทุกจุด, "linear" = ประมาณจาก Jacobian ที่จุดฐาน (อินทิเกรตครั้งเดียว)
+        method = data.get("method", "simulate")
+        if method not in ("simulate", "linear"):
+            return jsonify({"error": f"ไม่รู้จัก method: {method}"}), 400
 
-        # Directly use current simulation's physics settings for consistency
-        # simulation.striker_settings.release_height = release_height (No, use current sim settings)
-        # simulation.striker_settings.strike_velocity = strike_velocity
-        # simulation.striker_settings.strike_height = strike_height
-        # simulation.striker_settings.strike_azimuth_angle = base_azimuth_angle
-
-        elevation_angles = np.linspace(
-            base_elevation_angle - variation_elevation,
-            base_elevation_angle + variation_elevation,
-            21,
-        ).tolist()
-        landing_positions_x = []
-        landing_positions_z = []
-        radial_distances = []
-
-        # Store original settings to restore later
-        original_el = simulation.striker_settings.strike_angle_elevation
-        original_az = simulation.striker_settings.strike_azimuth_angle
-
-        simulation.striker_settings.strike_azimuth_angle = (
-            base_azimuth_angle  # Fix azimuth for this analysis
-        )
-
-        for el_angle in elevation_angles:
-            # Use get_landing_position with current simulation's striker settings (release_h, strike_h, velocity)
-            # but vary the elevation angle for the analysis.
-            lx, lz = simulation.ball_physics.get_landing_position(
-                simulation.striker_settings.release_height,  # Use current sim setting
-                simulation.striker_settings.strike_velocity,  # Use current sim setting
-                el_angle,  # Vary this
-                base_azimuth_angle,  # Fixed for analysis
-                simulation.striker_settings.strike_height,  # Use current sim setting
+        axes = sweep_axes_from_request(data, base_elevation_angle)
+        unknown = [name for name in axes if name not in SWEEP_PARAMETERS]
+        if unknown:
+            return (
+                jsonify(
+                    {
+                        "error": f"ไม่รู้จักพารามิเตอร์: {', '.join(unknown)} (ใช้ได้: {', '.join(SWEEP_PARAMETERS)})"
+                    }
+                ),
+                400,
             )
-            landing_positions_x.append(lx)
-            landing_positions_z.append(lz)
-            radial_distances.append(
-                math.sqrt(lx**2 + lz**2) if lx is not None and lz is not None else None
+        cells = math.prod(values.size for values in axes.values())
+        if cells < 1 or cells > SWEEP_MAX_CELLS:
+            return (
+                jsonify(
+                    {"error": f"จำนวนจุดที่กวาดต้องอยู่ระหว่าง 1 ถึง {SWEEP_MAX_CELLS} (ได้ {cells})"}
+                ),
+                400,
+            )
+        if method == "linear" and any(name not in JACOBIAN_COLUMNS for name in axes):
+            return (
+                jsonify(
+                    {
+                        "error": "method=linear ใช้ได้เฉพาะ strike_velocity, strike_angle_elevation และ strike_azimuth_angle"
+                    }
+                ),
+                400,
             )
 
-        # Restore original settings
-        simulation.striker_settings.strike_angle_elevation = original_el
-        simulation.striker_settings.strike_azimuth_angle = original_az
+        # ใช้ค่าของ request นี้เองทั้งหมด (ไม่อ่านสถานะที่ค้างจาก request ก่อนหน้า)
+        shot = ShotConfig(
+            release_height=release_height,
+            strike_height=strike_height,
+            strike_angle_elevation=base_elevation_angle,
+            strike_azimuth_angle=base_azimuth_angle,
+            strike_velocity=strike_velocity,
+        )
+        physics = physics_config_from_request(data)
+        base_x, base_z, jacobian = landing_sensitivity(shot, physics)
 
-        base_radial_distance = None
-        if (
-            len(radial_distances) > len(elevation_angles) // 2
-            and radial_distances[len(elevation_angles) // 2] is not None
-        ):
-            base_radial_distance = radial_distances[len(elevation_angles) // 2]
+        if method == "linear":
+            shape = tuple(values.size for values in axes.values())
+            grids = np.meshgrid(*axes.values(), indexing="ij", sparse=True)
+            landing_x = np.full(shape, base_x)
+            landing_z = np.full(shape, base_z)
+            for name, grid in zip(axes, grids):
+                delta = grid - getattr(shot, name)
+                landing_x = landing_x + jacobian[0][JACOBIAN_COLUMNS[name]] * delta
+                landing_z = landing_z + jacobian[1][JACOBIAN_COLUMNS[name]] * delta
+            flight_time = None
+        else:
+            landing_x, landing_z, flight_time = landing_sweep(shot, physics, axes)
+        radial_distances = np.hypot(landing_x, landing_z)
 
         sensitivity_results = {
-            "elevation_angles": elevation_angles,
-            "landing_positions_x": landing_positions_x,
-            "landing_positions_z": landing_positions_z,
-            "radial_distances": radial_distances,
-            "base_radial_distance": base_radial_distance,
+            "method": method,
+            # เป็น list เพื่อคงลำดับแกน (jsonify เรียง key ของ dict ใหม่)
+            "axes": [
+                {"name": name, "values": values.tolist()}
+                for name, values in axes.items()
+            ],
+            "shape": list(radial_distances.shape),
+            "landing_x": landing_x.tolist(),
+            "landing_z": landing_z.tolist(),
+            "flight_time": flight_time.tolist() if flight_time is not None else None,
+            "radial_distance": radial_distances.tolist(),
+            "base_landing_x": base_x,
+            "base_landing_z": base_z,
+            "base_radial_distance": math.sqrt(base_x**2 + base_z**2),
+            # d(landing)/d(parameter) ที่จุดฐาน, มุมเป็นองศา
+            "jacobian": {
+                name: {"x": jacobian[0][column], "z": jacobian[1][column]}
+                for name, column in JACOBIAN_COLUMNS.items()
+            },
         }
+        if list(axes) == ["strike_angle_elevation"]:
+            # รูปแบบผลลัพธ์เดิมของการกวาดมุมเงยอย่างเดียว
+            sensitivity_results.update(
+                {
+                    "elevation_angles": axes["strike_angle_elevation"].tolist(),
+                    "landing_positions_x": landing_x.tolist(),
+                    "landing_positions_z": landing_z.tolist(),
+                    "radial_distances": radial_distances.tolist(),
+                }
+            )
         return jsonify(sensitivity_results)
+    except (ValueError, TypeError) as e:
+        # ข้อมูลจาก client ไม่ถูกต้อง (เช่น เวกเตอร์ผิดรูปหรือ integrator ที่ไม่รู้จัก)
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
     except Exception as e:
         app.logger.error(f"Error in /api/sensitivity_analysis: {e}", exc_info=True)
         return (
@@ -606,6 +1433,166 @@ def sensitivity_analysis():
         )
 
 
+MONTE_CARLO_MAX_SAMPLES = int(os.environ.get("MONTE_CARLO_MAX_SAMPLES", 200_000))
+
+
+@app.route("/api/monte_carlo", methods=["POST"])
+def monte_carlo():
+    if target_area is None:
+        return (
+            jsonify(
+                {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
+            ),
+            500,
+        )
+    try:
+        data = request.json
+        n_samples = int(data.get("n_samples", 10_000))
+        if not 2 <= n_samples <= MONTE_CARLO_MAX_SAMPLES:
+            return (
+                jsonify(
+                    {"error": f"n_samples ต้องอยู่ระหว่าง 2 ถึง {MONTE_CARLO_MAX_SAMPLES} (ได้รับ: {n_samples})"}
+                ),
+                400,
+            )
+        shot = ShotConfig(
+            release_height=float(data.get("release_height", 2.0)),
+            strike_height=float(data.get("strike_height", 0.35)),
+            strike_angle_elevation=float(data.get("strike_angle_elevation", 45.0)),
+            strike_azimuth_angle=float(data.get("strike_azimuth_angle", 0.0)),
+            strike_velocity=float(data.get("strike_velocity", 5.25)),
+        )
+        field = target_area  # อ่าน reference ครั้งเดียว เผื่อมีการเปลี่ยนสนามระหว่าง request
+        success, result = monte_carlo_shot(
+            shot,
+            physics_config_from_request(data),
+            field,
+            noise_model_from_request(data),
+            n_samples,
+            seed=int(data.get("seed", 0)),
+        )
+        if not success:
+            return jsonify({"error": result}), 400
+        return jsonify(result)
+    except (ValueError, TypeError) as e:
+        # ข้อมูลจาก client ไม่ถูกต้อง (เช่น เวกเตอร์ผิดรูปหรือ integrator ที่ไม่รู้จัก)
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
+    except Exception as e:
+        app.logger.error(f"Error in /api/monte_carlo: {e}", exc_info=True)
+        return (
+            jsonify({"error": f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API Monte Carlo: {str(e)}"}),
+            500,
+        )
+
+
+@app.route("/api/optimize_zone", methods=["POST"])
+def optimize_zone():
+    """หาค่าที่ทำให้โอกาสตกในโซน zone_id สูงสุด ภายใต้ความคลาดเคลื่อนของ striker"""
+    if target_area is None:
+        return (
+            jsonify(
+                {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
+            ),
+            500,
+        )
+    try:
+        data = request.json
+        zone_id = data.get("zone_id")
+        if not zone_id:
+            return jsonify({"error": "ต้องระบุ zone_id"}), 400
+        n_samples = int(data.get("n_samples", 2000))
+        if not 2 <= n_samples <= MONTE_CARLO_MAX_SAMPLES:
+            return (
+                jsonify(
+                    {"error": f"n_samples ต้องอยู่ระหว่าง 2 ถึง {MONTE_CARLO_MAX_SAMPLES} (ได้รับ: {n_samples})"}
+                ),
+                400,
+            )
+        _, _, options = parse_optimize_request(data)
+        field = target_area  # อ่าน reference ครั้งเดียว เผื่อมีการเปลี่ยนสนามระหว่าง request
+        success, result = optimize_zone_shot(
+            zone_id,
+            options["shot"],
+            options["physics"],
+            field,
+            noise_model_from_request(data),
+            fixed_params=options["fixed_params"],
+            n_samples=n_samples,
+            seed=int(data.get("seed", 0)),
+        )
+        if not success:
+            return jsonify({"error": result}), 400
+        return jsonify(result)
+    except (ValueError, TypeError) as e:
+        # ข้อมูลจาก client ไม่ถูกต้อง (เช่น เวกเตอร์ผิดรูปหรือ integrator ที่ไม่รู้จัก)
+        return jsonify({"error": f"ข้อมูลที่ส่งมาไม่ถูกต้อง: {str(e)}"}), 400
+    except Exception as e:
+        app.logger.error(f"Error in /api/optimize_zone: {e}", exc_info=True)
+        return (
+            jsonify({"error": f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API การปรับให้เหมาะสมตามโซน: {str(e)}"}),
+            500,
+        )
+
+
+@app.route("/api/cache_stats", methods=["GET"])
+def cache_stats():
+    if target_area is None:
+        return (
+            jsonify(
+                {"error": "เครื่องจำลองการทำงานเริ่มต้นไม่สำเร็จ กรุณาตรวจสอบบันทึกของเซิร์ฟเวอร์"}
+            ),
+            500,
+        )
+    try:
+        return jsonify(shared_cache_stats())
+    except Exception as e:
+        app.logger.error(f"Error in /api/cache_stats: {e}", exc_info=True)
+        return (
+            jsonify({"error": f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API สถิติ cache: {str(e)}"}),
+            500,
+        )
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    try:
+        return jsonify(
+            {
+                "max_samples": request_metrics.max_samples,
+                "endpoints": request_metrics.summary(),
+            }
+        )
+    except Exception as e:
+        app.logger.error(f"Error in /api/metrics: {e}", exc_info=True)
+        return (
+            jsonify({"error": f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API metrics: {str(e)}"}),
+            500,
+        )
+
+
+@app.route("/api/metrics/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """ผล cProfile ของ request ที่ส่ง ?profile=1 เป็นข้อความ (?sort=cumulative|tottime, ?limit=N)"""
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        return jsonify({"error": "ไม่พบผล profile นี้ (อาจถูกลบไปแล้ว)"}), 404
+    sort = request.args.get("sort", "cumulative")
+    if sort not in ("cumulative", "tottime", "calls"):
+        return jsonify({"error": "sort ต้องเป็น cumulative, tottime หรือ calls"}), 400
+    try:
+        limit = int(request.args.get("limit", 50))
+        endpoint, profiler = entry
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+        return Response(f"endpoint: {endpoint}\n{output.getvalue()}", mimetype="text/plain")
+    except Exception as e:
+        app.logger.error(f"Error in /api/metrics/profiles: {e}", exc_info=True)
+        return (
+            jsonify({"error": f"เกิดข้อผิดพลาดที่ไม่คาดคิดใน API profile: {str(e)}"}),
+            500,
+        )
+
+
 if __name__ == "__main__":
     # Basic logging setup for Flask development server
     import logging
@@ -614,7 +1601,8 @@ if __name__ == "__main__":
     # For more detailed debug logs from Flask itself if needed:
     # app.logger.setLevel(logging.DEBUG)
 
-    if simulation is None:
+    if target_area is None:
         print("ไม่สามารถเริ่มแอปพลิเคชัน Flask ได้เนื่องจากไม่สามารถเริ่มต้นอ็อบเจ็กต์ Simulation")
     else:
-        app.run(host="0.0.0.0", port=5000, debug=True)
+        # แต่ละ request ไม่แก้สถานะร่วมกันแล้ว จึงให้บริการแบบหลาย thread ได้
+        app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
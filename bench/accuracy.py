@@ -0,0 +1,234 @@
+"""Check every landing engine against golden calculate_trajectory landings.
+
+The golden dataset holds the landing point of today's reference model
+(BallPhysics.calculate_trajectory, fixed-step Euler) for every legal
+elevation on a velocity x azimuth grid placed between the LandingTable
+nodes. Each engine (scalar and batch per integrator, and the LandingTable
+interpolation) is run over the same shots and reported with its max and
+mean landing error and its speedup over the reference. An engine whose
+max error exceeds its bound in MAX_ERROR, or a reference that no longer
+reproduces the golden data, makes the exit status 1.
+
+    python bench/accuracy.py [--golden bench/golden/landings.npz]
+        [--regenerate] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import BallPhysics, LandingTable, LRUCache, StrikerSettings  # noqa: E402
+
+RELEASE_HEIGHT = 2.0
+STRIKE_HEIGHT = 0.35
+TIME_LIMIT = 5.0
+VELOCITY_STEPS = 25
+AZIMUTH_STEPS = 19
+DEFAULT_GOLDEN = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "golden", "landings.npz"
+)
+
+# ระยะคลาดเคลื่อนสูงสุดที่ยอมรับได้ของแต่ละ engine เทียบกับข้อมูลอ้างอิง (m)
+# euler ต้องตรงกับ calculate_trajectory ทุกบิต ส่วน rk4/rk45 ต่างจาก Euler ราว 3 ซม.
+# ซึ่งเป็นความคลาดเคลื่อนของ Euler เอง (dt = 0.01) ไม่ใช่ของ rk4/rk45
+MAX_ERROR = {
+    "reference": 1e-9,
+    "euler_scalar": 1e-9,
+    "euler_batch": 1e-9,
+    "rk4_scalar": 0.05,
+    "rk4_batch": 0.05,
+    "rk45_adaptive_scalar": 0.05,
+    "rk45_adaptive_batch": 0.05,
+    "landing_table": 5e-4,  # float32 + bilinear ระหว่างจุดของตาราง
+}
+
+
+def golden_shots():
+    """The shot grid of the golden dataset: (elevations, velocities, azimuths) axes."""
+    limits = StrikerSettings()
+    elevations = np.arange(
+        limits.angle_elevation_min,
+        limits.angle_elevation_max + 1e-9,
+        LandingTable.ELEVATION_STEP,
+    )
+    velocities = np.linspace(limits.velocity_min, limits.velocity_max, VELOCITY_STEPS)
+    azimuths = np.linspace(
+        limits.azimuth_angle_min, limits.azimuth_angle_max, AZIMUTH_STEPS
+    )
+    return elevations, velocities, azimuths
+
+
+def reference_landings(elevations, velocities, azimuths):
+    """Landing x, z, t from calculate_trajectory for every shot, and the time taken."""
+    # cache ขนาด 1 เพื่อให้ทุกนัดถูกคำนวณจริง
+    physics = BallPhysics(trajectory_cache=LRUCache(maxsize=1))
+    landings = np.empty((elevations.size, velocities.size, azimuths.size, 3))
+    start = time.perf_counter()
+    for i, el in enumerate(elevations):
+        for j, v in enumerate(velocities):
+            for k, az in enumerate(azimuths):
+                xs, _, zs, ts = physics.calculate_trajectory(
+                    RELEASE_HEIGHT, v, el, az, STRIKE_HEIGHT, TIME_LIMIT
+                )
+                landings[i, j, k] = xs[-1], zs[-1], ts[-1]
+    return landings, time.perf_counter() - start
+
+
+def load_golden(path, axes):
+    """Golden landings from path, or None if missing or built for another grid."""
+    try:
+        golden = np.load(path)
+    except OSError:
+        return None
+    stored = (golden["elevations"], golden["velocities"], golden["azimuths"])
+    if any(a.shape != b.shape or not np.allclose(a, b) for a, b in zip(stored, axes)):
+        return None
+    if float(golden["strike_height"]) != STRIKE_HEIGHT:
+        return None
+    return golden["landings"]
+
+
+def save_golden(path, axes, landings):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    elevations, velocities, azimuths = axes
+    np.savez_compressed(
+        path,
+        elevations=elevations,
+        velocities=velocities,
+        azimuths=azimuths,
+        strike_height=STRIKE_HEIGHT,
+        time_limit=TIME_LIMIT,
+        landings=landings,
+    )
+
+
+def scalar_engine(integrator):
+    physics = BallPhysics(integrator=integrator, landing_cache=LRUCache(maxsize=1))
+
+    def run(el_grid, vel_grid, az_grid):
+        landings = [
+            physics.calculate_landing(
+                RELEASE_HEIGHT, v, el, az, STRIKE_HEIGHT, TIME_LIMIT
+            )[:2]
+            for el, v, az in zip(el_grid.ravel(), vel_grid.ravel(), az_grid.ravel())
+        ]
+        return np.array(landings).reshape(el_grid.shape + (2,))
+
+    return run
+
+
+def batch_engine(integrator):
+    physics = BallPhysics(integrator=integrator)
+
+    def run(el_grid, vel_grid, az_grid):
+        land_x, land_z, _ = physics.calculate_landing_batch(
+            RELEASE_HEIGHT, vel_grid, el_grid, az_grid, STRIKE_HEIGHT, TIME_LIMIT
+        )
+        return np.stack([land_x, land_z], axis=-1)
+
+    return run
+
+
+def table_engine():
+    # สร้าง/โหลดตารางก่อนจับเวลา เวลาที่รายงานจึงเป็นเวลาค้นตารางอย่างเดียว
+    table = LandingTable.get(
+        BallPhysics(), StrikerSettings(), RELEASE_HEIGHT, STRIKE_HEIGHT
+    )
+
+    def run(el_grid, vel_grid, az_grid):
+        el_idx = np.rint(
+            (el_grid - table.elevations[0]) / LandingTable.ELEVATION_STEP
+        ).astype(int)
+        land_x, land_z = table.interpolate(el_idx, vel_grid, az_grid)
+        return np.stack([land_x, land_z], axis=-1)
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN)
+    parser.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="rebuild the golden dataset from the current calculate_trajectory",
+    )
+    parser.add_argument("--output", help="write the results JSON here")
+    args = parser.parse_args()
+
+    axes = golden_shots()
+    reference, reference_seconds = reference_landings(*axes)
+    golden = None if args.regenerate else load_golden(args.golden, axes)
+    if golden is None:
+        if not args.regenerate and os.path.exists(args.golden):
+            print(
+                f"{args.golden} was built for another shot grid; "
+                "re-run with --regenerate",
+                file=sys.stderr,
+            )
+            return 2
+        save_golden(args.golden, axes, reference)
+        print(f"golden dataset ({reference[..., 0].size} shots) written to {args.golden}")
+        golden = reference
+
+    el_grid, vel_grid, az_grid = np.meshgrid(*axes, indexing="ij")
+    engines = {"reference": None}
+    for integrator in BallPhysics.INTEGRATORS:
+        engines[f"{integrator}_scalar"] = scalar_engine(integrator)
+        engines[f"{integrator}_batch"] = batch_engine(integrator)
+    engines["landing_table"] = table_engine()
+
+    print(
+        f"{'engine':<22} {'max err':>10} {'mean err':>10} {'bound':>9} "
+        f"{'seconds':>8} {'speedup':>8}"
+    )
+    results = {}
+    failures = []
+    for name, run in engines.items():
+        if run is None:
+            landings, seconds = reference[..., :2], reference_seconds
+        else:
+            start = time.perf_counter()
+            landings = run(el_grid, vel_grid, az_grid)
+            seconds = time.perf_counter() - start
+        error = np.hypot(*np.moveaxis(landings - golden[..., :2], -1, 0))
+        results[name] = {
+            "max_error_m": float(error.max()),
+            "mean_error_m": float(error.mean()),
+            "max_error_bound_m": MAX_ERROR[name],
+            "seconds": seconds,
+            "speedup": reference_seconds / seconds,
+        }
+        if not error.max() <= MAX_ERROR[name]:
+            failures.append(name)
+        print(
+            f"{name:<22} {error.max():>9.2e}m {error.mean():>9.2e}m "
+            f"{MAX_ERROR[name]:>8.0e}m {seconds:>8.3f} {reference_seconds / seconds:>7.1f}x"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"shots": int(el_grid.size), "golden": args.golden, "engines": results},
+                f,
+                indent=2,
+            )
+
+    if failures:
+        print(
+            f"\nACCURACY REGRESSION: {', '.join(failures)} exceeded the max error "
+            f"bound against {args.golden}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
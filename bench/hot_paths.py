@@ -0,0 +1,298 @@
+"""Benchmark the physics, optimizer and zone-lookup hot paths per field type.
+
+Every field type gets a fixed shot set (legal shots drawn with --seed) and
+a fixed target set (the zone target points). Reports trajectories/sec and
+landings/sec, optimize latency p50/p99, zone lookups/sec and peak memory
+(tracemalloc, measured in a second untimed pass). Results are written as
+JSON and compared against a stored baseline; any metric that is worse than
+the baseline by more than --tolerance is reported and the exit status is 1.
+Timings are machine-specific, so no baseline ships with the repo: record
+one with --update-baseline first. Without a baseline the script refuses to
+run (exit status 2) unless --no-baseline is given.
+
+    python bench/hot_paths.py [--fields standard extra2 ...] [--shots N]
+        [--targets N] [--seed S] [--output results.json]
+        [--baseline bench/baselines/hot_paths.json]
+        [--update-baseline | --no-baseline] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import (  # noqa: E402
+    SHARED_LANDING_CACHE,
+    SHARED_TRAJECTORY_CACHE,
+    BallPhysics,
+    LRUCache,
+    PhysicsConfig,
+    ShotConfig,
+    Simulation,
+    StrategyTable,
+    StrikerSettings,
+    TargetArea,
+)
+
+RELEASE_HEIGHT = 2.0
+STRIKE_HEIGHT = 0.35
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json"
+)
+# metric ที่ลงท้ายด้วยชื่อเหล่านี้ยิ่งมากยิ่งดี ที่เหลือ (ms, KiB) ยิ่งน้อยยิ่งดี
+HIGHER_IS_BETTER = ("_per_sec",)
+
+
+def field_shots(field_index, n_shots, seed):
+    """Fixed set of legal shots for one field type: (velocities, elevations, azimuths)."""
+    limits = StrikerSettings()
+    rng = np.random.default_rng([seed, field_index])
+    return (
+        rng.uniform(limits.velocity_min, limits.velocity_max, n_shots),
+        rng.uniform(limits.angle_elevation_min, limits.angle_elevation_max, n_shots),
+        rng.uniform(limits.azimuth_angle_min, limits.azimuth_angle_max, n_shots),
+    )
+
+
+def field_targets(area, n_targets):
+    """Up to n_targets zone target points, spread evenly over the zone list."""
+    zones = area.zones
+    picks = np.unique(
+        np.linspace(0, len(zones) - 1, min(n_targets, len(zones))).astype(int)
+    )
+    return [(zones[i].target_x, zones[i].target_z) for i in picks]
+
+
+def percentile_ms(seconds):
+    p50, p99 = np.percentile(np.asarray(seconds) * 1e3, (50, 99))
+    return {"p50_ms": float(p50), "p99_ms": float(p99)}
+
+
+def bench_trajectory(shots):
+    # cache ขนาด 1 เพื่อให้ทุกนัดถูกคำนวณจริง
+    physics = BallPhysics(trajectory_cache=LRUCache(maxsize=1))
+    start = time.perf_counter()
+    for v, el, az in zip(*shots):
+        physics.calculate_trajectory(RELEASE_HEIGHT, v, el, az, STRIKE_HEIGHT)
+    return {"trajectories_per_sec": shots[0].size / (time.perf_counter() - start)}
+
+
+def bench_landing(shots):
+    physics = BallPhysics(landing_cache=LRUCache(maxsize=1))
+    start = time.perf_counter()
+    for v, el, az in zip(*shots):
+        physics.get_landing_position(RELEASE_HEIGHT, v, el, az, STRIKE_HEIGHT)
+    return {"landings_per_sec": shots[0].size / (time.perf_counter() - start)}
+
+
+def bench_optimize(area, targets, solver):
+    sim = Simulation.from_configs(ShotConfig(), PhysicsConfig(), target_area=area)
+    latencies = []
+    for target_x, target_z in targets:
+        start = time.perf_counter()
+        sim.calculate_optimal_parameters(target_x, target_z, solver=solver)
+        latencies.append(time.perf_counter() - start)
+    return percentile_ms(latencies)
+
+
+def bench_multiple(area, targets):
+    sim = Simulation.from_configs(ShotConfig(), PhysicsConfig(), target_area=area)
+    latencies = []
+    for target_x, target_z in targets:
+        start = time.perf_counter()
+        sim.find_multiple_optimal_solutions(target_x, target_z)
+        latencies.append(time.perf_counter() - start)
+    return percentile_ms(latencies)
+
+
+def bench_zone_lookup(area, points):
+    start = time.perf_counter()
+    for x, z in points:
+        area.get_zone_for_position(x, z)
+    return {"lookups_per_sec": len(points) / (time.perf_counter() - start)}
+
+
+def run_field(field_index, field_type, args):
+    area = TargetArea()
+    area.load_field_configuration(field_type)
+    shots = field_shots(field_index, args.shots, args.seed)
+    targets = field_targets(area, args.targets)
+    landings = BallPhysics().calculate_landing_batch(
+        RELEASE_HEIGHT, *shots, STRIKE_HEIGHT
+    )
+    points = list(zip(landings[0].tolist(), landings[1].tolist())) * 20
+
+    # โหลด/สร้าง landing table ก่อน เพื่อไม่ให้ติดอยู่ในเวลาของ optimize แบบ table
+    Simulation.from_configs(ShotConfig(), PhysicsConfig()).get_landing_table()
+
+    benches = {
+        "calculate_trajectory": lambda: bench_trajectory(shots),
+        "get_landing_position": lambda: bench_landing(shots),
+        "optimize_table": lambda: bench_optimize(area, targets, "table"),
+        "optimize_grid": lambda: bench_optimize(area, targets, "grid"),
+        "find_multiple_optimal_solutions": lambda: bench_multiple(area, targets),
+        "get_zone_for_position": lambda: bench_zone_lookup(area, points),
+    }
+    results = {}
+    for name, bench in benches.items():
+        SHARED_LANDING_CACHE.clear()
+        SHARED_TRAJECTORY_CACHE.clear()
+        results[name] = bench()
+
+        # รอบที่สองวัดหน่วยความจำสูงสุด (tracemalloc ทำให้ช้าลง จึงไม่ใช้เวลาจากรอบนี้)
+        SHARED_LANDING_CACHE.clear()
+        SHARED_TRAJECTORY_CACHE.clear()
+        tracemalloc.start()
+        try:
+            bench()
+            results[name]["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing every metric worse than baseline by more than tolerance."""
+    regressions = []
+    for field_type, benches in results["fields"].items():
+        for name, metrics in benches.items():
+            old_metrics = baseline["fields"].get(field_type, {}).get(name, {})
+            for metric, value in metrics.items():
+                old = old_metrics.get(metric)
+                if old is None or old <= 0:
+                    continue
+                if metric.endswith(HIGHER_IS_BETTER):
+                    change = (old - value) / old
+                else:
+                    change = (value - old) / old
+                if change > tolerance:
+                    regressions.append(
+                        f"{field_type}/{name}/{metric}: {old:.4g} -> {value:.4g} "
+                        f"({change:+.0%} worse)"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--fields", nargs="+", default=list(StrategyTable.FIELD_TYPES)
+    )
+    parser.add_argument("--shots", type=int, default=200)
+    parser.add_argument("--targets", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    baseline_mode = parser.add_mutually_exclusive_group()
+    baseline_mode.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="store these results as the baseline instead of comparing",
+    )
+    baseline_mode.add_argument(
+        "--no-baseline",
+        action="store_true",
+        help="only report (and --output) the results, without comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown / memory growth before failing",
+    )
+    args = parser.parse_args()
+
+    unknown = [field for field in args.fields if field not in StrategyTable.FIELD_TYPES]
+    if unknown:
+        parser.error(f"unknown field type(s): {', '.join(unknown)}")
+    # ตรวจก่อนเริ่มวัด เพื่อไม่ต้องรอจนจบแล้วค่อยรู้ว่าไม่มีอะไรให้เทียบ
+    needs_baseline = not (args.update_baseline or args.no_baseline)
+    if needs_baseline and not os.path.exists(args.baseline):
+        print(
+            f"no baseline at {args.baseline}: record one with --update-baseline, "
+            "or pass --no-baseline to skip the comparison",
+            file=sys.stderr,
+        )
+        return 2
+
+    results = {
+        "config": {"shots": args.shots, "targets": args.targets, "seed": args.seed},
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fields": {},
+    }
+    print(
+        f"{'field':<10} {'benchmark':<32} {'throughput/s':>12} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'peak KiB':>9}"
+    )
+    for field_type in args.fields:
+        field_index = StrategyTable.FIELD_TYPES.index(field_type)
+        benches = run_field(field_index, field_type, args)
+        results["fields"][field_type] = benches
+        for name, metrics in benches.items():
+            throughput = next(
+                (v for k, v in metrics.items() if k.endswith("_per_sec")), None
+            )
+            columns = [
+                "" if throughput is None else f"{throughput:.0f}",
+                *(
+                    f"{metrics[key]:.2f}" if key in metrics else ""
+                    for key in ("p50_ms", "p99_ms")
+                ),
+            ]
+            print(
+                f"{field_type:<10} {name:<32} {columns[0]:>12} {columns[1]:>8} "
+                f"{columns[2]:>8} {metrics['peak_kib']:>9.0f}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if args.no_baseline:
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("config") != results["config"]:
+        print(
+            f"baseline was recorded with {baseline.get('config')}, "
+            f"not {results['config']}; re-run with the same --shots/--targets/--seed",
+            file=sys.stderr,
+        )
+        return 2
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(
+            f"\nPERFORMANCE REGRESSION vs {args.baseline} "
+            f"(tolerance {args.tolerance:.0%}):",
+            file=sys.stderr,
+        )
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
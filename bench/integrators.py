@@ -0,0 +1,111 @@
+"""Compare BallPhysics integrators against the fixed-step Euler model.
+
+Runs the same random set of legal shots through every integrator and
+reports cost (steps, scalar and batch time) and landing accuracy, both
+against the current Euler output and against a tightly-toleranced
+Dormand-Prince reference.
+
+    python bench/integrators.py [--shots N] [--seed S]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation import BallPhysics, LRUCache, StrikerSettings  # noqa: E402
+
+RELEASE_HEIGHT = 2.0
+STRIKE_HEIGHT = 0.35
+TIME_LIMIT = 5.0
+
+
+def random_shots(n_shots, seed):
+    limits = StrikerSettings()
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(limits.velocity_min, limits.velocity_max, n_shots),
+        rng.uniform(limits.angle_elevation_min, limits.angle_elevation_max, n_shots),
+        rng.uniform(limits.azimuth_angle_min, limits.azimuth_angle_max, n_shots),
+    )
+
+
+def reference_landings(velocities, elevations, azimuths):
+    physics = BallPhysics(integrator="rk45_adaptive")
+    physics.RK45_RTOL = physics.RK45_ATOL = 1e-12
+    return np.array(
+        [
+            physics._integrate_rk(v, el, az, STRIKE_HEIGHT, TIME_LIMIT)[:2]
+            for v, el, az in zip(velocities, elevations, azimuths)
+        ]
+    )
+
+
+def run_integrator(integrator, velocities, elevations, azimuths):
+    # cache ขนาด 1 เพื่อให้ทุกนัดถูกคำนวณจริง
+    physics = BallPhysics(integrator=integrator, landing_cache=LRUCache(maxsize=1))
+
+    start = time.perf_counter()
+    landings = np.array(
+        [
+            physics.calculate_landing(
+                RELEASE_HEIGHT, v, el, az, STRIKE_HEIGHT, TIME_LIMIT
+            )
+            for v, el, az in zip(velocities, elevations, azimuths)
+        ]
+    )
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    physics.calculate_landing_batch(
+        RELEASE_HEIGHT, velocities, elevations, azimuths, STRIKE_HEIGHT, TIME_LIMIT
+    )
+    batch_seconds = time.perf_counter() - start
+
+    if integrator == "euler":
+        steps = np.ceil(landings[:, 2] / physics.time_step)
+    else:
+        steps = np.array(
+            [
+                physics._integrate_rk(v, el, az, STRIKE_HEIGHT, TIME_LIMIT)[3]
+                for v, el, az in zip(velocities, elevations, azimuths)
+            ]
+        )
+    return landings, scalar_seconds, batch_seconds, steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shots", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    shots = random_shots(args.shots, args.seed)
+    reference = reference_landings(*shots)
+    euler = None
+
+    print(
+        f"{'integrator':<14} {'steps/shot':>10} {'scalar us':>10} {'batch ms':>9} "
+        f"{'max err':>9} {'mean err':>9} {'max vs euler':>12}"
+    )
+    for integrator in BallPhysics.INTEGRATORS:
+        landings, scalar_seconds, batch_seconds, steps = run_integrator(
+            integrator, *shots
+        )
+        if euler is None:
+            euler = landings
+        error = np.hypot(*(landings[:, :2] - reference).T)
+        vs_euler = np.hypot(*(landings[:, :2] - euler[:, :2]).T)
+        print(
+            f"{integrator:<14} {steps.mean():>10.1f} "
+            f"{scalar_seconds / args.shots * 1e6:>10.1f} {batch_seconds * 1e3:>9.2f} "
+            f"{error.max():>8.2e}m {error.mean():>8.2e}m {vs_euler.max():>11.2e}m"
+        )
+
+
+if __name__ == "__main__":
+    main()
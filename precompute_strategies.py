@@ -0,0 +1,91 @@
+"""Precompute the strategy table for every field type, release height and zone.
+
+Runs find_shot_options for each zone's target point and writes the
+results to STRATEGY_TABLE_PATH (see StrategyTable). Entries whose inputs
+did not change since the last run are kept as they are.
+
+    python precompute_strategies.py [--fields standard extra2 ...]
+        [--release-heights 1.0 2.0] [--max-solutions N] [--workers N]
+        [--integrator euler|rk4|rk45_adaptive] [--drag-coefficient CD]
+        [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation import (
+    STRATEGY_TABLE_PATH,
+    BallPhysics,
+    PhysicsConfig,
+    StrategyTable,
+    StrikerSettings,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--fields", nargs="+", default=list(StrategyTable.FIELD_TYPES)
+    )
+    parser.add_argument(
+        "--release-heights",
+        nargs="+",
+        type=float,
+        default=StrikerSettings().available_heights,
+    )
+    parser.add_argument("--strike-height", type=float, default=0.35)
+    parser.add_argument("--max-solutions", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--integrator", choices=BallPhysics.INTEGRATORS, default="euler"
+    )
+    parser.add_argument(
+        "--drag-coefficient", type=float, default=PhysicsConfig.drag_coefficient
+    )
+    parser.add_argument("--path", default=STRATEGY_TABLE_PATH)
+    parser.add_argument(
+        "--force", action="store_true", help="recompute every entry"
+    )
+    args = parser.parse_args()
+
+    unknown = [field for field in args.fields if field not in StrategyTable.FIELD_TYPES]
+    if unknown:
+        parser.error(f"unknown field type(s): {', '.join(unknown)}")
+
+    physics = PhysicsConfig(
+        drag_coefficient=args.drag_coefficient, integrator=args.integrator
+    )
+    table = StrategyTable.load(args.path)
+
+    def report(done, total):
+        print(f"\r  {done}/{total} entries", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    try:
+        summary = table.rebuild(
+            physics,
+            field_types=args.fields,
+            release_heights=args.release_heights,
+            strike_height=args.strike_height,
+            max_solutions=args.max_solutions,
+            executor=executor,
+            force=args.force,
+            progress_callback=report,
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    print(file=sys.stderr)
+    print(
+        f"{args.path}: revision {summary['revision']}, "
+        f"{summary['computed']} computed, {summary['reused']} reused "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
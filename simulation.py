@@ -6,99 +6,1694 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import json
 import os
 import math
+import hashlib
+from bisect import bisect_right
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from operator import mul
+from dataclasses import asdict, dataclass
+from concurrent.futures import as_completed
 import datetime  # เพิ่มสำหรับการบันทึกวันที่ในรายงาน
 
+# ที่เก็บตาราง landing ที่คำนวณไว้ล่วงหน้า (ดู LandingTable)
+LANDING_TABLE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "landing_tables"
+)
+
+# ไฟล์ตารางกลยุทธ์ของทุกสนาม x ความสูงปล่อย x โซน (ดู StrategyTable)
+STRATEGY_TABLE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "strategy_tables", "strategy_table.json"
+)
+
+# Explicit Runge-Kutta tableaus for BallPhysics: (stage rows, weights).
+# Dormand-Prince 5(4): the last stage row equals the 5th-order weights, so
+# that stage is the new state and its derivative is reused as the next first stage.
+_RK4_TABLEAU = (
+    ((0.5,), (0.0, 0.5), (0.0, 0.0, 1.0)),
+    (1 / 6, 1 / 3, 1 / 3, 1 / 6),
+)
+_DOPRI5_TABLEAU = (
+    (
+        (1 / 5,),
+        (3 / 40, 9 / 40),
+        (44 / 45, -56 / 15, 32 / 9),
+        (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+        (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+        (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+    ),
+    # 5th-order minus embedded 4th-order weights (local error estimate)
+    (
+        35 / 384 - 5179 / 57600,
+        0.0,
+        500 / 1113 - 7571 / 16695,
+        125 / 192 - 393 / 640,
+        -2187 / 6784 + 92097 / 339200,
+        11 / 84 - 187 / 2100,
+        -1 / 40,
+    ),
+)
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss counters."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    # Locks cannot be pickled; a copy sent to a worker process starts empty.
+    def __getstate__(self):
+        return {"maxsize": self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state["maxsize"])
+
+
+class StageTimings:
+    """Wall time and trajectory-integration counts per stage of one request.
+
+    Active for the current context (thread / task) between start() and
+    stop(), or inside a `with` block.
+    While active, timed_stage() blocks add their wall time under their name
+    and every BallPhysics integration is counted against the innermost open
+    stage. Time and integrations outside any stage go to "other", filled in
+    on exit. With nothing active both are no-ops.
+    """
+
+    def __init__(self):
+        self.stages = {}  # name -> {"seconds", "calls", "integrations"}
+        self.total_seconds = None
+        self._open = []
+        self._staged_seconds = 0.0  # เวลาของ stage นอกสุดเท่านั้น (stage ซ้อนไม่นับซ้ำ)
+        self._token = None
+        self._start = None
+
+    def start(self):
+        self._token = _ACTIVE_STAGE_TIMINGS.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def stop(self):
+        """Deactivate (in the context that called start) and fill in "other"."""
+        if self._token is None:
+            return
+        self.total_seconds = time.perf_counter() - self._start
+        _ACTIVE_STAGE_TIMINGS.reset(self._token)
+        self._token = None
+        self._stage("other")["seconds"] = max(
+            0.0, self.total_seconds - self._staged_seconds
+        )
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def _stage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"seconds": 0.0, "calls": 0, "integrations": 0}
+        return stage
+
+    def add_integrations(self, count):
+        self._stage(self._open[-1] if self._open else "other")["integrations"] += count
+
+    def as_dict(self):
+        return {name: dict(stage) for name, stage in self.stages.items()}
+
+
+_ACTIVE_STAGE_TIMINGS = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def timed_stage(name):
+    """Record the enclosed block as stage `name` of the active StageTimings."""
+    timings = _ACTIVE_STAGE_TIMINGS.get()
+    if timings is None:
+        yield
+        return
+    stage = timings._stage(name)
+    timings._open.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage["seconds"] += elapsed
+        stage["calls"] += 1
+        timings._open.pop()
+        if not timings._open:
+            timings._staged_seconds += elapsed
+
+
+def _count_integrations(count=1):
+    timings = _ACTIVE_STAGE_TIMINGS.get()
+    if timings is not None:
+        timings.add_integrations(count)
+
+
+class Trajectory:
+    """One sampled flight: x, y, z (m) and t (s) as read-only float64 arrays.
+
+    x, y, z and t are the rows of data, a single (4, n) block trimmed to
+    the flight. Iterating yields (x, y, z, t), so a Trajectory unpacks like
+    the (xs, ys, zs, ts) lists it replaces. Being read-only, cached
+    trajectories are handed out without copying.
+
+    The Euler path collects samples in Python float lists (about 32 bytes a
+    sample against 8 in the array) and copies them here once, so peak memory
+    while building one trajectory is roughly 5x its final size. Writing into
+    an array preallocated from time_limit / dt was 20-80% slower per step.
+    """
+
+    __slots__ = ("data", "x", "y", "z", "t")
+
+    def __init__(self, data):
+        data = np.array(data, dtype=float)
+        data.flags.writeable = False
+        self.data = data
+        self.x, self.y, self.z, self.t = data
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.t))
+
 
 class BallPhysics:
-    """Class to handle the physics calculations of the ball's trajectory"""
+    """Class to handle the physics calculations of the ball's trajectory
+
+    integrator selects how shots are integrated:
+    "euler"          semi-implicit Euler with time_step (the original model)
+    "rk4"            classic Runge-Kutta with RK4_TIME_STEP
+    "rk45_adaptive"  Dormand-Prince 5(4) with step-size control
+    The Runge-Kutta integrators locate the ground crossing on the cubic
+    Hermite interpolant of the last step instead of a straight line.
+
+    wind (m/s) and spin (rad/s) are (x, y, z) vectors in field coordinates.
+    Drag acts on the velocity relative to the wind and spin adds a Magnus
+    lift a = k_M * (spin x (v - wind)) with k_M = rho*A*r*magnus_coefficient
+    / (2m). Both default to zero, which keeps the drag-only code paths.
+
+    With max_bounces > 0 the ball bounces off the ground (see
+    calculate_bounce_batch). landing_point selects which position
+    calculate_landing and calculate_landing_batch report: "first_contact"
+    (the original behaviour) or "rest", where the ball settles.
+    """
+
+    INTEGRATORS = ("euler", "rk4", "rk45_adaptive")
+    LANDING_POINTS = ("first_contact", "rest")
+    BOUNCE_REST_SPEED = 0.05  # m/s; slower rebounds stop bouncing and roll
+    # ความเร็วแนวนอนเมื่อกลิ้งโดยไม่ไถล (ทรงกลมตัน) แรงเสียดทานลดได้ไม่ต่ำกว่านี้
+    BOUNCE_ROLLING_RATIO = 5.0 / 7.0
+    BOUNCE_JACOBIAN_STEPS = (1e-4, 1e-3, 1e-3)  # m/s, deg, deg
+    RK4_TIME_STEP = 0.1
+    RK45_RTOL = 1e-4
+    RK45_ATOL = 1e-4  # m and m/s
+    RK45_INITIAL_STEP = 0.05
+
+    # ค่าที่เปลี่ยนผลการคำนวณ ถ้าถูกตั้งค่าใหม่ให้ล้าง cache
+    CACHE_INVALIDATING_ATTRS = frozenset(
+        {
+            "gravity",
+            "ball_mass",
+            "air_density",
+            "drag_coefficient",
+            "cross_sectional_area",
+            "time_step",
+            "integrator",
+            "wind",
+            "spin",
+            "magnus_coefficient",
+        }
+    )
+    CACHE_QUANTUM = 1e-6  # shot parameters closer than this share a cache entry
 
-    def __init__(self, gravity=9.81, ball_mass=0.024, elasticity=0.4):
+    def __init__(
+        self,
+        gravity=9.81,
+        ball_mass=0.024,
+        elasticity=0.4,
+        air_density=1.225,
+        drag_coefficient=0.67,
+        landing_cache=None,
+        trajectory_cache=None,
+        integrator="euler",
+        wind=(0.0, 0.0, 0.0),
+        spin=(0.0, 0.0, 0.0),
+        magnus_coefficient=1.0,
+        max_bounces=0,
+        ground_friction=0.3,
+        rolling_resistance=0.1,
+        landing_point="first_contact",
+    ):
+        if integrator not in self.INTEGRATORS:
+            raise ValueError(
+                f"Unknown integrator: {integrator} (expected one of {', '.join(self.INTEGRATORS)})"
+            )
+        if landing_point not in self.LANDING_POINTS:
+            raise ValueError(
+                f"Unknown landing point: {landing_point} (expected one of {', '.join(self.LANDING_POINTS)})"
+            )
+        self.landing_cache = (
+            landing_cache if landing_cache is not None else LRUCache(maxsize=4096)
+        )
+        self.trajectory_cache = (
+            trajectory_cache if trajectory_cache is not None else LRUCache(maxsize=64)
+        )
         self.gravity = gravity
         self.ball_mass = ball_mass
         self.elasticity = elasticity
         self.time_step = 0.01
         self.ideal_mode = False
-        self.air_density = 1.225
-        self.drag_coefficient = 0.67
+        self.air_density = air_density
+        self.drag_coefficient = drag_coefficient
         self.cross_sectional_area = math.pi * (0.04**2)
+        self.integrator = integrator
+        self.wind = tuple(float(w) for w in wind)
+        self.spin = tuple(float(w) for w in spin)
+        self.magnus_coefficient = magnus_coefficient
+        self.max_bounces = int(max_bounces)
+        self.ground_friction = ground_friction
+        self.rolling_resistance = rolling_resistance
+        self.landing_point = landing_point
+
+    def __setattr__(self, name, value):
+        if (
+            name in self.CACHE_INVALIDATING_ATTRS
+            and name in self.__dict__
+            and self.__dict__[name] != value
+        ):
+            for cache in (self.landing_cache, self.trajectory_cache):
+                cache.clear()
+        if name in self.CACHE_INVALIDATING_ATTRS:
+            self.__dict__.pop("_force_terms", None)
+        super().__setattr__(name, value)
+
+    def _cache_key(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+    ):
+        q = self.CACHE_QUANTUM
+        return (
+            round(release_height / q),
+            round(strike_height / q),
+            round(strike_velocity / q),
+            round(strike_angle_elevation / q),
+            round(strike_azimuth_angle / q),
+            time_limit,
+            self.gravity,
+            self.ball_mass,
+            self.drag_coefficient,
+            self.air_density,
+            self.cross_sectional_area,
+            self.time_step,
+            self.ideal_mode,
+            self.integrator,
+            self.wind,
+            self.spin,
+            self.magnus_coefficient,
+        )
+
+    def _bounce_key(self):
+        """Suffix for cache keys of results that go past the first contact."""
+        return (
+            "bounces",
+            self.elasticity,
+            self.max_bounces,
+            self.ground_friction,
+            self.rolling_resistance,
+        )
+
+    def _scores_rest(self):
+        return self.max_bounces > 0 and self.landing_point == "rest"
+
+    def cache_stats(self):
+        return {
+            "landing": self.landing_cache.stats(),
+            "trajectory": self.trajectory_cache.stats(),
+        }
+
+    def _rk_drag_constant(self, drag_coefficient=None):
+        """k in a_drag = -k * |v| * v (0 in ideal mode).
+
+        drag_coefficient overrides self.drag_coefficient and may be an array.
+        """
+        if self.ideal_mode:
+            return 0.0
+        if drag_coefficient is None:
+            drag_coefficient = self.drag_coefficient
+        return (
+            0.5
+            * self.air_density
+            * drag_coefficient
+            * self.cross_sectional_area
+            / self.ball_mass
+        )
+
+    def _has_wind_or_spin(self):
+        """True when wind or spin is set (always False in ideal mode)."""
+        return not self.ideal_mode and (any(self.wind) or any(self.spin))
+
+    def _wind_and_magnus(self):
+        """(wind, k_M * spin), so that a_magnus = k_M * spin x (v - wind).
+
+        Memoized until one of CACHE_INVALIDATING_ATTRS changes, since the
+        accelerations ask for it on every stage.
+        """
+        terms = self.__dict__.get("_force_terms")
+        if terms is None:
+            radius = math.sqrt(self.cross_sectional_area / math.pi)
+            k = (
+                0.5
+                * self.air_density
+                * self.cross_sectional_area
+                * radius
+                * self.magnus_coefficient
+                / self.ball_mass
+            )
+            terms = (self.wind, tuple(k * w for w in self.spin))
+            self.__dict__["_force_terms"] = terms
+        return terms
+
+    def _acceleration_function(self, with_sensitivities=False):
+        """The acceleration(velocity, drag_k) used by the integrators.
+
+        Chosen once per integration so that shots without wind or spin
+        keep the drag-only functions.
+        """
+        if self._has_wind_or_spin():
+            if with_sensitivities:
+                return self._rk_acceleration_forces_with_sensitivities
+            return self._rk_acceleration_forces
+        if with_sensitivities:
+            return self._rk_acceleration_with_sensitivities
+        return self._rk_acceleration
+
+    def _rk_acceleration(self, velocity, drag_k):
+        """Acceleration at velocity (vx, vy, vz); works on floats and NumPy arrays."""
+        vx, vy, vz = velocity
+        drag = drag_k * (vx * vx + vy * vy + vz * vz) ** 0.5
+        return (-drag * vx, -drag * vy - self.gravity, -drag * vz)
+
+    def _rk_acceleration_with_sensitivities(self, velocity, drag_k):
+        """_rk_acceleration extended with the variational equations.
+
+        velocity is (vx, vy, vz) followed by the three columns of
+        d(velocity)/d(strike_velocity, elevation, azimuth). Each column s
+        evolves as d(s)/dt = J s with J = -k (|v| I + v v^T / |v|), the
+        derivative of the drag acceleration.
+        """
+        vx, vy, vz = velocity[:3]
+        speed = (vx * vx + vy * vy + vz * vz) ** 0.5
+        drag = drag_k * speed
+        out = [-drag * vx, -drag * vy - self.gravity, -drag * vz]
+        for j in range(3, 12, 3):
+            sx, sy, sz = velocity[j : j + 3]
+            proj = drag_k * (vx * sx + vy * sy + vz * sz) / speed if speed else 0.0
+            out += [-drag * sx - proj * vx, -drag * sy - proj * vy, -drag * sz - proj * vz]
+        return tuple(out)
+
+    def _rk_acceleration_forces(self, velocity, drag_k):
+        """_rk_acceleration with wind and Magnus lift."""
+        (wx, wy, wz), (mx, my, mz) = self._wind_and_magnus()
+        ux, uy, uz = velocity[0] - wx, velocity[1] - wy, velocity[2] - wz
+        drag = drag_k * (ux * ux + uy * uy + uz * uz) ** 0.5
+        return (
+            -drag * ux + my * uz - mz * uy,
+            -drag * uy + mz * ux - mx * uz - self.gravity,
+            -drag * uz + mx * uy - my * ux,
+        )
+
+    def _rk_acceleration_forces_with_sensitivities(self, velocity, drag_k):
+        """_rk_acceleration_with_sensitivities with wind and Magnus lift.
+
+        With u = v - wind the drag Jacobian is -k (|u| I + u u^T / |u|) and
+        the Magnus term adds m x s for m = k_M * spin.
+        """
+        (wx, wy, wz), (mx, my, mz) = self._wind_and_magnus()
+        ux, uy, uz = velocity[0] - wx, velocity[1] - wy, velocity[2] - wz
+        speed = (ux * ux + uy * uy + uz * uz) ** 0.5
+        drag = drag_k * speed
+        out = [
+            -drag * ux + my * uz - mz * uy,
+            -drag * uy + mz * ux - mx * uz - self.gravity,
+            -drag * uz + mx * uy - my * ux,
+        ]
+        for j in range(3, 12, 3):
+            sx, sy, sz = velocity[j : j + 3]
+            proj = drag_k * (ux * sx + uy * sy + uz * sz) / speed if speed else 0.0
+            out += [
+                -drag * sx - proj * ux + my * sz - mz * sy,
+                -drag * sy - proj * uy + mz * sx - mx * sz,
+                -drag * sz - proj * uz + mx * sy - my * sx,
+            ]
+        return tuple(out)
+
+    def _rk_step(self, state, accel, h, drag_k, adaptive, acceleration=None):
+        """One Runge-Kutta step from state = positions + velocities.
+
+        The first three positions / velocities are the ball's; any further
+        components (the sensitivities) follow the same position/velocity
+        pattern. accel is acceleration(velocities) at state. The forces
+        depend on velocity only, so the stages integrate velocity and the
+        position update is the weighted sum of the stage velocities. Works
+        on floats and on NumPy arrays (one element per shot). Returns
+        (new_state, new_accel, error_ratio); error_ratio is the scaled local
+        error of the ball's state under the Dormand-Prince pair (<= 1 means
+        accept) and None for fixed-step RK4.
+        """
+        acceleration = acceleration or self._rk_acceleration
+        rows, weights = _DOPRI5_TABLEAU if adaptive else _RK4_TABLEAU
+        n = len(accel)
+        position, velocity = state[:n], state[n:]
+        velocities = [velocity]
+        accels = [accel]
+        for row in rows:
+            stage = tuple(
+                v + h * sum(map(mul, row, values))
+                for v, values in zip(velocity, zip(*accels))
+            )
+            velocities.append(stage)
+            accels.append(acceleration(stage, drag_k))
+
+        if not adaptive:
+            new_velocity = tuple(
+                v + h * sum(map(mul, weights, values))
+                for v, values in zip(velocity, zip(*accels))
+            )
+            new_position = tuple(
+                p + h * sum(map(mul, weights, values))
+                for p, values in zip(position, zip(*velocities))
+            )
+            return (
+                new_position + new_velocity,
+                acceleration(new_velocity, drag_k),
+                None,
+            )
+
+        # แถวสุดท้ายของ Dormand-Prince คือ weight อันดับ 5 จึงได้ความเร็วใหม่และความเร่ง (FSAL) มาเลย
+        new_position = tuple(
+            p + h * sum(map(mul, rows[-1], values))
+            for p, values in zip(position, zip(*velocities))
+        )
+        new_state = new_position + velocities[-1]
+        ball = (0, 1, 2, n, n + 1, n + 2)
+        errors = [
+            h * sum(map(mul, weights, values))
+            for values in list(zip(*velocities))[:3] + list(zip(*accels))[:3]
+        ]
+        atol, rtol = self.RK45_ATOL, self.RK45_RTOL
+        if isinstance(h, np.ndarray):
+            error_ratio = np.maximum.reduce(
+                [
+                    np.abs(err)
+                    / (atol + rtol * np.maximum(np.abs(state[i]), np.abs(new_state[i])))
+                    for err, i in zip(errors, ball)
+                ]
+            )
+        else:
+            error_ratio = max(
+                abs(err) / (atol + rtol * max(abs(state[i]), abs(new_state[i])))
+                for err, i in zip(errors, ball)
+            )
+        return new_state, accels[-1], error_ratio
+
+    @staticmethod
+    def _rk_next_step(h, error_ratio):
+        """Standard step-size update for a 5th-order pair."""
+        if isinstance(h, np.ndarray):
+            factor = 0.9 * np.maximum(error_ratio, 1e-10) ** -0.2
+            return h * np.clip(factor, 0.2, 5.0)
+        factor = 0.9 * max(error_ratio, 1e-10) ** -0.2
+        return h * min(max(factor, 0.2), 5.0)
+
+    @staticmethod
+    def _hermite(p0, v0, p1, v1, h, theta):
+        """Cubic Hermite position at fraction theta of a step of length h."""
+        theta2 = theta * theta
+        theta3 = theta2 * theta
+        return (
+            (2 * theta3 - 3 * theta2 + 1) * p0
+            + (theta3 - 2 * theta2 + theta) * h * v0
+            + (3 * theta2 - 2 * theta3) * p1
+            + (theta3 - theta2) * h * v1
+        )
+
+    @classmethod
+    def _ground_fraction(cls, y0, vy0, y1, vy1, h):
+        """Fraction of the step where the Hermite height reaches y = 0.
+
+        Newton iterations from the straight-line guess, kept inside [0, 1].
+        A step that starts on the ground (a bounce) starts from the end of
+        the step instead, away from the root at theta = 0.
+        """
+        if isinstance(h, np.ndarray):
+            clip = lambda value: np.clip(value, 0.0, 1.0)
+            nonzero = lambda value: np.where(value != 0, value, -1e-12)
+            theta = np.where(y0 > 0, clip(y0 / (y0 - y1)), 1.0)
+        else:
+            clip = lambda value: min(max(value, 0.0), 1.0)
+            nonzero = lambda value: value or -1e-12
+            theta = clip(y0 / (y0 - y1)) if y0 > 0 else 1.0
+        for _ in range(4):
+            theta2 = theta * theta
+            value = cls._hermite(y0, vy0, y1, vy1, h, theta)
+            slope = (
+                (6 * theta2 - 6 * theta) * y0
+                + (3 * theta2 - 4 * theta + 1) * h * vy0
+                + (6 * theta - 6 * theta2) * y1
+                + (3 * theta2 - 2 * theta) * h * vy1
+            )
+            theta = clip(theta - value / nonzero(slope))
+        return theta
+
+    @staticmethod
+    def _initial_velocity_sensitivities(
+        strike_velocity, strike_angle_elevation, strike_azimuth_angle
+    ):
+        """Columns of d(v0)/d(strike_velocity, elevation, azimuth), angles per degree."""
+        el = math.radians(strike_angle_elevation)
+        az = math.radians(strike_azimuth_angle)
+        per_degree = math.pi / 180.0
+        return (
+            math.cos(el) * math.sin(az),
+            math.sin(el),
+            math.cos(el) * math.cos(az),
+            -strike_velocity * math.sin(el) * math.sin(az) * per_degree,
+            strike_velocity * math.cos(el) * per_degree,
+            -strike_velocity * math.sin(el) * math.cos(az) * per_degree,
+            strike_velocity * math.cos(el) * math.cos(az) * per_degree,
+            0.0,
+            -strike_velocity * math.cos(el) * math.sin(az) * per_degree,
+        )
+
+    @staticmethod
+    def _landing_jacobian(position_sensitivities, velocity=None):
+        """2x3 d(landing x, z)/d(strike_velocity, elevation, azimuth).
+
+        position_sensitivities holds the three columns of d(x, y, z)/dp. When
+        the ball's velocity at the ground is given, the moving landing time
+        is accounted for: dT/dp = -(dy/dp) / vy.
+        """
+        rows = ([], [])
+        for j in range(0, 9, 3):
+            sx, sy, sz = position_sensitivities[j : j + 3]
+            if velocity is not None and velocity[1] != 0:
+                sx -= velocity[0] / velocity[1] * sy
+                sz -= velocity[2] / velocity[1] * sy
+            rows[0].append(sx)
+            rows[1].append(sz)
+        return tuple(rows[0]), tuple(rows[1])
+
+    def _integrate_rk(
+        self,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+        record=False,
+        with_sensitivities=False,
+    ):
+        """Integrate one shot with the rk4 / rk45_adaptive integrator.
+
+        Returns (landing_x, landing_z, flight_time, steps, samples,
+        jacobian). samples is None unless record is set; then it is
+        (xs, ys, zs, ts) sampled every time_step from the step interpolants,
+        ending at the landing. jacobian is None unless with_sensitivities is
+        set (see _landing_jacobian); the variational equations are then
+        integrated alongside the ball.
+        """
+        angle_rad_elevation = math.radians(strike_angle_elevation)
+        angle_rad_azimuth = math.radians(strike_azimuth_angle)
+        position = (0.0, strike_height, 0.0)
+        velocity = (
+            strike_velocity * math.cos(angle_rad_elevation) * math.sin(angle_rad_azimuth),
+            strike_velocity * math.sin(angle_rad_elevation),
+            strike_velocity * math.cos(angle_rad_elevation) * math.cos(angle_rad_azimuth),
+        )
+        acceleration = self._acceleration_function(with_sensitivities)
+        if with_sensitivities:
+            position += (0.0,) * 9
+            velocity += self._initial_velocity_sensitivities(
+                strike_velocity, strike_angle_elevation, strike_azimuth_angle
+            )
+        n = len(position)
+        state = position + velocity
+        drag_k = self._rk_drag_constant()
+        adaptive = self.integrator == "rk45_adaptive"
+        h = self.RK45_INITIAL_STEP if adaptive else self.RK4_TIME_STEP
+        accel = acceleration(velocity, drag_k)
+        t = 0.0
+        steps = 0
+        samples = ([0.0], [strike_height], [0.0], [0.0]) if record else None
+        sample_dt = self.time_step
+        next_sample = 1
+
+        while t < time_limit:
+            h = min(h, time_limit - t)
+            new_state, new_accel, error_ratio = self._rk_step(
+                state, accel, h, drag_k, adaptive, acceleration
+            )
+            steps += 1
+            if adaptive:
+                next_h = self._rk_next_step(h, error_ratio)
+                if error_ratio > 1.0:
+                    h = next_h
+                    continue
+
+            end_theta = 1.0
+            landed = new_state[1] < 0
+            if landed:
+                end_theta = self._ground_fraction(
+                    state[1], state[n + 1], new_state[1], new_state[n + 1], h
+                )
+            if record:
+                end_t = t + end_theta * h
+                while next_sample * sample_dt < end_t - 1e-12:
+                    theta = (next_sample * sample_dt - t) / h
+                    for i in range(3):
+                        samples[i].append(
+                            self._hermite(
+                                state[i], state[i + n], new_state[i], new_state[i + n], h, theta
+                            )
+                        )
+                    samples[3].append(next_sample * sample_dt)
+                    next_sample += 1
+            if landed:
+                x = self._hermite(state[0], state[n], new_state[0], new_state[n], h, end_theta)
+                z = self._hermite(state[2], state[n + 2], new_state[2], new_state[n + 2], h, end_theta)
+                t += end_theta * h
+                if record:
+                    for values, value in zip(samples, (x, 0.0, z, t)):
+                        values.append(value)
+                jacobian = None
+                if with_sensitivities:
+                    jacobian = self._landing_jacobian(
+                        [
+                            self._hermite(
+                                state[i], state[n + i], new_state[i], new_state[n + i], h, end_theta
+                            )
+                            for i in range(3, n)
+                        ],
+                        [
+                            self._hermite(
+                                state[n + i], accel[i], new_state[n + i], new_accel[i], h, end_theta
+                            )
+                            for i in range(3)
+                        ],
+                    )
+                return x, z, t, steps, samples, jacobian
+
+            state, accel = new_state, new_accel
+            t += h
+            if adaptive:
+                h = next_h
+
+        # ยังไม่ตกถึงพื้นเมื่อครบ time_limit: ใช้ตำแหน่งสุดท้าย เหมือน Euler
+        if record and samples[3][-1] < t:
+            for values, value in zip(samples, (state[0], max(state[1], 0.0), state[2], t)):
+                values.append(value)
+        jacobian = self._landing_jacobian(state[3:n]) if with_sensitivities else None
+        return state[0], state[2], t, steps, samples, jacobian
+
+    def _landing_with_sensitivities_euler(
+        self,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+        record=False,
+    ):
+        """calculate_landing plus its Jacobian for the Euler integrator.
+
+        The sensitivities go through the same semi-implicit Euler step and
+        the same linear ground interpolation, so the Jacobian is the exact
+        derivative of the discrete landing point. Returns (x, z, t, jacobian,
+        samples); samples is the (xs, ys, zs, ts) of _flight_trajectory when
+        record is set, else None.
+        """
+        angle_rad_elevation = math.radians(strike_angle_elevation)
+        angle_rad_azimuth = math.radians(strike_azimuth_angle)
+
+        vx = strike_velocity * math.cos(angle_rad_elevation) * math.sin(angle_rad_azimuth)
+        vy = strike_velocity * math.sin(angle_rad_elevation)
+        vz = strike_velocity * math.cos(angle_rad_elevation) * math.cos(angle_rad_azimuth)
+        sv = list(
+            self._initial_velocity_sensitivities(
+                strike_velocity, strike_angle_elevation, strike_azimuth_angle
+            )
+        )
+        sp = [0.0] * 9
+
+        x, y, z = 0.0, strike_height, 0.0
+        t = 0.0
+        dt = self.time_step
+        gravity = self.gravity
+        ball_mass = self.ball_mass
+        drag_k = self._rk_drag_constant()
+        samples = ([x], [y], [z], [t]) if record else None
+
+        while t < time_limit and y >= 0:
+            t += dt
+            ax_drag, ay_drag, az_drag = 0, 0, 0
+            speed_sq = vx**2 + vy**2 + vz**2
+            if drag_k and speed_sq > 1e-9:
+                speed = math.sqrt(speed_sq)
+                # ลำดับการคำนวณเดียวกับ calculate_landing เพื่อให้จุดตกตรงกันทุกบิต
+                drag_force_magnitude = (
+                    0.5
+                    * self.air_density
+                    * speed_sq
+                    * self.drag_coefficient
+                    * self.cross_sectional_area
+                )
+                ax_drag = -drag_force_magnitude * (vx / speed) / ball_mass
+                ay_drag = -drag_force_magnitude * (vy / speed) / ball_mass
+                az_drag = -drag_force_magnitude * (vz / speed) / ball_mass
+                # d(velocity) += J(v) s dt for each sensitivity column s
+                drag = drag_k * speed
+                for j in range(0, 9, 3):
+                    sx, sy, sz = sv[j : j + 3]
+                    proj = drag_k * (vx * sx + vy * sy + vz * sz) / speed
+                    sv[j] = sx + (-drag * sx - proj * vx) * dt
+                    sv[j + 1] = sy + (-drag * sy - proj * vy) * dt
+                    sv[j + 2] = sz + (-drag * sz - proj * vz) * dt
+
+            vx += ax_drag * dt
+            vy += (ay_drag - gravity) * dt
+            vz += az_drag * dt
+
+            prev_x, prev_y, prev_z = x, y, z
+            prev_sp = sp
+            x += vx * dt
+            y += vy * dt
+            z += vz * dt
+            sp = [p + v * dt for p, v in zip(sp, sv)]
+            if record:
+                for values, value in zip(samples, (x, y, z, t)):
+                    values.append(value)
+
+            if y < 0 and prev_y >= 0:
+                gap = prev_y - y
+                fraction = prev_y / gap if gap != 0 else 0
+                # อนุพันธ์ของการประมาณเชิงเส้น ณ จุดตก (fraction ขึ้นกับ p ด้วย)
+                landing_sp = []
+                for j in range(0, 9, 3):
+                    dpx, dpy, dpz = prev_sp[j : j + 3]
+                    dx, dy, dz = sp[j : j + 3]
+                    dfraction = (
+                        (dpy * gap - prev_y * (dpy - dy)) / (gap * gap) if gap != 0 else 0.0
+                    )
+                    landing_sp += [
+                        dpx - dfraction * (prev_x - x) - fraction * (dpx - dx),
+                        0.0,
+                        dpz - dfraction * (prev_z - z) - fraction * (dpz - dz),
+                    ]
+                x = prev_x - fraction * (prev_x - x)
+                z = prev_z - fraction * (prev_z - z)
+                if record:
+                    samples[0][-1], samples[1][-1], samples[2][-1] = x, 0.0, z
+                return x, z, t, self._landing_jacobian(landing_sp), samples
+
+        return x, z, t, self._landing_jacobian(sp), samples
+
+    def _integrate_euler_forces(
+        self,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+        record=False,
+    ):
+        """Semi-implicit Euler flight with wind and Magnus lift.
+
+        Same step and linear ground interpolation as calculate_landing.
+        Returns (landing_x, landing_z, flight_time, samples); samples is
+        (xs, ys, zs, ts) when record is set, else None.
+        """
+        angle_rad_elevation = math.radians(strike_angle_elevation)
+        angle_rad_azimuth = math.radians(strike_azimuth_angle)
+
+        vx = strike_velocity * math.cos(angle_rad_elevation) * math.sin(angle_rad_azimuth)
+        vy = strike_velocity * math.sin(angle_rad_elevation)
+        vz = strike_velocity * math.cos(angle_rad_elevation) * math.cos(angle_rad_azimuth)
+
+        x, y, z = 0.0, strike_height, 0.0
+        t = 0.0
+        dt = self.time_step
+        gravity = self.gravity
+        drag_k = self._rk_drag_constant()
+        (wx, wy, wz), (mx, my, mz) = self._wind_and_magnus()
+        samples = ([x], [y], [z], [t]) if record else None
+
+        while t < time_limit and y >= 0:
+            t += dt
+            ux, uy, uz = vx - wx, vy - wy, vz - wz
+            drag = drag_k * math.sqrt(ux * ux + uy * uy + uz * uz)
+            vx += (-drag * ux + my * uz - mz * uy) * dt
+            vy += (-drag * uy + mz * ux - mx * uz - gravity) * dt
+            vz += (-drag * uz + mx * uy - my * ux) * dt
+
+            prev_x, prev_y, prev_z = x, y, z
+            x += vx * dt
+            y += vy * dt
+            z += vz * dt
+
+            landed = y < 0
+            if landed:
+                fraction = prev_y / (prev_y - y)
+                x = prev_x - fraction * (prev_x - x)
+                z = prev_z - fraction * (prev_z - z)
+            if record:
+                for values, value in zip(samples, (x, max(y, 0.0), z, t)):
+                    values.append(value)
+            if landed:
+                break
+
+        return x, z, t, samples
+
+    def _landing_with_sensitivities_euler_forces(
+        self,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+        record=False,
+    ):
+        """_landing_with_sensitivities_euler with wind and Magnus lift.
+
+        Steps the ball and the sensitivity columns together through
+        _rk_acceleration_forces_with_sensitivities. Returns (x, z, t,
+        jacobian, samples) like _landing_with_sensitivities_euler.
+        """
+        angle_rad_elevation = math.radians(strike_angle_elevation)
+        angle_rad_azimuth = math.radians(strike_azimuth_angle)
+        position = (0.0, strike_height, 0.0) + (0.0,) * 9
+        velocity = (
+            strike_velocity * math.cos(angle_rad_elevation) * math.sin(angle_rad_azimuth),
+            strike_velocity * math.sin(angle_rad_elevation),
+            strike_velocity * math.cos(angle_rad_elevation) * math.cos(angle_rad_azimuth),
+        ) + self._initial_velocity_sensitivities(
+            strike_velocity, strike_angle_elevation, strike_azimuth_angle
+        )
+        acceleration = self._rk_acceleration_forces_with_sensitivities
+        drag_k = self._rk_drag_constant()
+        dt = self.time_step
+        t = 0.0
+        samples = ([0.0], [strike_height], [0.0], [0.0]) if record else None
+
+        while t < time_limit and position[1] >= 0:
+            t += dt
+            accel = acceleration(velocity, drag_k)
+            velocity = tuple(v + a * dt for v, a in zip(velocity, accel))
+            prev_position = position
+            position = tuple(p + v * dt for p, v in zip(position, velocity))
+
+            if position[1] < 0:
+                prev_y = prev_position[1]
+                gap = prev_y - position[1]
+                fraction = prev_y / gap
+                landing = [
+                    p0 - fraction * (p0 - p1) for p0, p1 in zip(prev_position, position)
+                ]
+                # อนุพันธ์ของการประมาณเชิงเส้น ณ จุดตก (fraction ขึ้นกับ p ด้วย)
+                for j in range(3, 12, 3):
+                    dpy, dy = prev_position[j + 1], position[j + 1]
+                    dfraction = (dpy * gap - prev_y * (dpy - dy)) / (gap * gap)
+                    landing[j] -= dfraction * (prev_position[0] - position[0])
+                    landing[j + 2] -= dfraction * (prev_position[2] - position[2])
+                if record:
+                    for values, value in zip(samples, (landing[0], 0.0, landing[2], t)):
+                        values.append(value)
+                return (
+                    landing[0],
+                    landing[2],
+                    t,
+                    self._landing_jacobian(landing[3:]),
+                    samples,
+                )
+            if record:
+                for values, value in zip(samples, (*position[:3], t)):
+                    values.append(value)
+
+        return (
+            position[0],
+            position[2],
+            t,
+            self._landing_jacobian(position[3:]),
+            samples,
+        )
+
+    def calculate_trajectory(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height=0.35,
+        time_limit=5.0,
+        with_sensitivities=False,
+    ):
+        """Returns the Trajectory of the flight (unpacks to xs, ys, zs, ts).
+
+        With max_bounces > 0 the bounces and the final slide are included.
+        With with_sensitivities=True a fifth item is appended: the landing
+        Jacobian of calculate_landing(..., with_sensitivities=True), read off
+        the same integration that records the flight.
+        """
+        if with_sensitivities and not self._scores_rest():
+            flight, jacobian = self._flight_trajectory_with_sensitivities(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            if self.max_bounces > 0:
+                # ช่วงบินแรกอยู่ใน trajectory_cache แล้ว _bounce_trajectory จึงไม่คำนวณซ้ำ
+                flight = self._bounce_trajectory(
+                    release_height,
+                    strike_velocity,
+                    strike_angle_elevation,
+                    strike_azimuth_angle,
+                    strike_height,
+                    time_limit,
+                )
+            return (*flight, jacobian)
+        if with_sensitivities:
+            # Jacobian ของจุดหยุดมาจากผลต่างกลางของ calculate_bounces ไม่ใช่สมการความไว
+            trajectory = self.calculate_trajectory(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            jacobian = self.calculate_landing(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+                with_sensitivities=True,
+            )[3]
+            return (*trajectory, jacobian)
+
+        if self.max_bounces > 0:
+            return self._bounce_trajectory(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+        return self._flight_trajectory(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+
+    def _flight_trajectory_with_sensitivities(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+    ):
+        """_flight_trajectory and its landing Jacobian from one integration.
+
+        Returns (trajectory, jacobian) and fills both trajectory_cache and
+        the landing_cache entry of calculate_landing(..., with_sensitivities=True).
+        """
+        cache_key = self._cache_key(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+        landing_key = cache_key + ("sensitivities",)
+        trajectory = self.trajectory_cache.get(cache_key)
+        landing = self.landing_cache.get(landing_key)
+        if trajectory is not None and landing is not None:
+            return trajectory, landing[3]
+        _count_integrations()
+
+        shot = (
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+        if self.integrator != "euler":
+            x, z, t, _, samples, jacobian = self._integrate_rk(
+                *shot, record=True, with_sensitivities=True
+            )
+        elif self._has_wind_or_spin():
+            x, z, t, jacobian, samples = self._landing_with_sensitivities_euler_forces(
+                *shot, record=True
+            )
+        else:
+            x, z, t, jacobian, samples = self._landing_with_sensitivities_euler(
+                *shot, record=True
+            )
+        trajectory = Trajectory(samples)
+        self.trajectory_cache.put(cache_key, trajectory)
+        self.landing_cache.put(landing_key, (x, z, t, jacobian))
+        return trajectory, jacobian
+
+    def _flight_trajectory(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+    ):
+        """calculate_trajectory up to the first ground contact."""
+        cache_key = self._cache_key(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+        cached = self.trajectory_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        _count_integrations()
+
+        if self.integrator != "euler":
+            _, _, _, _, samples, _ = self._integrate_rk(
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+                record=True,
+            )
+            trajectory = Trajectory(samples)
+            self.trajectory_cache.put(cache_key, trajectory)
+            return trajectory
+        if self._has_wind_or_spin():
+            _, _, _, samples = self._integrate_euler_forces(
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+                record=True,
+            )
+            trajectory = Trajectory(samples)
+            self.trajectory_cache.put(cache_key, trajectory)
+            return trajectory
+
+        angle_rad_elevation = math.radians(strike_angle_elevation)
+        angle_rad_azimuth = math.radians(strike_azimuth_angle)
+
+        v0x = (
+            strike_velocity
+            * math.cos(angle_rad_elevation)
+            * math.sin(angle_rad_azimuth)
+        )
+        v0y = strike_velocity * math.sin(angle_rad_elevation)
+        v0z = (
+            strike_velocity
+            * math.cos(angle_rad_elevation)
+            * math.cos(angle_rad_azimuth)
+        )
+
+        x0, y0, z0 = 0.0, strike_height, 0.0
+        x_positions, y_positions, z_positions, times = [x0], [y0], [z0], [0.0]
+        append_x, append_y = x_positions.append, y_positions.append
+        append_z, append_t = z_positions.append, times.append
+        x, y, z = x0, y0, z0
+        vx, vy, vz = v0x, v0y, v0z
+        t = 0.0
+        dt = self.time_step
+        gravity = self.gravity
+        use_drag = not self.ideal_mode
+        ball_mass = self.ball_mass
+
+        while t < time_limit and y >= 0:
+            t += dt
+            ax_drag, ay_drag, az_drag = 0, 0, 0
+            if use_drag:
+                speed_sq = vx**2 + vy**2 + vz**2
+                if speed_sq > 1e-9:
+                    speed = math.sqrt(speed_sq)
+                    drag_force_magnitude = (
+                        0.5
+                        * self.air_density
+                        * speed_sq
+                        * self.drag_coefficient
+                        * self.cross_sectional_area
+                    )
+                    ax_drag = -drag_force_magnitude * (vx / speed) / ball_mass
+                    ay_drag = -drag_force_magnitude * (vy / speed) / ball_mass
+                    az_drag = -drag_force_magnitude * (vz / speed) / ball_mass
+
+            vx += ax_drag * dt
+            vy += (ay_drag - gravity) * dt
+            vz += az_drag * dt
+
+            prev_x, prev_y, prev_z = x, y, z
+            x += vx * dt
+            y += vy * dt
+            z += vz * dt
+
+            append_x(x)
+            append_y(y)
+            append_z(z)
+            append_t(t)
+
+            if y < 0 and prev_y >= 0:
+                fraction = prev_y / (prev_y - y) if (prev_y - y) != 0 else 0
+                interp_x = prev_x - fraction * (prev_x - x)
+                interp_z = prev_z - fraction * (prev_z - z)
+
+                x_positions[-1] = interp_x
+                y_positions[-1] = 0.0
+                z_positions[-1] = interp_z
+                break
+
+        if y_positions and y_positions[-1] < 0:
+            y_positions[-1] = 0.0
+        # list ในลูปเร็วกว่าการเขียนลง array ทีละค่า แล้วคัดลอกเป็นบล็อกเดียวครั้งเดียวตอนจบ
+        # (แลกกับหน่วยความจำสูงสุดที่มากกว่า ดู docstring ของ Trajectory)
+        trajectory = Trajectory((x_positions, y_positions, z_positions, times))
+        self.trajectory_cache.put(cache_key, trajectory)
+        return trajectory
+
+    def _bounce_trajectory(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+    ):
+        """calculate_trajectory with the bounce arcs from calculate_bounce_batch."""
+        cache_key = (
+            self._cache_key(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            + self._bounce_key()
+        )
+        cached = self.trajectory_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        launches = []
+        _, _, _, rest_x, rest_z, rest_t, _ = self.calculate_bounce_batch(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+            launches=launches,
+        )
+        parts = [
+            self._flight_trajectory(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            ).data
+        ]
+        for x0, z0, t0, velocity, elevation, azimuth in launches:
+            arc = self._flight_trajectory(
+                0.0, float(velocity), float(elevation), float(azimuth), 0.0, time_limit
+            )
+            # ตัดจุดแรกของแต่ละช่วงออก เพราะซ้ำกับจุดกระทบพื้นของช่วงก่อนหน้า
+            parts.append(arc.data[:, 1:] + np.array([[x0], [0.0], [z0], [t0]]))
+        if rest_t > parts[-1][3, -1]:
+            parts.append(np.array([[rest_x], [0.0], [rest_z], [rest_t]]))
+
+        trajectory = Trajectory(np.concatenate(parts, axis=1))
+        self.trajectory_cache.put(cache_key, trajectory)
+        return trajectory
+
+    def calculate_trajectory_ideal(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height=0.35,
+        time_limit=5.0,
+    ):
+        old_mode = self.ideal_mode
+        self.ideal_mode = True
+        result = self.calculate_trajectory(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+        self.ideal_mode = old_mode
+        return result
+
+    def calculate_landing(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height=0.35,
+        time_limit=5.0,
+        with_sensitivities=False,
+    ):
+        """Landing-only version of calculate_trajectory.
+
+        Runs the same integration but keeps only the previous and current
+        state instead of building position lists. Returns
+        (landing_x, landing_z, flight_time). Results are memoized in
+        landing_cache.
+
+        With with_sensitivities=True the variational equations are
+        integrated in the same pass and a fourth item is returned: the
+        Jacobian ((dx/dv, dx/d_el, dx/d_az), (dz/dv, dz/d_el, dz/d_az)) of
+        the landing point, with angles in degrees.
+
+        With landing_point="rest" and max_bounces > 0 the rest position
+        from calculate_bounces is returned instead; its Jacobian comes from
+        central differences (BOUNCE_JACOBIAN_STEPS).
+        """
+        if self._scores_rest():
+            return self._rest_landing(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+                with_sensitivities,
+            )
+        cache_key = self._cache_key(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+        if with_sensitivities:
+            cache_key += ("sensitivities",)
+        cached = self.landing_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        _count_integrations()
+
+        if with_sensitivities:
+            if self.integrator == "euler" and self._has_wind_or_spin():
+                result = self._landing_with_sensitivities_euler_forces(
+                    strike_velocity,
+                    strike_angle_elevation,
+                    strike_azimuth_angle,
+                    strike_height,
+                    time_limit,
+                )[:4]
+            elif self.integrator == "euler":
+                result = self._landing_with_sensitivities_euler(
+                    strike_velocity,
+                    strike_angle_elevation,
+                    strike_azimuth_angle,
+                    strike_height,
+                    time_limit,
+                )[:4]
+            else:
+                x, z, t, _, _, jacobian = self._integrate_rk(
+                    strike_velocity,
+                    strike_angle_elevation,
+                    strike_azimuth_angle,
+                    strike_height,
+                    time_limit,
+                    with_sensitivities=True,
+                )
+                result = (x, z, t, jacobian)
+            self.landing_cache.put(cache_key, result)
+            return result
+
+        if self.integrator != "euler":
+            x, z, t, _, _, _ = self._integrate_rk(
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            self.landing_cache.put(cache_key, (x, z, t))
+            return x, z, t
+        if self._has_wind_or_spin():
+            x, z, t, _ = self._integrate_euler_forces(
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            self.landing_cache.put(cache_key, (x, z, t))
+            return x, z, t
+
+        angle_rad_elevation = math.radians(strike_angle_elevation)
+        angle_rad_azimuth = math.radians(strike_azimuth_angle)
+
+        vx = strike_velocity * math.cos(angle_rad_elevation) * math.sin(angle_rad_azimuth)
+        vy = strike_velocity * math.sin(angle_rad_elevation)
+        vz = strike_velocity * math.cos(angle_rad_elevation) * math.cos(angle_rad_azimuth)
+
+        x, y, z = 0.0, strike_height, 0.0
+        t = 0.0
+        dt = self.time_step
+        gravity = self.gravity
+        use_drag = not self.ideal_mode
+        ball_mass = self.ball_mass
+
+        while t < time_limit and y >= 0:
+            t += dt
+            ax_drag, ay_drag, az_drag = 0, 0, 0
+            if use_drag:
+                speed_sq = vx**2 + vy**2 + vz**2
+                if speed_sq > 1e-9:
+                    speed = math.sqrt(speed_sq)
+                    # Same operation order as calculate_trajectory so both
+                    # integrators land on bit-identical positions.
+                    drag_force_magnitude = (
+                        0.5
+                        * self.air_density
+                        * speed_sq
+                        * self.drag_coefficient
+                        * self.cross_sectional_area
+                    )
+                    ax_drag = -drag_force_magnitude * (vx / speed) / ball_mass
+                    ay_drag = -drag_force_magnitude * (vy / speed) / ball_mass
+                    az_drag = -drag_force_magnitude * (vz / speed) / ball_mass
+
+            vx += ax_drag * dt
+            vy += (ay_drag - gravity) * dt
+            vz += az_drag * dt
+
+            prev_x, prev_y, prev_z = x, y, z
+            x += vx * dt
+            y += vy * dt
+            z += vz * dt
+
+            if y < 0 and prev_y >= 0:
+                fraction = prev_y / (prev_y - y) if (prev_y - y) != 0 else 0
+                x = prev_x - fraction * (prev_x - x)
+                z = prev_z - fraction * (prev_z - z)
+                break
+
+        self.landing_cache.put(cache_key, (x, z, t))
+        return x, z, t
+
+    def _rest_landing(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height,
+        time_limit,
+        with_sensitivities,
+    ):
+        shot = [strike_velocity, strike_angle_elevation, strike_azimuth_angle]
+        _, _, _, x, z, t, _ = self.calculate_bounces(
+            release_height, *shot, strike_height, time_limit
+        )
+        if not with_sensitivities:
+            return x, z, t
+        # จำนวนครั้งที่เด้งทำให้จุดหยุดไม่ต่อเนื่อง จึงใช้ผลต่างกลางแทนสมการความไว
+        columns = []
+        for i, step in enumerate(self.BOUNCE_JACOBIAN_STEPS):
+            ends = []
+            for sign in (1, -1):
+                shifted = list(shot)
+                shifted[i] += sign * step
+                ends.append(
+                    self.calculate_bounces(
+                        release_height, *shifted, strike_height, time_limit
+                    )[3:5]
+                )
+            columns.append(
+                [(a - b) / (2 * step) for a, b in zip(ends[0], ends[1])]
+            )
+        return x, z, t, tuple(zip(*columns))
+
+    def calculate_landing_ideal(
+        self,
+        release_height,
+        strike_velocity,
+        strike_angle_elevation,
+        strike_azimuth_angle,
+        strike_height=0.35,
+        time_limit=5.0,
+    ):
+        old_mode = self.ideal_mode
+        self.ideal_mode = True
+        result = self.calculate_landing(
+            release_height,
+            strike_velocity,
+            strike_angle_elevation,
+            strike_azimuth_angle,
+            strike_height,
+            time_limit,
+        )
+        self.ideal_mode = old_mode
+        return result
+
+    def calculate_landing_batch(
+        self,
+        release_height,
+        strike_velocities,
+        strike_angles_elevation,
+        strike_azimuth_angles,
+        strike_height=0.35,
+        time_limit=5.0,
+        drag_coefficients=None,
+    ):
+        """Integrate many shots at once and return only where they land.
+
+        Uses the same semi-implicit Euler step as calculate_trajectory, but on
+        NumPy arrays. Shots are dropped from the working set as soon as they
+        cross y=0. The three shot inputs, strike_height and the optional
+        per-shot drag_coefficients (default self.drag_coefficient) broadcast
+        against each other. Returns (landing_x, landing_z, flight_time)
+        arrays of that shape; with landing_point="rest" and max_bounces > 0
+        these are the rest positions from calculate_bounce_batch.
+        """
+        if self._scores_rest():
+            return self.calculate_bounce_batch(
+                release_height,
+                strike_velocities,
+                strike_angles_elevation,
+                strike_azimuth_angles,
+                strike_height,
+                time_limit,
+                drag_coefficients,
+            )[3:6]
+        return self._first_contact_batch(
+            strike_velocities,
+            strike_angles_elevation,
+            strike_azimuth_angles,
+            strike_height,
+            time_limit,
+            drag_coefficients,
+        )[:3]
 
-    def calculate_trajectory(
+    def calculate_bounce_batch(
         self,
         release_height,
-        strike_velocity,
-        strike_angle_elevation,
-        strike_azimuth_angle,
+        strike_velocities,
+        strike_angles_elevation,
+        strike_azimuth_angles,
         strike_height=0.35,
         time_limit=5.0,
+        drag_coefficients=None,
+        launches=None,
     ):
-        angle_rad_elevation = math.radians(strike_angle_elevation)
-        angle_rad_azimuth = math.radians(strike_azimuth_angle)
-
-        v0x = (
-            strike_velocity
-            * math.cos(angle_rad_elevation)
-            * math.sin(angle_rad_azimuth)
-        )
-        v0y = strike_velocity * math.sin(angle_rad_elevation)
-        v0z = (
-            strike_velocity
-            * math.cos(angle_rad_elevation)
-            * math.cos(angle_rad_azimuth)
-        )
-
-        x0, y0, z0 = 0.0, strike_height, 0.0
-        x_positions, y_positions, z_positions, times = [x0], [y0], [z0], [0.0]
-        x, y, z = x0, y0, z0
-        vx, vy, vz = v0x, v0y, v0z
-        t = 0.0
-
-        while t < time_limit and y >= 0:
-            t += self.time_step
-            ax_drag, ay_drag, az_drag = 0, 0, 0
-            if not self.ideal_mode:
-                speed_sq = vx**2 + vy**2 + vz**2
-                if speed_sq > 1e-9:
-                    speed = math.sqrt(speed_sq)
-                    drag_force_magnitude = (
-                        0.5
-                        * self.air_density
-                        * speed_sq
-                        * self.drag_coefficient
-                        * self.cross_sectional_area
-                    )
-                    ax_drag = -drag_force_magnitude * (vx / speed) / self.ball_mass
-                    ay_drag = -drag_force_magnitude * (vy / speed) / self.ball_mass
-                    az_drag = -drag_force_magnitude * (vz / speed) / self.ball_mass
+        """First contact and final rest of many shots, bouncing included.
 
-            vx += ax_drag * self.time_step
-            vy += (ay_drag - self.gravity) * self.time_step
-            vz += az_drag * self.time_step
+        At every contact the vertical velocity is reversed and scaled by
+        elasticity, and ground friction removes up to ground_friction *
+        (1 + elasticity) * |vy| of the horizontal speed (Coulomb impulse),
+        but never below BOUNCE_ROLLING_RATIO of it, where the ball rolls.
+        The ball flies again until max_bounces rebounds or a rebound slower
+        than BOUNCE_REST_SPEED, then rolls to rest with deceleration
+        rolling_resistance * gravity (0 leaves it at the last contact).
+        Each arc runs in _first_contact_batch, so contacts are located like
+        the first landing; time_limit bounds every arc separately.
 
-            prev_x, prev_y, prev_z = x, y, z
-            x += vx * self.time_step
-            y += vy * self.time_step
-            z += vz * self.time_step
+        Inputs broadcast like calculate_landing_batch. Returns (first_x,
+        first_z, first_t, rest_x, rest_z, rest_t, bounces) arrays of that
+        shape. launches, if a list, receives (x, z, t, velocity, elevation,
+        azimuth) of every rebound of the first shot (for calculate_trajectory).
+        """
+        first_x, first_z, first_t, vx, vy, vz = self._first_contact_batch(
+            strike_velocities,
+            strike_angles_elevation,
+            strike_azimuth_angles,
+            strike_height,
+            time_limit,
+            drag_coefficients,
+        )
+        shape = first_x.shape
+        drag_coefficients = np.broadcast_to(
+            np.asarray(
+                self.drag_coefficient if drag_coefficients is None else drag_coefficients,
+                dtype=float,
+            ),
+            shape,
+        ).ravel()
+        x, z, t = first_x.ravel().copy(), first_z.ravel().copy(), first_t.ravel().copy()
+        vx, vy, vz = vx.ravel(), vy.ravel(), vz.ravel()
+        bounces = np.zeros(x.size, dtype=int)
+        rolling_deceleration = self.rolling_resistance * self.gravity
 
-            x_positions.append(x)
-            y_positions.append(y)
-            z_positions.append(z)
-            times.append(t)
+        # ลูกที่ยังไม่ถึงพื้นเมื่อครบ time_limit มีความเร็วเป็น NaN จึงไม่ถูกนับว่ากระทบ
+        active = np.flatnonzero(vy < 0)
+        contact = (vx[active], vy[active], vz[active])
+        for bounce in range(self.max_bounces + 1):
+            if not active.size:
+                break
+            vx_out, vy_out, vz_out = self._contact_response(*contact)
+            flying = vy_out >= self.BOUNCE_REST_SPEED
+            if bounce == self.max_bounces:
+                flying[:] = False
 
-            if y < 0 and prev_y >= 0:
-                fraction = prev_y / (prev_y - y) if (prev_y - y) != 0 else 0
-                interp_x = prev_x - fraction * (prev_x - x)
-                interp_z = prev_z - fraction * (prev_z - z)
+            # ลูกที่หยุดเด้ง: กลิ้งต่อจนหยุด (ความหน่วงคงที่)
+            settled = active[~flying]
+            if settled.size and rolling_deceleration > 0:
+                roll_x, roll_z = vx_out[~flying], vz_out[~flying]
+                speed = np.hypot(roll_x, roll_z)
+                x[settled] += roll_x * speed / (2 * rolling_deceleration)
+                z[settled] += roll_z * speed / (2 * rolling_deceleration)
+                t[settled] += speed / rolling_deceleration
 
-                x_positions[-1] = interp_x
-                y_positions[-1] = 0.0
-                z_positions[-1] = interp_z
+            active = active[flying]
+            if not active.size:
                 break
+            vx_out, vy_out, vz_out = vx_out[flying], vy_out[flying], vz_out[flying]
+            speed = np.sqrt(vx_out**2 + vy_out**2 + vz_out**2)
+            elevation = np.degrees(np.arcsin(vy_out / speed))
+            azimuth = np.degrees(np.arctan2(vx_out, vz_out))
+            if launches is not None and active[0] == 0:
+                launches.append(
+                    (x[0], z[0], t[0], speed[0], elevation[0], azimuth[0])
+                )
+            arc_x, arc_z, arc_t, *contact = self._first_contact_batch(
+                speed, elevation, azimuth, 0.0, time_limit, drag_coefficients[active]
+            )
+            bounces[active] += 1
+            x[active] += arc_x
+            z[active] += arc_z
+            t[active] += arc_t
+            in_contact = contact[1] < 0
+            active = active[in_contact]
+            contact = tuple(values[in_contact] for values in contact)
 
-        if y_positions and y_positions[-1] < 0:
-            y_positions[-1] = 0.0
-        return x_positions, y_positions, z_positions, times
+        return (
+            first_x,
+            first_z,
+            first_t,
+            x.reshape(shape),
+            z.reshape(shape),
+            t.reshape(shape),
+            bounces.reshape(shape),
+        )
 
-    def calculate_trajectory_ideal(
+    def _contact_response(self, vx, vy, vz):
+        """Velocity just after a ground contact with velocity (vx, vy < 0, vz)."""
+        rebound = -self.elasticity * vy
+        tangential = np.hypot(vx, vz)
+        impulse = self.ground_friction * (1 + self.elasticity) * -vy
+        scale = np.maximum(
+            1.0 - impulse / np.where(tangential > 0, tangential, 1.0),
+            self.BOUNCE_ROLLING_RATIO,
+        )
+        return vx * scale, rebound, vz * scale
+
+    def calculate_bounces(
         self,
         release_height,
         strike_velocity,
@@ -107,9 +1702,37 @@ class BallPhysics:
         strike_height=0.35,
         time_limit=5.0,
     ):
-        old_mode = self.ideal_mode
-        self.ideal_mode = True
-        result = self.calculate_trajectory(
+        """calculate_bounce_batch for one shot, memoized in landing_cache.
+
+        Returns (first_x, first_z, first_t, rest_x, rest_z, rest_t, bounces).
+        With max_bounces = 0 the rest position is the first contact.
+        """
+        if self.max_bounces <= 0:
+            x, z, t = self.calculate_landing(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            return x, z, t, x, z, t, 0
+
+        cache_key = (
+            self._cache_key(
+                release_height,
+                strike_velocity,
+                strike_angle_elevation,
+                strike_azimuth_angle,
+                strike_height,
+                time_limit,
+            )
+            + self._bounce_key()
+        )
+        cached = self.landing_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        result = self.calculate_bounce_batch(
             release_height,
             strike_velocity,
             strike_angle_elevation,
@@ -117,9 +1740,236 @@ class BallPhysics:
             strike_height,
             time_limit,
         )
-        self.ideal_mode = old_mode
+        result = tuple(float(values) for values in result[:6]) + (int(result[6]),)
+        self.landing_cache.put(cache_key, result)
         return result
 
+    def _first_contact_batch(
+        self,
+        strike_velocities,
+        strike_angles_elevation,
+        strike_azimuth_angles,
+        strike_height,
+        time_limit,
+        drag_coefficients=None,
+    ):
+        """calculate_landing_batch up to the first ground contact.
+
+        Returns (landing_x, landing_z, flight_time, vx, vy, vz), the last
+        three being the velocity at contact (NaN for shots still in the air
+        at time_limit).
+        """
+        velocities, elevations, azimuths, heights, drag_coefficients = (
+            np.broadcast_arrays(
+                np.asarray(strike_velocities, dtype=float),
+                np.asarray(strike_angles_elevation, dtype=float),
+                np.asarray(strike_azimuth_angles, dtype=float),
+                np.asarray(strike_height, dtype=float),
+                np.asarray(
+                    self.drag_coefficient
+                    if drag_coefficients is None
+                    else drag_coefficients,
+                    dtype=float,
+                ),
+            )
+        )
+        shape = velocities.shape
+        velocities = velocities.ravel()
+        angle_rad_elevation = np.radians(elevations.ravel())
+        angle_rad_azimuth = np.radians(azimuths.ravel())
+        heights = heights.ravel()
+        drag_coefficients = drag_coefficients.ravel()
+        _count_integrations(velocities.size)
+
+        vx = velocities * np.cos(angle_rad_elevation) * np.sin(angle_rad_azimuth)
+        vy = velocities * np.sin(angle_rad_elevation)
+        vz = velocities * np.cos(angle_rad_elevation) * np.cos(angle_rad_azimuth)
+
+        if self.integrator != "euler":
+            landed = self._landing_batch_rk(
+                (
+                    np.zeros(velocities.size),
+                    heights,
+                    np.zeros(velocities.size),
+                    vx,
+                    vy,
+                    vz,
+                ),
+                time_limit,
+                self._rk_drag_constant(drag_coefficients),
+            )
+            return tuple(values.reshape(shape) for values in landed)
+
+        n_shots = velocities.size
+        landing_x = np.empty(n_shots)
+        landing_z = np.empty(n_shots)
+        flight_time = np.empty(n_shots)
+        contact_velocity = np.full((3, n_shots), np.nan)
+
+        active = np.arange(n_shots)
+        x = np.zeros(n_shots)
+        y = heights
+        z = np.zeros(n_shots)
+        dt = self.time_step
+        t = 0.0
+        # ลม/สปิน: เลือกครั้งเดียวต่อ batch ไม่ใช่ต่อ step
+        forces = self._has_wind_or_spin()
+        if forces:
+            acceleration = self._rk_acceleration_forces
+            drag_k = self._rk_drag_constant(drag_coefficients)
+
+        while active.size and t < time_limit:
+            t += dt
+            if forces:
+                ax, ay, az = acceleration((vx, vy, vz), drag_k)
+                vx = vx + ax * dt
+                vy = vy + ay * dt
+                vz = vz + az * dt
+            elif not self.ideal_mode:
+                speed_sq = vx**2 + vy**2 + vz**2
+                moving = speed_sq > 1e-9
+                speed = np.where(moving, np.sqrt(speed_sq), 1.0)
+                drag_force_magnitude = np.where(
+                    moving,
+                    0.5
+                    * self.air_density
+                    * speed_sq
+                    * drag_coefficients
+                    * self.cross_sectional_area,
+                    0.0,
+                )
+                vx = vx + (-drag_force_magnitude * (vx / speed) / self.ball_mass) * dt
+                vy = vy + (
+                    -drag_force_magnitude * (vy / speed) / self.ball_mass
+                    - self.gravity
+                ) * dt
+                vz = vz + (-drag_force_magnitude * (vz / speed) / self.ball_mass) * dt
+            else:
+                vy = vy - self.gravity * dt
+
+            prev_x, prev_y, prev_z = x, y, z
+            x = x + vx * dt
+            y = y + vy * dt
+            z = z + vz * dt
+
+            landed = y < 0
+            if landed.any():
+                fraction = prev_y[landed] / (prev_y[landed] - y[landed])
+                landed_ids = active[landed]
+                landing_x[landed_ids] = prev_x[landed] - fraction * (
+                    prev_x[landed] - x[landed]
+                )
+                landing_z[landed_ids] = prev_z[landed] - fraction * (
+                    prev_z[landed] - z[landed]
+                )
+                flight_time[landed_ids] = t
+                contact_velocity[:, landed_ids] = vx[landed], vy[landed], vz[landed]
+
+                in_flight = ~landed
+                active = active[in_flight]
+                x, y, z = x[in_flight], y[in_flight], z[in_flight]
+                vx, vy, vz = vx[in_flight], vy[in_flight], vz[in_flight]
+                drag_coefficients = drag_coefficients[in_flight]
+                if forces:
+                    drag_k = drag_k[in_flight]
+
+        # Shots still airborne at time_limit keep their last position, like
+        # calculate_trajectory does.
+        landing_x[active] = x
+        landing_z[active] = z
+        flight_time[active] = t
+
+        return tuple(
+            values.reshape(shape)
+            for values in (landing_x, landing_z, flight_time, *contact_velocity)
+        )
+
+    def _landing_batch_rk(self, state, time_limit, drag_k):
+        """calculate_landing_batch for the Runge-Kutta integrators.
+
+        Every shot keeps its own time and (for rk45_adaptive) step size, so
+        rejected steps only repeat for the shots that need them. drag_k is
+        a scalar or one drag constant per shot. Returns (landing_x,
+        landing_z, flight_time, vx, vy, vz) like _first_contact_batch.
+        """
+        n_shots = state[0].size
+        landing_x = np.empty(n_shots)
+        landing_z = np.empty(n_shots)
+        flight_time = np.empty(n_shots)
+        contact_velocity = np.full((3, n_shots), np.nan)
+
+        drag_k = np.broadcast_to(drag_k, n_shots)
+        adaptive = self.integrator == "rk45_adaptive"
+        active = np.arange(n_shots)
+        t = np.zeros(n_shots)
+        h = np.full(
+            n_shots, self.RK45_INITIAL_STEP if adaptive else self.RK4_TIME_STEP
+        )
+        acceleration = self._acceleration_function()
+        accel = acceleration(state[3:], drag_k)
+
+        while active.size:
+            h = np.minimum(h, time_limit - t)
+            new_state, new_accel, error_ratio = self._rk_step(
+                state, accel, h, drag_k, adaptive, acceleration
+            )
+            if adaptive:
+                accepted = error_ratio <= 1.0
+                next_h = self._rk_next_step(h, error_ratio)
+            else:
+                accepted = np.ones(active.size, dtype=bool)
+                next_h = h
+
+            landed = accepted & (new_state[1] < 0)
+            if landed.any():
+                theta = self._ground_fraction(
+                    state[1][landed],
+                    state[4][landed],
+                    new_state[1][landed],
+                    new_state[4][landed],
+                    h[landed],
+                )
+                landed_ids = active[landed]
+                landing_x[landed_ids] = self._hermite(
+                    state[0][landed], state[3][landed],
+                    new_state[0][landed], new_state[3][landed], h[landed], theta,
+                )
+                landing_z[landed_ids] = self._hermite(
+                    state[2][landed], state[5][landed],
+                    new_state[2][landed], new_state[5][landed], h[landed], theta,
+                )
+                flight_time[landed_ids] = t[landed] + theta * h[landed]
+                for i in range(3):
+                    contact_velocity[i, landed_ids] = self._hermite(
+                        state[3 + i][landed], accel[i][landed],
+                        new_state[3 + i][landed], new_accel[i][landed], h[landed], theta,
+                    )
+
+            state = tuple(np.where(accepted, s1, s0) for s0, s1 in zip(state, new_state))
+            accel = tuple(
+                np.where(accepted, a_new, a_old) for a_old, a_new in zip(accel, new_accel)
+            )
+            t = np.where(accepted, t + h, t)
+            h = next_h
+
+            # ยังไม่ตกเมื่อครบ time_limit: ใช้ตำแหน่งสุดท้าย เหมือน Euler
+            timed_out = ~landed & (t >= time_limit)
+            if timed_out.any():
+                timed_out_ids = active[timed_out]
+                landing_x[timed_out_ids] = state[0][timed_out]
+                landing_z[timed_out_ids] = state[2][timed_out]
+                flight_time[timed_out_ids] = t[timed_out]
+
+            in_flight = ~(landed | timed_out)
+            if not in_flight.all():
+                active = active[in_flight]
+                state = tuple(s[in_flight] for s in state)
+                accel = tuple(a[in_flight] for a in accel)
+                t, h = t[in_flight], h[in_flight]
+                drag_k = drag_k[in_flight]
+
+        return landing_x, landing_z, flight_time, *contact_velocity
+
     def simulate_free_fall(self, release_height, strike_height_target, time_limit=5.0):
         y0 = release_height
         vy_fall = 0.0
@@ -179,14 +2029,14 @@ class BallPhysics:
     ):
         if strike_height is None:
             strike_height = 0.35
-        x_pos, _, z_pos, _ = self.calculate_trajectory(
+        land_x, land_z, _ = self.calculate_landing(
             release_height,
             strike_velocity,
             strike_angle_elevation,
             strike_azimuth_angle,
             strike_height,
         )
-        return (x_pos[-1], z_pos[-1]) if x_pos and z_pos else (0.0, 0.0)
+        return land_x, land_z
 
     def get_landing_position_ideal(
         self,
@@ -196,19 +2046,677 @@ class BallPhysics:
         strike_azimuth_angle,
         strike_height=None,
     ):
-        old_mode = self.ideal_mode
-        self.ideal_mode = True
-        res_x, res_z = self.get_landing_position(
+        if strike_height is None:
+            strike_height = 0.35
+        res_x, res_z, _ = self.calculate_landing_ideal(
             release_height,
             strike_velocity,
             strike_angle_elevation,
             strike_azimuth_angle,
             strike_height,
         )
-        self.ideal_mode = old_mode
         return res_x, res_z
 
 
+class LandingTable:
+    """Precomputed landing positions over the striker's legal shot space.
+
+    One table covers a single (release height, strike height, physics)
+    combination. It holds the landing x/z for every legal elevation (45-90
+    deg in 5 deg steps) on a velocity x azimuth grid, stored as a float32
+    .npy file under LANDING_TABLE_DIR and loaded memory-mapped. Landing
+    points between grid nodes are interpolated bilinearly.
+
+    Physics comes from the request, so tables are only built for physics on
+    the TABULATED_STEPS grid (see is_tabulated); anything else is answered
+    by the grid search. At most MAX_LOADED tables stay in memory and at most
+    MAX_FILES files stay on disk (least recently used are removed first).
+    """
+
+    ELEVATION_STEP = 5.0
+    VELOCITY_STEPS = 75  # ~0.05 m/s over 1.0-4.71 m/s
+    AZIMUTH_STEPS = 91  # 1 deg over -45..45 deg
+
+    MAX_LOADED = 16
+    MAX_FILES = 64  # ~546 KB ต่อไฟล์
+    # ค่าฟิสิกส์ที่สร้างตารางได้ต้องเป็นพหุคูณของ step เหล่านี้ (wind / spin ทุกแกน)
+    TABULATED_STEPS = {
+        "gravity": 0.01,
+        "ball_mass": 0.001,
+        "air_density": 0.005,
+        "drag_coefficient": 0.01,
+        "elasticity": 0.05,
+        "wind": 0.5,
+        "spin": 5.0,
+        "magnus_coefficient": 0.05,
+        "ground_friction": 0.05,
+        "rolling_resistance": 0.01,
+    }
+
+    _loaded = LRUCache(maxsize=MAX_LOADED)
+    _build_lock = threading.Lock()
+
+    def __init__(self, key, data, elevations, velocities, azimuths):
+        self.key = key
+        # Plain ndarray view over the (possibly memory-mapped) buffer; avoids
+        # np.memmap's per-index overhead on fancy indexing.
+        self.data = np.asarray(data)  # (n_elevation, n_velocity, n_azimuth, 2)
+        self.elevations = elevations
+        self.velocities = velocities
+        self.azimuths = azimuths
+
+    @staticmethod
+    def make_key(ball_physics, striker_settings, release_height, strike_height):
+        params = {
+            "release_height": round(float(release_height), 6),
+            "strike_height": round(float(strike_height), 6),
+            "gravity": float(ball_physics.gravity),
+            "ball_mass": float(ball_physics.ball_mass),
+            "air_density": float(ball_physics.air_density),
+            "drag_coefficient": float(ball_physics.drag_coefficient),
+            "cross_sectional_area": float(ball_physics.cross_sectional_area),
+            "time_step": float(ball_physics.time_step),
+            "ideal_mode": bool(ball_physics.ideal_mode),
+            "integrator": ball_physics.integrator,
+            "elevation": [
+                striker_settings.angle_elevation_min,
+                striker_settings.angle_elevation_max,
+                LandingTable.ELEVATION_STEP,
+            ],
+            "velocity": [
+                striker_settings.velocity_min,
+                striker_settings.velocity_max,
+                LandingTable.VELOCITY_STEPS,
+            ],
+            "azimuth": [
+                striker_settings.azimuth_angle_min,
+                striker_settings.azimuth_angle_max,
+                LandingTable.AZIMUTH_STEPS,
+            ],
+        }
+        # ใส่เฉพาะเมื่อเปิดใช้ ตารางเดิมที่ไม่มีลม/สปินจึงยังใช้ key เดิมได้
+        if any(ball_physics.wind) or any(ball_physics.spin):
+            params["wind"] = [float(w) for w in ball_physics.wind]
+            params["spin"] = [float(w) for w in ball_physics.spin]
+            params["magnus_coefficient"] = float(ball_physics.magnus_coefficient)
+        # ตารางเก็บจุดหยุดแทนจุดตกแรกเมื่อ landing_point เป็น "rest"
+        if ball_physics._scores_rest():
+            params["bounces"] = list(ball_physics._bounce_key()[1:])
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return digest[:16]
+
+    @classmethod
+    def is_tabulated(cls, ball_physics):
+        """True if every physics parameter lies on the TABULATED_STEPS grid."""
+        for name, step in cls.TABULATED_STEPS.items():
+            value = getattr(ball_physics, name)
+            for component in value if isinstance(value, tuple) else (value,):
+                quanta = float(component) / step
+                if abs(quanta - round(quanta)) > 1e-6:
+                    return False
+        return True
+
+    @classmethod
+    def get(
+        cls,
+        ball_physics,
+        striker_settings,
+        release_height,
+        strike_height,
+        rebuild=False,
+    ):
+        """Return the table for these inputs, loading or building it as needed."""
+        key = cls.make_key(ball_physics, striker_settings, release_height, strike_height)
+        table = cls._loaded.get(key)
+        if table is not None and not rebuild:
+            return table
+        with cls._build_lock:
+            # อีก thread อาจสร้างตารางเดียวกันเสร็จไปแล้วระหว่างรอ lock
+            table = cls._loaded.get(key)
+            if table is not None and not rebuild:
+                return table
+            return cls._load_or_build(
+                key, ball_physics, striker_settings, release_height, strike_height, rebuild
+            )
+
+    @classmethod
+    def _load_or_build(
+        cls, key, ball_physics, striker_settings, release_height, strike_height, rebuild
+    ):
+        elevations = np.arange(
+            striker_settings.angle_elevation_min,
+            striker_settings.angle_elevation_max + 1e-9,
+            cls.ELEVATION_STEP,
+        )
+        velocities = np.linspace(
+            striker_settings.velocity_min,
+            striker_settings.velocity_max,
+            cls.VELOCITY_STEPS,
+        )
+        azimuths = np.linspace(
+            striker_settings.azimuth_angle_min,
+            striker_settings.azimuth_angle_max,
+            cls.AZIMUTH_STEPS,
+        )
+
+        path = os.path.join(LANDING_TABLE_DIR, f"landing_{key}.npy")
+        data = None
+        if not rebuild and os.path.exists(path):
+            try:
+                data = np.load(path, mmap_mode="r")
+                if data.shape != (elevations.size, velocities.size, azimuths.size, 2):
+                    data = None
+                else:
+                    os.utime(path)  # mtime = เวลาที่ใช้ล่าสุด สำหรับ _evict_files
+            except (OSError, ValueError):
+                data = None
+
+        if data is None:
+            el_grid, vel_grid, az_grid = np.meshgrid(
+                elevations, velocities, azimuths, indexing="ij"
+            )
+            land_x, land_z, _ = ball_physics.calculate_landing_batch(
+                release_height, vel_grid, el_grid, az_grid, strike_height
+            )
+            data = np.stack([land_x, land_z], axis=-1).astype(np.float32)
+            try:
+                os.makedirs(LANDING_TABLE_DIR, exist_ok=True)
+                # Write to a temp file first so concurrent readers never see
+                # a half-written table.
+                fd, tmp_path = tempfile.mkstemp(dir=LANDING_TABLE_DIR, suffix=".npy")
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, data)
+                os.replace(tmp_path, path)
+                data = np.load(path, mmap_mode="r")
+                cls._evict_files(keep=path)
+            except OSError:
+                pass  # keep the in-memory table if the disk is not writable
+
+        table = cls(key, data, elevations, velocities, azimuths)
+        cls._loaded.put(key, table)
+        return table
+
+    @classmethod
+    def _evict_files(cls, keep):
+        """Delete the least recently used table files beyond MAX_FILES."""
+        paths = [
+            os.path.join(LANDING_TABLE_DIR, name)
+            for name in os.listdir(LANDING_TABLE_DIR)
+            if name.startswith("landing_") and name.endswith(".npy")
+        ]
+        if len(paths) <= cls.MAX_FILES:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[: len(paths) - cls.MAX_FILES]:
+            if path == keep:
+                continue
+            try:
+                # ตารางที่ยัง map อยู่ในหน่วยความจำใช้ต่อได้ แค่ต้องสร้างใหม่ในครั้งหน้า
+                os.remove(path)
+            except OSError:
+                pass
+
+    def elevation_index(self, elevation):
+        """Index of a legal elevation in the table, or None if it is not tabulated."""
+        idx = int(round((elevation - self.elevations[0]) / self.ELEVATION_STEP))
+        if 0 <= idx < self.elevations.size and abs(self.elevations[idx] - elevation) < 1e-6:
+            return idx
+        return None
+
+    def covers(self, velocity=None, azimuth=None):
+        if velocity is not None and not (
+            self.velocities[0] - 1e-9 <= velocity <= self.velocities[-1] + 1e-9
+        ):
+            return False
+        if azimuth is not None and not (
+            self.azimuths[0] - 1e-9 <= azimuth <= self.azimuths[-1] + 1e-9
+        ):
+            return False
+        return True
+
+    def interpolate(self, elevation_indices, velocities, azimuths):
+        """Bilinearly interpolated (landing_x, landing_z) for broadcastable inputs."""
+        el_idx, vel, az = np.broadcast_arrays(
+            np.asarray(elevation_indices, dtype=int),
+            np.asarray(velocities, dtype=float),
+            np.asarray(azimuths, dtype=float),
+        )
+        vel_pos = np.clip(
+            (vel - self.velocities[0]) / (self.velocities[1] - self.velocities[0]),
+            0,
+            self.velocities.size - 1,
+        )
+        az_pos = np.clip(
+            (az - self.azimuths[0]) / (self.azimuths[1] - self.azimuths[0]),
+            0,
+            self.azimuths.size - 1,
+        )
+        i0 = np.minimum(vel_pos.astype(int), self.velocities.size - 2)
+        j0 = np.minimum(az_pos.astype(int), self.azimuths.size - 2)
+        fv = (vel_pos - i0)[..., None]
+        fa = (az_pos - j0)[..., None]
+
+        n_az = self.azimuths.size
+        flat = self.data.reshape(-1, 2)
+        base = (el_idx * self.velocities.size + i0) * n_az + j0
+        landing = (
+            flat[base] * (1 - fv) * (1 - fa)
+            + flat[base + n_az] * fv * (1 - fa)
+            + flat[base + 1] * (1 - fv) * fa
+            + flat[base + n_az + 1] * fv * fa
+        )
+        return landing[..., 0], landing[..., 1]
+
+
+class StrategyTable:
+    """Precomputed best shots for every field type x release height x zone.
+
+    Each entry holds the find_shot_options result for the zone's
+    target_point, plus inputs_key: a hash of everything the result depends
+    on (physics, striker limits, heights, zone geometry, max_solutions).
+    The table is one JSON file at STRATEGY_TABLE_PATH with a format version
+    and a revision number that goes up on every write. Lookups are a dict
+    access; rebuild() only recomputes entries whose inputs_key changed.
+    """
+
+    FORMAT_VERSION = 1
+    FIELD_TYPES = ("standard", "extra1", "extra2", "real1", "extramap1", "extramap2")
+
+    _write_lock = threading.Lock()
+
+    def __init__(self, path=None, revision=0, updated_at=None, entries=None):
+        self.path = path or STRATEGY_TABLE_PATH
+        self.revision = revision
+        self.updated_at = updated_at
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path=None):
+        """Table from disk, or an empty one if the file is missing or another format."""
+        path = path or STRATEGY_TABLE_PATH
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("format_version") != cls.FORMAT_VERSION:
+            return cls(path)
+        return cls(path, data["revision"], data["updated_at"], data["entries"])
+
+    @staticmethod
+    def entry_key(field_type, release_height, zone_id):
+        return f"{field_type}|{float(release_height):g}|{zone_id}"
+
+    @classmethod
+    def inputs_key(cls, shot, physics, zone, max_solutions):
+        ball_physics = physics.make_ball_physics()
+        params = {
+            "format_version": cls.FORMAT_VERSION,
+            # ฟิสิกส์ ขีดจำกัดของ striker และความสูง (เหมือนกุญแจของ LandingTable)
+            "landing": LandingTable.make_key(
+                ball_physics, StrikerSettings(), shot.release_height, shot.strike_height
+            ),
+            "zone": zone.to_dict(),
+            "max_solutions": int(max_solutions),
+        }
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return digest[:16]
+
+    def lookup(self, field_type, release_height, zone_id, inputs_key):
+        """Stored entry if it was computed for exactly these inputs, else None."""
+        entry = self.entries.get(self.entry_key(field_type, release_height, zone_id))
+        if entry is None or entry["inputs_key"] != inputs_key:
+            return None
+        return entry
+
+    def rebuild(
+        self,
+        physics,
+        field_types=None,
+        release_heights=None,
+        strike_height=0.35,
+        max_solutions=5,
+        executor=None,
+        force=False,
+        progress_callback=None,
+    ):
+        """Recompute stale entries and write the table.
+
+        Entries are computed in parallel when executor (a process pool) is
+        given. progress_callback(entries_done, entries_total) is called as
+        each stale entry finishes. Returns {"computed", "reused", "revision"}.
+        """
+        field_types = field_types or self.FIELD_TYPES
+        release_heights = release_heights or StrikerSettings().available_heights
+
+        entries = dict(self.entries)
+        stale = []
+        reused = 0
+        for field_type in field_types:
+            area = TargetArea()
+            area.load_field_configuration(field_type)
+            for release_height in release_heights:
+                shot = ShotConfig(
+                    release_height=float(release_height), strike_height=strike_height
+                )
+                for zone in area.zones:
+                    key = self.entry_key(field_type, release_height, zone.id)
+                    inputs_key = self.inputs_key(shot, physics, zone, max_solutions)
+                    entry = entries.get(key)
+                    if not force and entry is not None and entry["inputs_key"] == inputs_key:
+                        reused += 1
+                        continue
+                    stale.append(
+                        (key, inputs_key, zone.target_x, zone.target_z, shot, physics, max_solutions)
+                    )
+
+        if not stale:
+            return {"computed": 0, "reused": reused, "revision": self.revision}
+
+        results = (
+            executor.map(_strategy_table_entry, stale)
+            if executor is not None
+            else map(_strategy_table_entry, stale)
+        )
+        for done, (key, entry) in enumerate(results, start=1):
+            entries[key] = entry
+            if progress_callback is not None:
+                progress_callback(done, len(stale))
+
+        with self._write_lock:
+            self.entries = entries
+            self.revision += 1
+            self.updated_at = datetime.datetime.now().isoformat(timespec="seconds")
+            self._write()
+        return {"computed": len(stale), "reused": reused, "revision": self.revision}
+
+    def _write(self):
+        data = {
+            "format_version": self.FORMAT_VERSION,
+            "revision": self.revision,
+            "updated_at": self.updated_at,
+            "entries": self.entries,
+        }
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยสลับ ผู้อ่านจะไม่เห็นไฟล์ที่เขียนไม่ครบ
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _strategy_table_entry(task):
+    """Process-pool worker for StrategyTable.rebuild: one (key, entry) pair."""
+    key, inputs_key, target_x, target_z, shot, physics, max_solutions = task
+    success, result = find_shot_options(
+        target_x, target_z, shot, physics, max_solutions=max_solutions
+    )
+    entry = {
+        "inputs_key": inputs_key,
+        "target_x": target_x,
+        "target_z": target_z,
+        "success": success,
+        "physics": asdict(physics),
+    }
+    if success:
+        entry["solutions"] = [
+            {name: float(value) for name, value in solution.items()}
+            for solution in result
+        ]
+    else:
+        entry["error"] = result
+    return key, entry
+
+
+@dataclass(frozen=True, slots=True)
+class RadialZone:
+    """Ring r_min <= r < r_max around the striker."""
+
+    id: str
+    r_min: float
+    r_max: float
+    color: str
+    target_x: float
+    target_z: float
+    shape = "radial1d"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "shape": self.shape,
+            "r_min": self.r_min,
+            "r_max": self.r_max,
+            "color": self.color,
+            "target_point": {"x": self.target_x, "z": self.target_z},
+        }
+
+    def inner_margin(self, xs, zs):
+        """Distance (m) from each point to the zone edge; negative outside."""
+        landing_r = np.sqrt(np.asarray(xs) ** 2 + np.asarray(zs) ** 2)
+        return np.minimum(landing_r - self.r_min, self.r_max - landing_r)
+
+
+@dataclass(frozen=True, slots=True)
+class SectorZone:
+    """Ring segment r_min <= r < r_max, az_min <= azimuth < az_max (degrees)."""
+
+    id: str
+    r_min: float
+    r_max: float
+    az_min: float
+    az_max: float
+    color: str
+    target_x: float
+    target_z: float
+    shape = "sector"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "shape": self.shape,
+            "r_min": self.r_min,
+            "r_max": self.r_max,
+            "az_min": self.az_min,
+            "az_max": self.az_max,
+            "color": self.color,
+            "target_point": {"x": self.target_x, "z": self.target_z},
+        }
+
+    def inner_margin(self, xs, zs):
+        """Distance (m) from each point to the zone edge; negative outside.
+
+        The angular margin is measured as arc length at the point's radius.
+        """
+        landing_r = np.sqrt(np.asarray(xs) ** 2 + np.asarray(zs) ** 2)
+        landing_azimuth = np.degrees(np.arctan2(xs, zs))
+        angular = np.radians(
+            np.minimum(landing_azimuth - self.az_min, self.az_max - landing_azimuth)
+        )
+        return np.minimum(
+            np.minimum(landing_r - self.r_min, self.r_max - landing_r),
+            landing_r * angular,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RectZone:
+    """Axis-aligned rectangle x_min <= x < x_max, z_min <= z < z_max."""
+
+    id: str
+    x_min: float
+    x_max: float
+    z_min: float
+    z_max: float
+    color: str
+    target_x: float
+    target_z: float
+    shape = "rect"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "shape": self.shape,
+            "x_min": self.x_min,
+            "x_max": self.x_max,
+            "z_min": self.z_min,
+            "z_max": self.z_max,
+            "color": self.color,
+            "target_point": {"x": self.target_x, "z": self.target_z},
+        }
+
+    def inner_margin(self, xs, zs):
+        """Distance (m) from each point to the nearest edge; negative outside."""
+        xs, zs = np.asarray(xs), np.asarray(zs)
+        return np.minimum(
+            np.minimum(xs - self.x_min, self.x_max - xs),
+            np.minimum(zs - self.z_min, self.z_max - zs),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class FieldSummary:
+    """What get_field_dimensions reports, computed once per configuration.
+
+    zones_json is raw_zones_data already serialized, for responses that
+    embed it without re-encoding. zones_etag is a digest of zones_json that
+    clients can send back to skip zones they already have.
+    """
+
+    min_distance_overall: float
+    max_distance_overall: float
+    zone_width_radial: float
+    field_type: str
+    raw_zones_data: list
+    zones_json: str
+    zones_etag: str
+
+
+class _ZoneIndex:
+    """Zone lookup tables compiled from a list of zone objects.
+
+    Each shape family is cut into elementary cells at its zone boundaries
+    (radii for radial1d, radius x azimuth for sectors, x x z for rects).
+    Every cell stores the index of the first zone that covers it, so a
+    lookup is one bisect per axis and the result matches the first-match
+    scan over the zone list.
+    """
+
+    _NO_ZONE = -1
+
+    def __init__(self, zones):
+        radial, sectors, rects = [], [], []
+        for i, zone in enumerate(zones):
+            if isinstance(zone, RadialZone):
+                radial.append((i, (zone.r_min, zone.r_max)))
+            elif isinstance(zone, SectorZone):
+                sectors.append(
+                    (i, (zone.r_min, zone.r_max), (zone.az_min, zone.az_max))
+                )
+            elif isinstance(zone, RectZone):
+                rects.append(
+                    (i, (zone.x_min, zone.x_max), (zone.z_min, zone.z_max))
+                )
+        self.n_zones = len(zones)
+        self.radial = self._compile(radial) if radial else None
+        self.sectors = self._compile(sectors) if sectors else None
+        self.rects = self._compile(rects) if rects else None
+
+    @classmethod
+    def _compile(cls, zones):
+        """(breakpoints per axis, cell table) for zones of (index, *intervals)."""
+        n_axes = len(zones[0]) - 1
+        breaks = [
+            sorted({bound for zone in zones for bound in zone[axis + 1]})
+            for axis in range(n_axes)
+        ]
+        table = np.full([len(axis_breaks) - 1 for axis_breaks in breaks], cls._NO_ZONE)
+        # ไล่จากโซนท้ายไปโซนแรก เพื่อให้โซนที่อยู่ก่อนในรายการทับโซนหลัง (first match)
+        for index, *intervals in reversed(zones):
+            cells = tuple(
+                slice(
+                    axis_breaks.index(low),
+                    axis_breaks.index(high) if high > low else axis_breaks.index(low),
+                )
+                for axis_breaks, (low, high) in zip(breaks, intervals)
+            )
+            table[cells] = index
+        return breaks, table, table.tolist()
+
+    def lookup(self, x, z):
+        # ใช้ len(zones) แทน "ไม่พบ" ระหว่างหา minimum (มากกว่า index ใด ๆ)
+        best = self.n_zones
+        if self.radial or self.sectors:
+            landing_r = math.sqrt(x**2 + z**2)
+        if self.radial:
+            (r_breaks,), _, table = self.radial
+            cell = bisect_right(r_breaks, landing_r) - 1
+            if 0 <= cell < len(table) and table[cell] != self._NO_ZONE:
+                best = table[cell]
+        if self.sectors:
+            (r_breaks, az_breaks), _, table = self.sectors
+            r_cell = bisect_right(r_breaks, landing_r) - 1
+            if 0 <= r_cell < len(table):
+                az_cell = bisect_right(az_breaks, math.degrees(math.atan2(x, z))) - 1
+                if 0 <= az_cell < len(az_breaks) - 1:
+                    index = table[r_cell][az_cell]
+                    if index != self._NO_ZONE and index < best:
+                        best = index
+        if self.rects:
+            (x_breaks, z_breaks), _, table = self.rects
+            x_cell = bisect_right(x_breaks, x) - 1
+            z_cell = bisect_right(z_breaks, z) - 1
+            if 0 <= x_cell < len(table) and 0 <= z_cell < len(z_breaks) - 1:
+                index = table[x_cell][z_cell]
+                if index != self._NO_ZONE and index < best:
+                    best = index
+        return best if best < self.n_zones else self._NO_ZONE
+
+    @staticmethod
+    def _cells(breaks, values):
+        cells = np.searchsorted(breaks, values, side="right") - 1
+        inside = (cells >= 0) & (cells < len(breaks) - 1)
+        return np.where(inside, cells, 0), inside
+
+    def lookup_many(self, xs, zs):
+        xs, zs = np.broadcast_arrays(np.asarray(xs, dtype=float), np.asarray(zs, dtype=float))
+        # ใช้ค่าที่มากกว่า index ใด ๆ แทน "ไม่พบ" เพื่อหา first match ด้วย minimum
+        missing = np.iinfo(np.int64).max
+        result = np.full(xs.shape, missing, dtype=np.int64)
+
+        def merge(table, cells, inside):
+            hit = table[cells]
+            result[...] = np.where(inside & (hit != self._NO_ZONE), np.minimum(result, hit), result)
+
+        if self.radial or self.sectors:
+            landing_r = np.sqrt(xs**2 + zs**2)
+        if self.radial:
+            (r_breaks,), table, _ = self.radial
+            cells, inside = self._cells(r_breaks, landing_r)
+            merge(table, cells, inside)
+        if self.sectors:
+            (r_breaks, az_breaks), table, _ = self.sectors
+            r_cells, r_inside = self._cells(r_breaks, landing_r)
+            az_cells, az_inside = self._cells(az_breaks, np.degrees(np.arctan2(xs, zs)))
+            merge(table, (r_cells, az_cells), r_inside & az_inside)
+        if self.rects:
+            (x_breaks, z_breaks), table, _ = self.rects
+            x_cells, x_inside = self._cells(x_breaks, xs)
+            z_cells, z_inside = self._cells(z_breaks, zs)
+            merge(table, (x_cells, z_cells), x_inside & z_inside)
+        result[result == missing] = self._NO_ZONE
+        return result
+
+
+# (field_type, min_distance, max_distance, zone_width) -> (zones, _ZoneIndex, FieldSummary)
+# (มีขอบเขตเพราะ set_field_dimensions รับขนาดสนามแบบกำหนดเองได้)
+_FIELD_CACHE = LRUCache(maxsize=64)
+
+
 class TargetArea:
     def __init__(self):
         self.min_distance = 0.75
@@ -233,7 +2741,7 @@ class TargetArea:
             "#40E0D0",
             "#8A2BE2",  # LightCoral, HotPink, Chartreuse, Turquoise, BlueViolet
         ]
-        self.zones = self._calculate_zones()
+        self._rebuild_zones()
 
     def _calculate_target_point_for_sector(self, r_min, r_max, az_min_deg, az_max_deg):
         mid_r = (r_min + r_max) / 2
@@ -272,16 +2780,16 @@ class TargetArea:
                     params[1], params[2], params[3], params[4]
                 )
                 zones.append(
-                    {
-                        "id": params[0],
-                        "shape": "sector",
-                        "r_min": params[1],
-                        "r_max": params[2],
-                        "az_min": params[3],
-                        "az_max": params[4],
-                        "color": self.colors[params[5] % len(self.colors)],
-                        "target_point": {"x": target_x, "z": target_z},
-                    }
+                    SectorZone(
+                        id=params[0],
+                        r_min=params[1],
+                        r_max=params[2],
+                        az_min=params[3],
+                        az_max=params[4],
+                        color=self.colors[params[5] % len(self.colors)],
+                        target_x=target_x,
+                        target_z=target_z,
+                    )
                 )
             return zones
 
@@ -294,17 +2802,14 @@ class TargetArea:
                 )
                 target_z_val = (current_distance + next_distance) / 2
                 zones.append(
-                    {
-                        "id": f"E1_Z{idx+1}",
-                        "shape": "radial1d",
-                        "r_min": current_distance,
-                        "r_max": next_distance,
-                        "color": self.colors[idx % len(self.colors)],
-                        "target_point": {
-                            "x": 0.0,
-                            "z": target_z_val,
-                        },  # Target is straight ahead
-                    }
+                    RadialZone(
+                        id=f"E1_Z{idx+1}",
+                        r_min=current_distance,
+                        r_max=next_distance,
+                        color=self.colors[idx % len(self.colors)],
+                        target_x=0.0,  # Target is straight ahead
+                        target_z=target_z_val,
+                    )
                 )
                 current_distance = next_distance
                 idx += 1
@@ -317,95 +2822,84 @@ class TargetArea:
             next_distance = min(current_distance + self.zone_width, self.max_distance)
             target_z_val = (current_distance + next_distance) / 2
             zones.append(
-                {
-                    "id": f"STD_Z{idx+1}",
-                    "shape": "radial1d",
-                    "r_min": current_distance,
-                    "r_max": next_distance,
-                    "color": self.colors[idx % len(self.colors)],
-                    "target_point": {
-                        "x": 0.0,
-                        "z": target_z_val,
-                    },  # Target is straight ahead
-                }
+                RadialZone(
+                    id=f"STD_Z{idx+1}",
+                    r_min=current_distance,
+                    r_max=next_distance,
+                    color=self.colors[idx % len(self.colors)],
+                    target_x=0.0,  # Target is straight ahead
+                    target_z=target_z_val,
+                )
             )
             current_distance = next_distance
             idx += 1
 
         if self.field_type == "real1":
             zones.append(
-                {
-                    "id": "REAL1_FIELD",
-                    "shape": "rect",
-                    "x_min": 0.0,
-                    "x_max": 3.0,
-                    "z_min": 0.0,
-                    "z_max": 2.0,
-                    "color": "#607D8B",
-                    "target_point": {"x": 1.5, "z": 1.0},
-                }
+                RectZone(
+                    id="REAL1_FIELD",
+                    x_min=0.0,
+                    x_max=3.0,
+                    z_min=0.0,
+                    z_max=2.0,
+                    color="#607D8B",
+                    target_x=1.5,
+                    target_z=1.0,
+                )
             )
 
         if self.field_type == "extramap1":
             zones.append(
-                {
-                    "id": "EXTRAMAP1_FIELD",
-                    "shape": "rect",
-                    "x_min": 0.0,
-                    "x_max": 4.0,
-                    "z_min": 0.0,
-                    "z_max": 2.0,
-                    "color": "#607D8B",
-                    "target_point": {"x": 2.0, "z": 1.0},
-                }
+                RectZone(
+                    id="EXTRAMAP1_FIELD",
+                    x_min=0.0,
+                    x_max=4.0,
+                    z_min=0.0,
+                    z_max=2.0,
+                    color="#607D8B",
+                    target_x=2.0,
+                    target_z=1.0,
+                )
             )
 
         if self.field_type == "extramap2":
             zones.append(
-                {
-                    "id": "EXTRAMAP2_FIELD",
-                    "shape": "rect",
-                    "x_min": 0.0,
-                    "x_max": 3.0,
-                    "z_min": 0.0,
-                    "z_max": 2.0,
-                    "color": "#607D8B",
-                    "target_point": {"x": 1.5, "z": 1.0},
-                }
+                RectZone(
+                    id="EXTRAMAP2_FIELD",
+                    x_min=0.0,
+                    x_max=3.0,
+                    z_min=0.0,
+                    z_max=2.0,
+                    color="#607D8B",
+                    target_x=1.5,
+                    target_z=1.0,
+                )
             )
 
         return zones
 
+    def _rebuild_zones(self):
+        """Set zones, their lookup index and the field summary for this configuration.
+
+        The three are built once per distinct configuration and shared by
+        every TargetArea that loads it (they are never mutated).
+        """
+        key = (self.field_type, self.min_distance, self.max_distance, self.zone_width)
+        cached = _FIELD_CACHE.get(key)
+        if cached is None:
+            zones = tuple(self._calculate_zones())
+            cached = (zones, _ZoneIndex(zones), self._summarize_field(zones))
+            _FIELD_CACHE.put(key, cached)
+        zones, self._zone_index, self._field_summary = cached
+        self.zones = list(zones)
+
     def get_zone_for_position(self, x, z):
-        landing_r = math.sqrt(x**2 + z**2)
-        landing_azimuth = math.degrees(math.atan2(x, z))
+        """Index of the first zone containing (x, z), or -1."""
+        return self._zone_index.lookup(x, z)
 
-        for i, zone_def in enumerate(self.zones):
-            if not isinstance(zone_def, dict):
-                continue
-            shape = zone_def.get("shape")
-            if shape == "sector":
-                if zone_def.get("r_min", -float("inf")) <= landing_r < zone_def.get(
-                    "r_max", float("inf")
-                ) and zone_def.get("az_min", -180) <= landing_azimuth < zone_def.get(
-                    "az_max", 180
-                ):
-                    return i
-            elif shape == "rect":
-                if zone_def.get("x_min", -float("inf")) <= x < zone_def.get(
-                    "x_max", float("inf")
-                ) and zone_def.get("z_min", -float("inf")) <= z < zone_def.get(
-                    "z_max", float("inf")
-                ):
-                    return i
-            elif shape == "radial1d":
-                if (
-                    zone_def.get("r_min", -float("inf"))
-                    <= landing_r
-                    < zone_def.get("r_max", float("inf"))
-                ):
-                    return i
-        return -1
+    def get_zones_for_positions(self, xs, zs):
+        """Vectorized get_zone_for_position: int array of zone indices (-1 = none)."""
+        return self._zone_index.lookup_many(xs, zs)
 
     def load_field_configuration(self, field_type="standard"):
         self.field_type = field_type
@@ -435,23 +2929,18 @@ class TargetArea:
             self.max_distance = 3.0
             self.zone_width = 3.0
 
-        self.zones = self._calculate_zones()
+        self._rebuild_zones()
 
-    def get_field_dimensions(self):
+    def _summarize_field(self, zones):
         overall_min_r_val = float("inf")
         overall_max_r_val = float("-inf")
         has_radial_data = False
 
-        if self.zones:
-            for z_def in self.zones:
-                if not isinstance(z_def, dict):
-                    continue
-                if "r_min" in z_def:
-                    overall_min_r_val = min(overall_min_r_val, z_def["r_min"])
-                    has_radial_data = True
-                if "r_max" in z_def:
-                    overall_max_r_val = max(overall_max_r_val, z_def["r_max"])
-                    has_radial_data = True
+        for zone in zones:
+            if isinstance(zone, (RadialZone, SectorZone)):
+                overall_min_r_val = min(overall_min_r_val, zone.r_min)
+                overall_max_r_val = max(overall_max_r_val, zone.r_max)
+                has_radial_data = True
 
         if not has_radial_data or overall_min_r_val == float("inf"):
             if self.field_type == "standard" or self.field_type == "extra1":
@@ -464,16 +2953,34 @@ class TargetArea:
                 overall_min_r_val = 0.0
                 overall_max_r_val = 3.0
 
-        return {
-            "min_distance_overall": overall_min_r_val,
-            "max_distance_overall": overall_max_r_val,
-            "zone_width_radial": (
+        raw_zones_data = [zone.to_dict() for zone in zones]
+        zones_json = json.dumps(raw_zones_data)
+        return FieldSummary(
+            min_distance_overall=overall_min_r_val,
+            max_distance_overall=overall_max_r_val,
+            zone_width_radial=(
                 self.zone_width
                 if (self.field_type == "standard" or self.field_type == "extra1")
                 else None
             ),
-            "field_type": self.field_type,
-            "raw_zones_data": self.zones if self.zones else [],
+            field_type=self.field_type,
+            raw_zones_data=raw_zones_data,
+            zones_json=zones_json,
+            zones_etag=hashlib.sha1(zones_json.encode("utf-8")).hexdigest()[:16],
+        )
+
+    def get_field_summary(self):
+        """Cached FieldSummary of the current configuration."""
+        return self._field_summary
+
+    def get_field_dimensions(self):
+        summary = self._field_summary
+        return {
+            "min_distance_overall": summary.min_distance_overall,
+            "max_distance_overall": summary.max_distance_overall,
+            "zone_width_radial": summary.zone_width_radial,
+            "field_type": summary.field_type,
+            "raw_zones_data": summary.raw_zones_data,
         }
 
     def set_field_dimensions(
@@ -484,7 +2991,7 @@ class TargetArea:
         self.zone_width = zone_width
         self.field_type = field_type
         self.custom_zones = []
-        self.zones = self._calculate_zones()
+        self._rebuild_zones()
 
 
 class StrikerSettings:
@@ -591,108 +3098,941 @@ class FieldSettings:
         self.robot_orientation_yaw = 0.0
 
 
-class Simulation:
-    def __init__(self):
-        self.ball_physics = BallPhysics()
-        self.target_area = TargetArea()
-        self.striker_settings = StrikerSettings()
-        self.field_settings = FieldSettings()
-        self.trajectory_x, self.trajectory_y, self.trajectory_z = [], [], []
-        self.landing_position = (0.0, 0.0)
-        self.landing_distance_radial = 0.0
-        self.target_zone = -1
-        self.fall_y, self.fall_times = [], []
-        self.strike_time = 0.0
-        self.ideal_trajectory_x, self.ideal_trajectory_y, self.ideal_trajectory_z = (
-            [],
-            [],
-            [],
+@dataclass(frozen=True)
+class PhysicsConfig:
+    """Immutable physics parameters for one request."""
+
+    gravity: float = 9.81
+    ball_mass: float = 0.024
+    elasticity: float = 0.4
+    air_density: float = 1.225
+    drag_coefficient: float = 0.67
+    integrator: str = "euler"
+    wind: tuple = (0.0, 0.0, 0.0)
+    spin: tuple = (0.0, 0.0, 0.0)
+    magnus_coefficient: float = 1.0
+    max_bounces: int = 0
+    ground_friction: float = 0.3
+    rolling_resistance: float = 0.1
+    landing_point: str = "first_contact"
+
+    def make_ball_physics(self):
+        """A private BallPhysics for this config that shares the global caches.
+
+        Cache keys include every physics parameter, so requests with
+        different physics can share the caches safely.
+        """
+        return BallPhysics(
+            gravity=self.gravity,
+            ball_mass=self.ball_mass,
+            elasticity=self.elasticity,
+            air_density=self.air_density,
+            drag_coefficient=self.drag_coefficient,
+            landing_cache=SHARED_LANDING_CACHE,
+            trajectory_cache=SHARED_TRAJECTORY_CACHE,
+            integrator=self.integrator,
+            wind=self.wind,
+            spin=self.spin,
+            magnus_coefficient=self.magnus_coefficient,
+            max_bounces=self.max_bounces,
+            ground_friction=self.ground_friction,
+            rolling_resistance=self.rolling_resistance,
+            landing_point=self.landing_point,
+        )
+
+
+@dataclass(frozen=True)
+class ShotConfig:
+    """Immutable striker inputs for one request."""
+
+    release_height: float = 2.0
+    strike_height: float = 0.35
+    strike_angle_elevation: float = 45.0
+    strike_azimuth_angle: float = 0.0
+    strike_velocity: float = 4.4
+
+
+@dataclass(frozen=True)
+class NoiseModel:
+    """Striker jitter for Simulation.monte_carlo (standard deviations of normal noise)."""
+
+    voltage_std: float = 0.1  # V
+    elevation_std: float = 0.5  # deg
+    azimuth_std: float = 0.5  # deg
+    # ความคลาดเคลื่อนของจังหวะตี (delay_time) ทำให้ตีลูกที่ความสูงต่างไปจาก strike_height
+    timing_std: float = 0.005  # s
+
+
+# cache ที่ใช้ร่วมกันระหว่าง request ทั้งหมด (ดู PhysicsConfig.make_ball_physics)
+SHARED_LANDING_CACHE = LRUCache(maxsize=4096)
+SHARED_TRAJECTORY_CACHE = LRUCache(maxsize=64)
+
+
+def shared_cache_stats():
+    return {
+        "landing": SHARED_LANDING_CACHE.stats(),
+        "trajectory": SHARED_TRAJECTORY_CACHE.stats(),
+    }
+
+
+def _landing_batch_chunk(
+    ball_physics, release_h, strike_h, velocities, elevations, azimuths
+):
+    """Process-pool worker for Simulation._evaluate_landing_grid.
+
+    Lives at module level so ProcessPoolExecutor can pickle it.
+    """
+    land_x, land_z, _ = ball_physics.calculate_landing_batch(
+        release_h, velocities, elevations, azimuths, strike_h
+    )
+    return land_x, land_z
+
+
+class Simulation:
+    # จำนวนชิ้นขั้นต่ำของ grid เมื่อมีการรายงานความคืบหน้า (ดู _evaluate_landing_grid)
+    GRID_PROGRESS_CHUNKS = 20
+    # Levenberg-Marquardt ของรอบปรับละเอียด (ดู _iter_levenberg_marquardt)
+    LM_MAX_ITERATIONS = 20
+    LM_TOLERANCE = 1e-4  # m
+    LM_INITIAL_DAMPING = 1e-3
+    # ค้นหาแบบ optimize_hit_probability: กริดของช็อตปกติ แล้วคัดด้วย Monte Carlo สองรอบ
+    HIT_SEARCH_AZIMUTH_STEP = 2.0  # deg
+    HIT_SEARCH_VOLTAGE_STEP = 0.2  # V
+    HIT_SEARCH_PER_ELEVATION = 6  # ช็อตที่ลึกในโซนที่สุดต่อมุมเงย ที่ส่งเข้ารอบคัดกรอง
+    HIT_SEARCH_SCREEN_SAMPLES = 256
+    HIT_SEARCH_FINALISTS = 6
+    HIT_SEARCH_REFINE_ROUNDS = 4
+
+    def __init__(self, ball_physics=None, target_area=None):
+        self.ball_physics = ball_physics if ball_physics is not None else BallPhysics()
+        self.target_area = target_area if target_area is not None else TargetArea()
+        self.striker_settings = StrikerSettings()
+        self.field_settings = FieldSettings()
+        self.trajectory_x, self.trajectory_y, self.trajectory_z = [], [], []
+        self.landing_position = (0.0, 0.0)
+        self.landing_distance_radial = 0.0
+        self.first_contact_position = (0.0, 0.0)
+        self.rest_position = (0.0, 0.0)
+        self.bounce_count = 0
+        self.target_zone = -1
+        self.fall_y, self.fall_times = [], []
+        self.strike_time = 0.0
+        self.ideal_trajectory_x, self.ideal_trajectory_y, self.ideal_trajectory_z = (
+            [],
+            [],
+            [],
+        )
+        self.ideal_landing_position = (0.0, 0.0)
+        self.show_ideal_comparison = False
+        self.air_density = 1.225
+        self.drag_coefficient = 0.67
+        # ProcessPoolExecutor ที่ใช้แบ่งการคำนวณ grid (None = คำนวณในโปรเซสเดียว)
+        self.grid_executor = None
+        self.grid_workers = 1
+
+    @classmethod
+    def from_configs(
+        cls, shot, physics, target_area=None, grid_executor=None, grid_workers=1
+    ):
+        """Build a request-private Simulation from immutable configs.
+
+        Only read-only objects are shared with other requests: the target
+        area, the process pool, the landing caches and the landing tables.
+        """
+        sim = cls(ball_physics=physics.make_ball_physics(), target_area=target_area)
+        sim.striker_settings.release_height = shot.release_height
+        sim.striker_settings.strike_height = shot.strike_height
+        sim.striker_settings.strike_angle_elevation = shot.strike_angle_elevation
+        sim.striker_settings.strike_azimuth_angle = shot.strike_azimuth_angle
+        sim.striker_settings.strike_velocity = shot.strike_velocity
+        sim.air_density = physics.air_density
+        sim.drag_coefficient = physics.drag_coefficient
+        if grid_executor is not None:
+            sim.set_grid_executor(grid_executor, grid_workers)
+        return sim
+
+    def set_grid_executor(self, executor, workers):
+        """Use a shared process pool for grid searches, split into `workers` chunks."""
+        self.grid_executor = executor
+        self.grid_workers = max(1, int(workers))
+
+    def start_simulation(self):
+        valid, message = self.striker_settings.validate_settings()
+        if not valid:
+            return False, message
+
+        vel = self.striker_settings.strike_velocity
+        if vel <= 0 and self.striker_settings.striker_power > 0:
+            vel = self.striker_settings.convert_power_to_velocity()
+        elif vel <= 0:
+            vel = self.striker_settings.velocity_min
+
+        self.ball_physics.air_density = self.air_density
+        self.ball_physics.drag_coefficient = self.drag_coefficient
+
+        self.trajectory_x, self.trajectory_y, self.trajectory_z, times = (
+            self.ball_physics.calculate_trajectory(
+                self.striker_settings.release_height,
+                vel,
+                self.striker_settings.strike_angle_elevation,
+                self.striker_settings.strike_azimuth_angle,
+                self.striker_settings.strike_height,
+            )
+        )
+        self.strike_time = float(times[-1]) if len(times) else 0.0
+        if self.ball_physics.max_bounces > 0:
+            first_x, first_z, self.strike_time, rest_x, rest_z, _, self.bounce_count = (
+                self.ball_physics.calculate_bounces(
+                    self.striker_settings.release_height,
+                    vel,
+                    self.striker_settings.strike_angle_elevation,
+                    self.striker_settings.strike_azimuth_angle,
+                    self.striker_settings.strike_height,
+                )
+            )
+            self.first_contact_position = (first_x, first_z)
+            self.rest_position = (rest_x, rest_z)
+            land_x, land_z = (
+                self.rest_position
+                if self.ball_physics.landing_point == "rest"
+                else self.first_contact_position
+            )
+            self.landing_position = (land_x, land_z)
+            self.landing_distance_radial = math.sqrt(land_x**2 + land_z**2)
+        elif len(self.trajectory_x):
+            land_x, land_z = float(self.trajectory_x[-1]), float(self.trajectory_z[-1])
+            self.landing_position = (land_x, land_z)
+            self.landing_distance_radial = math.sqrt(land_x**2 + land_z**2)
+            self.first_contact_position = self.rest_position = self.landing_position
+            self.bounce_count = 0
+        else:
+            land_x, land_z = 0.0, 0.0
+            self.landing_position = (0.0, 0.0)
+            self.landing_distance_radial = 0.0
+
+        self.target_zone = self.target_area.get_zone_for_position(land_x, land_z)
+        zone_name = "None"
+        if self.target_zone >= 0 and self.target_zone < len(self.target_area.zones):
+            zone_name = self.target_area.zones[self.target_zone].id
+        msg_out = f"Landed at (x={land_x:.2f}, z={land_z:.2f})m. Radial: {self.landing_distance_radial:.2f}m. Zone: {zone_name}"
+
+        if self.show_ideal_comparison:
+            (
+                self.ideal_trajectory_x,
+                self.ideal_trajectory_y,
+                self.ideal_trajectory_z,
+                _,
+            ) = self.ball_physics.calculate_trajectory_ideal(
+                self.striker_settings.release_height,
+                vel,
+                self.striker_settings.strike_angle_elevation,
+                self.striker_settings.strike_azimuth_angle,
+                self.striker_settings.strike_height,
+            )
+            self.ideal_landing_position = (
+                (float(self.ideal_trajectory_x[-1]), float(self.ideal_trajectory_z[-1]))
+                if len(self.ideal_trajectory_x)
+                else (0.0, 0.0)
+            )
+        return True, msg_out
+
+    def toggle_ideal_comparison(self, show_comparison):
+        self.show_ideal_comparison = show_comparison
+
+    def reset_simulation(self):
+        self.trajectory_x, self.trajectory_y, self.trajectory_z = [], [], []
+        self.landing_position = (0.0, 0.0)
+        self.landing_distance_radial = 0.0
+        self.first_contact_position = (0.0, 0.0)
+        self.rest_position = (0.0, 0.0)
+        self.bounce_count = 0
+        self.target_zone = -1
+        self.ideal_trajectory_x, self.ideal_trajectory_y, self.ideal_trajectory_z = (
+            [],
+            [],
+            [],
+        )
+        self.ideal_landing_position = (0.0, 0.0)
+        return True, "Simulation reset"
+
+    def _grid_chunk_count(self, cells_total, progress):
+        """How many slices to split a grid of cells_total points into."""
+        n_chunks = self.grid_workers if self.grid_executor is not None else 1
+        if progress:
+            n_chunks = max(n_chunks, self.GRID_PROGRESS_CHUNKS)
+        return max(1, min(n_chunks, cells_total))
+
+    def _iter_landing_grid(
+        self, release_h, strike_h, az_grid, el_grid, vel_grid, n_chunks
+    ):
+        """Yield (start, stop, land_x, land_z) for slices of the flattened grid.
+
+        Slices are yielded as they finish; with a grid executor they run in
+        parallel, so the order is not guaranteed. Unfinished slices are
+        cancelled if the caller stops iterating early.
+        """
+        vel_flat, el_flat, az_flat = vel_grid.ravel(), el_grid.ravel(), az_grid.ravel()
+        bounds = np.linspace(0, vel_flat.size, n_chunks + 1).astype(int)
+        slices = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        if self.grid_executor is None or n_chunks < 2:
+            for start, stop in slices:
+                land_x, land_z = _landing_batch_chunk(
+                    self.ball_physics,
+                    release_h,
+                    strike_h,
+                    vel_flat[start:stop],
+                    el_flat[start:stop],
+                    az_flat[start:stop],
+                )
+                yield start, stop, land_x, land_z
+            return
+
+        futures = {
+            self.grid_executor.submit(
+                _landing_batch_chunk,
+                self.ball_physics,
+                release_h,
+                strike_h,
+                vel_flat[start:stop],
+                el_flat[start:stop],
+                az_flat[start:stop],
+            ): (start, stop)
+            for start, stop in slices
+        }
+        try:
+            for future in as_completed(futures):
+                start, stop = futures[future]
+                land_x, land_z = future.result()
+                # worker process นับเองไม่ได้ จึงนับแทนที่นี่
+                _count_integrations(stop - start)
+                yield start, stop, land_x, land_z
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _evaluate_landing_grid(
+        self, release_h, strike_h, az_range, el_range, vel_range, on_chunk=None
+    ):
+        """Landing x/z over the full az x el x vel grid.
+
+        Returns (az_grid, el_grid, vel_grid, land_x, land_z), all shaped
+        (n_az, n_el, n_vel). When a grid executor is set, the flattened grid
+        is split into grid_workers chunks that run in parallel.
+
+        If on_chunk is given, the grid is split into at least
+        GRID_PROGRESS_CHUNKS pieces. on_chunk(cells_done, cells_total,
+        velocities, elevations, azimuths, land_x, land_z) is called as each
+        piece finishes, in completion order.
+        """
+        az_grid, el_grid, vel_grid = np.meshgrid(
+            az_range, el_range, vel_range, indexing="ij"
+        )
+        cells_total = az_grid.size
+        land_x = np.empty(cells_total)
+        land_z = np.empty(cells_total)
+        cells_done = 0
+        for start, stop, chunk_x, chunk_z in self._iter_landing_grid(
+            release_h,
+            strike_h,
+            az_grid,
+            el_grid,
+            vel_grid,
+            self._grid_chunk_count(cells_total, on_chunk is not None),
+        ):
+            land_x[start:stop] = chunk_x
+            land_z[start:stop] = chunk_z
+            cells_done += stop - start
+            if on_chunk is not None:
+                on_chunk(
+                    cells_done,
+                    cells_total,
+                    vel_grid.ravel()[start:stop],
+                    el_grid.ravel()[start:stop],
+                    az_grid.ravel()[start:stop],
+                    chunk_x,
+                    chunk_z,
+                )
+        return (
+            az_grid,
+            el_grid,
+            vel_grid,
+            land_x.reshape(az_grid.shape),
+            land_z.reshape(az_grid.shape),
+        )
+
+    def _iter_grid_improvements(
+        self,
+        best_params,
+        target_x,
+        target_z,
+        release_h,
+        strike_h,
+        az_range,
+        el_range,
+        vel_range,
+        progress=False,
+    ):
+        """Search an az x el x vel grid, updating best_params in place.
+
+        Yields (cells_done, cells_total) each time a finished slice improves
+        best_params. Ties are broken by grid position, so the final point is
+        the first minimum of the whole grid whatever order the slices finish
+        in, i.e. the same point the nested az/el/vel loops would have kept.
+        """
+        az_grid, el_grid, vel_grid = np.meshgrid(
+            az_range, el_range, vel_range, indexing="ij"
+        )
+        cells_total = az_grid.size
+        incoming_error = best_params["error"]
+        grid_best = None  # (error, flat index) ของจุดที่ดีที่สุดใน grid นี้
+        cells_done = 0
+        for start, stop, land_x, land_z in self._iter_landing_grid(
+            release_h,
+            strike_h,
+            az_grid,
+            el_grid,
+            vel_grid,
+            self._grid_chunk_count(cells_total, progress),
+        ):
+            cells_done += stop - start
+            errors = np.sqrt((land_x - target_x) ** 2 + (land_z - target_z) ** 2)
+            i = int(np.argmin(errors))
+            candidate = (errors[i], start + i)
+            if grid_best is not None and candidate >= grid_best:
+                continue
+            grid_best = candidate
+            if errors[i] >= incoming_error:
+                continue
+            best_params.update(
+                {
+                    "error": errors[i],
+                    "azimuth_angle": az_grid.flat[start + i],
+                    "elevation_angle": el_grid.flat[start + i],
+                    "velocity": vel_grid.flat[start + i],
+                    "landing_x": land_x[i],
+                    "landing_z": land_z[i],
+                }
+            )
+            yield cells_done, cells_total
+
+    def _collect_grid_candidates(
+        self, target_x, target_z, tolerance, release_h, strike_h, grid
+    ):
+        """Return every grid point within tolerance, with elevation rounded to 5 deg.
+
+        `grid` is the tuple returned by _evaluate_landing_grid, so several
+        tolerance passes can share one grid evaluation. Points whose rounded
+        elevation moves the landing outside the tolerance are dropped.
+        Candidates come back in az/el/vel grid order.
+        """
+        az_flat, el_flat, vel_flat, land_x, land_z = (a.ravel() for a in grid)
+        errors = np.sqrt((land_x - target_x) ** 2 + (land_z - target_z) ** 2)
+        hits = np.flatnonzero(errors < tolerance)
+
+        rounded_elevations = []
+        for i in hits:
+            # ปัดมุมเงยให้เป็นทวีคูณของ 5 องศาที่ใกล้ที่สุด
+            rounded_elevation = round(el_flat[i] / 5) * 5
+            if rounded_elevation < self.striker_settings.angle_elevation_min:
+                rounded_elevation = self.striker_settings.angle_elevation_min
+            elif rounded_elevation > self.striker_settings.angle_elevation_max:
+                rounded_elevation = self.striker_settings.angle_elevation_max
+            rounded_elevations.append(rounded_elevation)
+
+        # คำนวณใหม่ด้วยมุมเงยที่ปัดแล้ว (ทั้งหมดในครั้งเดียว)
+        resim = [
+            j for j, i in enumerate(hits) if rounded_elevations[j] != el_flat[i]
+        ]
+        resim_landing = {}
+        if resim:
+            resim_idx = hits[resim]
+            rx, rz, _ = self.ball_physics.calculate_landing_batch(
+                release_h,
+                vel_flat[resim_idx],
+                [rounded_elevations[j] for j in resim],
+                az_flat[resim_idx],
+                strike_h,
+            )
+            for k, j in enumerate(resim):
+                resim_landing[j] = (rx[k], rz[k])
+
+        candidates = []
+        for j, i in enumerate(hits):
+            if j in resim_landing:
+                cand_x, cand_z = resim_landing[j]
+                cand_error = math.sqrt(
+                    (cand_x - target_x) ** 2 + (cand_z - target_z) ** 2
+                )
+                # ใช้ค่าที่ปัดแล้วถ้ายังอยู่ใน tolerance
+                if cand_error >= tolerance:
+                    continue
+            else:
+                cand_x, cand_z, cand_error = land_x[i], land_z[i], errors[i]
+            candidates.append(
+                {
+                    "elevation_angle": rounded_elevations[j],
+                    "azimuth_angle": az_flat[i],
+                    "velocity": vel_flat[i],
+                    "required_voltage": self.striker_settings.convert_velocity_to_power(
+                        vel_flat[i]
+                    ),
+                    "error": cand_error,
+                    "landing_x": cand_x,
+                    "landing_z": cand_z,
+                }
+            )
+        return candidates
+
+    def get_landing_table(self, rebuild=False):
+        return LandingTable.get(
+            self.ball_physics,
+            self.striker_settings,
+            self.striker_settings.release_height,
+            self.striker_settings.strike_height,
+            rebuild=rebuild,
+        )
+
+    def rebuild_landing_table(self):
+        """Recompute the landing table after gravity, drag_coefficient or air_density change."""
+        self.ball_physics.air_density = self.air_density
+        self.ball_physics.drag_coefficient = self.drag_coefficient
+        return self.get_landing_table(rebuild=True)
+
+    def _optimize_with_table(self, target_x, target_z, fixed_params):
+        """Answer an optimize request from the landing table.
+
+        Only legal elevations are searched, so no post-hoc rounding is needed.
+        The chosen shot is re-simulated once to report its true landing point.
+        Returns None when a fixed parameter lies outside the table, or when
+        the physics is not tabulated (LandingTable.is_tabulated).
+        """
+        if not LandingTable.is_tabulated(self.ball_physics):
+            return None
+        table = self.get_landing_table()
+        if "elevation_angle" in fixed_params:
+            el_idx = table.elevation_index(fixed_params["elevation_angle"])
+            if el_idx is None:
+                return None
+            el_indices = np.array([el_idx])
+        else:
+            el_indices = np.arange(table.elevations.size)
+        if not table.covers(
+            fixed_params.get("velocity"), fixed_params.get("azimuth_angle")
+        ):
+            return None
+
+        vel_nodes = (
+            np.array([fixed_params["velocity"]], dtype=float)
+            if "velocity" in fixed_params
+            else table.velocities
+        )
+        az_nodes = (
+            np.array([fixed_params["azimuth_angle"]], dtype=float)
+            if "azimuth_angle" in fixed_params
+            else table.azimuths
+        )
+
+        # ค้นหาหยาบบนทุกจุดของตาราง แยกตามมุมเงยแต่ละค่า
+        if "velocity" in fixed_params or "azimuth_angle" in fixed_params:
+            land_x, land_z = table.interpolate(
+                el_indices[:, None, None],
+                vel_nodes[None, :, None],
+                az_nodes[None, None, :],
+            )
+        else:
+            land_x = table.data[el_indices, :, :, 0]
+            land_z = table.data[el_indices, :, :, 1]
+        errors = np.hypot(land_x - target_x, land_z - target_z)
+        vel_i, az_i = np.unravel_index(
+            errors.reshape(el_indices.size, -1).argmin(axis=1),
+            (vel_nodes.size, az_nodes.size),
+        )
+
+        # ปรับละเอียดรอบจุดที่ดีที่สุดของแต่ละมุมเงย (±1 ช่องของตาราง)
+        offsets = np.linspace(-1.0, 1.0, 41)
+        if "velocity" in fixed_params:
+            vel_fine = vel_nodes[vel_i][:, None]
+        else:
+            vel_fine = np.clip(
+                vel_nodes[vel_i][:, None]
+                + offsets * (table.velocities[1] - table.velocities[0]),
+                table.velocities[0],
+                table.velocities[-1],
+            )
+        if "azimuth_angle" in fixed_params:
+            az_fine = az_nodes[az_i][:, None]
+        else:
+            az_fine = np.clip(
+                az_nodes[az_i][:, None]
+                + offsets * (table.azimuths[1] - table.azimuths[0]),
+                table.azimuths[0],
+                table.azimuths[-1],
+            )
+        land_x, land_z = table.interpolate(
+            el_indices[:, None, None], vel_fine[:, :, None], az_fine[:, None, :]
+        )
+        errors = np.hypot(land_x - target_x, land_z - target_z)
+        e, i, j = np.unravel_index(np.argmin(errors), errors.shape)
+
+        elevation = float(table.elevations[el_indices[e]])
+        velocity = float(vel_fine[e, i])
+        azimuth = float(az_fine[e, j])
+        land_x, land_z, _ = self.ball_physics.calculate_landing(
+            self.striker_settings.release_height,
+            velocity,
+            elevation,
+            azimuth,
+            self.striker_settings.strike_height,
+        )
+        best_params = {
+            "elevation_angle": elevation,
+            "velocity": velocity,
+            "azimuth_angle": azimuth,
+            "error": math.sqrt((land_x - target_x) ** 2 + (land_z - target_z) ** 2),
+            "landing_x": land_x,
+            "landing_z": land_z,
+            "solver": "table",
+        }
+
+        tolerance = 0.05
+        if best_params["error"] < tolerance:
+            best_params["required_voltage"] = (
+                self.striker_settings.convert_velocity_to_power(velocity)
+            )
+            return True, best_params
+        return False, (
+            f"Could not find optimal parameters within {tolerance*100:.0f}cm. "
+            f"Best error: {best_params['error']:.2f}m. "
+            f"Params: Az:{azimuth:.1f}, El:{elevation:.1f}, Vel:{velocity:.1f}"
+        )
+
+    def _optimize_analytic(self, target_x, target_z, fixed_params):
+        """Solve for the shot directly instead of searching a grid.
+
+        Drag acts along the velocity, so a shot stays in the vertical plane of
+        its azimuth and the azimuth is just atan2(target_x, target_z). For each
+        legal elevation the landing distance along that line increases with
+        velocity, so velocity is found by an Illinois (regula falsi) root
+        search on calculate_landing.
+
+        Wind and Magnus lift push the ball out of that plane, so with either
+        set the root-search result is only a starting point: azimuth and
+        velocity are then polished with Levenberg-Marquardt at each elevation.
+        """
+        settings = self.striker_settings
+        release_h = settings.release_height
+        strike_h = settings.strike_height
+        tolerance = 0.05
+
+        if "elevation_angle" in fixed_params:
+            elevations = [fixed_params["elevation_angle"]]
+        else:
+            elevations = np.arange(
+                settings.angle_elevation_min,
+                settings.angle_elevation_max + 1e-9,
+                5.0,
+            ).tolist()
+
+        if "azimuth_angle" in fixed_params:
+            azimuth = fixed_params["azimuth_angle"]
+        else:
+            azimuth = math.degrees(math.atan2(target_x, target_z))
+            azimuth = min(max(azimuth, settings.azimuth_angle_min), settings.azimuth_angle_max)
+        az_rad = math.radians(azimuth)
+        sin_az, cos_az = math.sin(az_rad), math.cos(az_rad)
+        # ระยะของเป้าหมายตามแนวทิศที่ยิง
+        target_along = target_x * sin_az + target_z * cos_az
+
+        evaluations = 0
+
+        def land(vel, el):
+            nonlocal evaluations
+            evaluations += 1
+            lx, lz, _ = self.ball_physics.calculate_landing(
+                release_h, vel, el, azimuth, strike_h
+            )
+            return lx * sin_az + lz * cos_az - target_along, lx, lz
+
+        best_params = None
+        for el in elevations:
+            if "velocity" in fixed_params:
+                vel = fixed_params["velocity"]
+                _, lx, lz = land(vel, el)
+            else:
+                a, b = settings.velocity_min, settings.velocity_max
+                fa, lx_a, lz_a = land(a, el)
+                fb, lx_b, lz_b = land(b, el)
+                if fa >= 0:  # ใกล้กว่าระยะต่ำสุดที่ยิงได้
+                    vel, lx, lz = a, lx_a, lz_a
+                elif fb <= 0:  # ไกลเกินระยะสูงสุดที่ยิงได้
+                    vel, lx, lz = b, lx_b, lz_b
+                else:
+                    side = 0
+                    for _ in range(20):
+                        vel = (a * fb - b * fa) / (fb - fa)
+                        fc, lx, lz = land(vel, el)
+                        if abs(fc) < 1e-4:
+                            break
+                        if fc * fb > 0:
+                            b, fb = vel, fc
+                            if side == -1:
+                                fa /= 2
+                            side = -1
+                        else:
+                            a, fa = vel, fc
+                            if side == 1:
+                                fb /= 2
+                            side = 1
+
+            candidate = {
+                "elevation_angle": el,
+                "velocity": vel,
+                "azimuth_angle": azimuth,
+                "error": math.sqrt((lx - target_x) ** 2 + (lz - target_z) ** 2),
+                "landing_x": lx,
+                "landing_z": lz,
+                "solver": "analytic",
+            }
+            if self.ball_physics._has_wind_or_spin():
+                for _ in self._iter_levenberg_marquardt(
+                    candidate,
+                    target_x,
+                    target_z,
+                    release_h,
+                    strike_h,
+                    {**fixed_params, "elevation_angle": el},
+                ):
+                    pass
+                del candidate["refine_iterations"]
+                evaluations += candidate.pop("refine_evaluations")
+            if best_params is None or candidate["error"] < best_params["error"]:
+                best_params = candidate
+
+        best_params["evaluations"] = evaluations
+        if best_params["error"] < tolerance:
+            best_params["required_voltage"] = settings.convert_velocity_to_power(
+                best_params["velocity"]
+            )
+            return True, best_params
+        return False, (
+            f"Could not find optimal parameters within {tolerance*100:.0f}cm. "
+            f"Best error: {best_params['error']:.2f}m. "
+            f"Params: Az:{best_params['azimuth_angle']:.1f}, El:{best_params['elevation_angle']:.1f}, Vel:{best_params['velocity']:.1f}"
+        )
+
+    def _iter_levenberg_marquardt(
+        self, best_params, target_x, target_z, release_h, strike_h, fixed_params
+    ):
+        """Refine best_params in place with Levenberg-Marquardt.
+
+        Solves landing(az, el, vel) = target over the parameters that are not
+        fixed, clamped to the StrikerSettings bounds. The Jacobian comes from
+        the sensitivity equations integrated alongside each landing, so every
+        iterate costs a single calculate_landing. Yields (iteration,
+        evaluations) after every accepted step, and stores refine_iterations
+        and refine_evaluations in best_params when done.
+        """
+        settings = self.striker_settings
+        names = [
+            name
+            for name in ("azimuth_angle", "elevation_angle", "velocity")
+            if name not in fixed_params
+        ]
+        bounds = {
+            "azimuth_angle": (settings.azimuth_angle_min, settings.azimuth_angle_max),
+            "elevation_angle": (
+                settings.angle_elevation_min,
+                settings.angle_elevation_max,
+            ),
+            "velocity": (settings.velocity_min, settings.velocity_max),
+        }
+        lower = np.array([bounds[name][0] for name in names], dtype=float)
+        upper = np.array([bounds[name][1] for name in names], dtype=float)
+        # คอลัมน์ของ Jacobian จาก calculate_landing เรียงเป็น (velocity, elevation, azimuth)
+        columns = [
+            {"velocity": 0, "elevation_angle": 1, "azimuth_angle": 2}[name]
+            for name in names
+        ]
+        target = np.array([target_x, target_z])
+
+        def land(point):
+            shot = {
+                name: float(best_params[name])
+                for name in ("azimuth_angle", "elevation_angle", "velocity")
+            }
+            shot.update(zip(names, point.tolist()))
+            land_x, land_z, _, jacobian = self.ball_physics.calculate_landing(
+                release_h,
+                shot["velocity"],
+                shot["elevation_angle"],
+                shot["azimuth_angle"],
+                strike_h,
+                with_sensitivities=True,
+            )
+            return np.array([land_x, land_z]), np.array(jacobian)[:, columns]
+
+        point = np.clip(
+            np.array([float(best_params[name]) for name in names]), lower, upper
         )
-        self.ideal_landing_position = (0.0, 0.0)
-        self.show_ideal_comparison = False
-        self.air_density = 1.225
-        self.drag_coefficient = 0.67
+        iteration = 0
+        evaluations = 0
+        if names:
+            landing, jacobian = land(point)
+            residual = landing - target
+            evaluations += 1
+            cost = float(residual @ residual)
+            damping = self.LM_INITIAL_DAMPING
+            while (
+                iteration < self.LM_MAX_ITERATIONS
+                and math.sqrt(cost) > self.LM_TOLERANCE
+                and damping < 1e8
+            ):
+                normal = jacobian.T @ jacobian
+                scaling = np.maximum(np.diag(normal), 1e-12)
+                step = np.linalg.solve(
+                    normal + damping * np.diag(scaling), -jacobian.T @ residual
+                )
+                candidate = np.clip(point + step, lower, upper)
+                if np.allclose(candidate, point, rtol=0.0, atol=1e-9):
+                    break
+                candidate_landing, candidate_jacobian = land(candidate)
+                evaluations += 1
+                candidate_residual = candidate_landing - target
+                candidate_cost = float(candidate_residual @ candidate_residual)
+                if candidate_cost >= cost:
+                    damping *= 4.0
+                    continue
 
-    def start_simulation(self):
-        valid, message = self.striker_settings.validate_settings()
-        if not valid:
-            return False, message
+                iteration += 1
+                damping = max(damping / 3.0, 1e-12)
+                # หยุดเมื่อแทบไม่ดีขึ้นแล้ว (เช่นเป้าหมายอยู่นอกช่วงที่ยิงได้และชนขอบ)
+                stalled = math.sqrt(cost) - math.sqrt(candidate_cost) < self.LM_TOLERANCE * 0.01
+                point, landing = candidate, candidate_landing
+                residual, jacobian = candidate_residual, candidate_jacobian
+                cost = candidate_cost
+                if math.sqrt(cost) < best_params["error"]:
+                    best_params.update(dict(zip(names, point.tolist())))
+                    best_params.update(
+                        {
+                            "error": math.sqrt(cost),
+                            "landing_x": float(landing[0]),
+                            "landing_z": float(landing[1]),
+                        }
+                    )
+                    yield iteration, evaluations
+                if stalled:
+                    break
 
-        vel = self.striker_settings.strike_velocity
-        if vel <= 0 and self.striker_settings.striker_power > 0:
-            vel = self.striker_settings.convert_power_to_velocity()
-        elif vel <= 0:
-            vel = self.striker_settings.velocity_min
+        best_params["refine_iterations"] = iteration
+        best_params["refine_evaluations"] = evaluations
 
-        self.ball_physics.air_density = self.air_density
-        self.ball_physics.drag_coefficient = self.drag_coefficient
+    def _round_best_elevation(
+        self, best_params, target_x, target_z, release_h, strike_h
+    ):
+        """Snap best_params to the nearest legal 5 deg elevation and re-simulate."""
+        # ปัดมุมเงยให้เป็นทวีคูณของ 5 องศาที่ใกล้ที่สุด
+        original_elevation = best_params["elevation_angle"]
+        rounded_elevation = round(original_elevation / 5) * 5
+        # ตรวจสอบว่าค่าที่ปัดแล้วยังอยู่ในช่วงที่อนุญาตหรือไม่
+        if rounded_elevation < self.striker_settings.angle_elevation_min:
+            rounded_elevation = self.striker_settings.angle_elevation_min
+        elif rounded_elevation > self.striker_settings.angle_elevation_max:
+            rounded_elevation = self.striker_settings.angle_elevation_max
 
-        self.trajectory_x, self.trajectory_y, self.trajectory_z, times = (
-            self.ball_physics.calculate_trajectory(
-                self.striker_settings.release_height,
-                vel,
-                self.striker_settings.strike_angle_elevation,
-                self.striker_settings.strike_azimuth_angle,
-                self.striker_settings.strike_height,
+        # คำนวณใหม่ด้วยมุมเงยที่ปัดแล้ว
+        if rounded_elevation != original_elevation:
+            with timed_stage("rounding"):
+                land_x_rounded, land_z_rounded = self.ball_physics.get_landing_position(
+                    release_h, best_params["velocity"], rounded_elevation,
+                    best_params["azimuth_angle"], strike_h
+                )
+            best_params["elevation_angle"] = rounded_elevation
+            best_params["landing_x"] = land_x_rounded
+            best_params["landing_z"] = land_z_rounded
+            best_params["error"] = math.sqrt(
+                (land_x_rounded - target_x) ** 2 + (land_z_rounded - target_z) ** 2
             )
-        )
-        self.strike_time = times[-1] if times else 0.0
-        if self.trajectory_x:
-            land_x, land_z = self.trajectory_x[-1], self.trajectory_z[-1]
-            self.landing_position = (land_x, land_z)
-            self.landing_distance_radial = math.sqrt(land_x**2 + land_z**2)
-        else:
-            land_x, land_z = 0.0, 0.0
-            self.landing_position = (0.0, 0.0)
-            self.landing_distance_radial = 0.0
 
-        self.target_zone = self.target_area.get_zone_for_position(land_x, land_z)
-        zone_name = "None"
-        if self.target_zone >= 0 and self.target_zone < len(self.target_area.zones):
-            zone_name = self.target_area.zones[self.target_zone].get(
-                "id", f"Zone {self.target_zone + 1}"
-            )
-        msg_out = f"Landed at (x={land_x:.2f}, z={land_z:.2f})m. Radial: {self.landing_distance_radial:.2f}m. Zone: {zone_name}"
+    @staticmethod
+    def _search_event(stage, best_params, **progress):
+        """Progress event of iter_optimal_parameters (plain floats, JSON-ready)."""
+        return {
+            "stage": stage,
+            **progress,
+            "best": {
+                key: float(best_params[key])
+                for key in (
+                    "elevation_angle",
+                    "azimuth_angle",
+                    "velocity",
+                    "error",
+                    "landing_x",
+                    "landing_z",
+                )
+            },
+        }
 
-        if self.show_ideal_comparison:
-            (
-                self.ideal_trajectory_x,
-                self.ideal_trajectory_y,
-                self.ideal_trajectory_z,
-                _,
-            ) = self.ball_physics.calculate_trajectory_ideal(
-                self.striker_settings.release_height,
-                vel,
-                self.striker_settings.strike_angle_elevation,
-                self.striker_settings.strike_azimuth_angle,
-                self.striker_settings.strike_height,
-            )
-            self.ideal_landing_position = (
-                (self.ideal_trajectory_x[-1], self.ideal_trajectory_z[-1])
-                if self.ideal_trajectory_x
-                else (0.0, 0.0)
-            )
-        return True, msg_out
+    def calculate_optimal_parameters(
+        self, target_x, target_z, fixed_params=None, solver="table"
+    ):
+        """Find (elevation, azimuth, velocity) that lands on the target.
 
-    def toggle_ideal_comparison(self, show_comparison):
-        self.show_ideal_comparison = show_comparison
+        solver="table" answers from the precomputed LandingTable and falls
+        back to the brute-force "grid" search when a fixed parameter or the
+        physics is not covered by the table. solver="analytic" root-finds
+        velocity for each legal elevation along the target's azimuth.
+        """
+        for event in self._iter_optimal_parameters(
+            target_x, target_z, fixed_params, solver, progress=False
+        ):
+            pass
+        return event["success"], event["result"]
 
-    def reset_simulation(self):
-        self.trajectory_x, self.trajectory_y, self.trajectory_z = [], [], []
-        self.landing_position = (0.0, 0.0)
-        self.landing_distance_radial = 0.0
-        self.target_zone = -1
-        self.ideal_trajectory_x, self.ideal_trajectory_y, self.ideal_trajectory_z = (
-            [],
-            [],
-            [],
+    def iter_optimal_parameters(
+        self, target_x, target_z, fixed_params=None, solver="table"
+    ):
+        """calculate_optimal_parameters as a generator of progress events.
+
+        The grid search yields a "coarse" event (with cells_done /
+        cells_total) each time the coarse grid finds a better point, then a
+        "refine" event (with iteration / evaluations) for every accepted
+        Levenberg-Marquardt step. Every event carries the best shot so far.
+        The last event is always {"stage": "final", "success", "result"},
+        with result as returned by calculate_optimal_parameters.
+        The table and analytic solvers answer in milliseconds and only yield
+        the final event.
+        """
+        return self._iter_optimal_parameters(
+            target_x, target_z, fixed_params, solver, progress=True
         )
-        self.ideal_landing_position = (0.0, 0.0)
-        return True, "Simulation reset"
 
-    def calculate_optimal_parameters(self, target_x, target_z, fixed_params=None):
+    def _iter_optimal_parameters(
+        self, target_x, target_z, fixed_params, solver, progress
+    ):
         if fixed_params is None:
             fixed_params = {}
+
+        def final(outcome):
+            return {"stage": "final", "success": outcome[0], "result": outcome[1]}
+
+        if solver == "table":
+            with timed_stage("table"):
+                table_result = self._optimize_with_table(
+                    target_x, target_z, fixed_params
+                )
+            if table_result is not None:
+                yield final(table_result)
+                return
+        elif solver == "analytic":
+            with timed_stage("analytic"):
+                outcome = self._optimize_analytic(target_x, target_z, fixed_params)
+            yield final(outcome)
+            return
+        elif solver != "grid":
+            yield final((False, f"Unknown solver: {solver}"))
+            return
+
         best_params = {
             "elevation_angle": self.striker_settings.strike_angle_elevation,
             "velocity": self.striker_settings.strike_velocity,
@@ -700,6 +4040,7 @@ class Simulation:
             "error": float("inf"),
             "landing_x": 0,
             "landing_z": 0,
+            "solver": "grid",
         }
 
         release_h = self.striker_settings.release_height
@@ -744,29 +4085,24 @@ class Simulation:
         el_range = np.linspace(el_min_s, el_max_s, el_steps)
         vel_range = np.linspace(vel_min_s, vel_max_s, vel_steps)
 
-        for az in az_range:
-            cur_az = fixed_params.get("azimuth_angle", az)
-            for el in el_range:
-                cur_el = fixed_params.get("elevation_angle", el)
-                for vel in vel_range:
-                    cur_vel = fixed_params.get("velocity", vel)
-                    land_x, land_z = self.ball_physics.get_landing_position(
-                        release_h, cur_vel, cur_el, cur_az, strike_h
-                    )
-                    error = math.sqrt(
-                        (land_x - target_x) ** 2 + (land_z - target_z) ** 2
-                    )
-                    if error < best_params["error"]:
-                        best_params.update(
-                            {
-                                "error": error,
-                                "azimuth_angle": cur_az,
-                                "elevation_angle": cur_el,
-                                "velocity": cur_vel,
-                                "landing_x": land_x,
-                                "landing_z": land_z,
-                            }
-                        )
+        with timed_stage("coarse_grid"):
+            for cells_done, cells_total in self._iter_grid_improvements(
+                best_params,
+                target_x,
+                target_z,
+                release_h,
+                strike_h,
+                az_range,
+                el_range,
+                vel_range,
+                progress,
+            ):
+                yield self._search_event(
+                    "coarse",
+                    best_params,
+                    cells_done=cells_done,
+                    cells_total=cells_total,
+                )
 
         tolerance = 0.05  # Target 5cm accuracy
         if best_params["error"] < tolerance:
@@ -774,138 +4110,60 @@ class Simulation:
                 best_params["velocity"]
             )
             best_params["required_voltage"] = required_voltage
-
-            # ปัดมุมเงยให้เป็นทวีคูณของ 5 องศาที่ใกล้ที่สุด
-            original_elevation = best_params["elevation_angle"]
-            rounded_elevation = round(original_elevation / 5) * 5
-            # ตรวจสอบว่าค่าที่ปัดแล้วยังอยู่ในช่วงที่อนุญาตหรือไม่
-            if rounded_elevation < self.striker_settings.angle_elevation_min:
-                rounded_elevation = self.striker_settings.angle_elevation_min
-            elif rounded_elevation > self.striker_settings.angle_elevation_max:
-                rounded_elevation = self.striker_settings.angle_elevation_max
-
-            # คำนวณใหม่ด้วยมุมเงยที่ปัดแล้ว
-            if rounded_elevation != original_elevation:
-                land_x_rounded, land_z_rounded = self.ball_physics.get_landing_position(
-                    release_h, best_params["velocity"], rounded_elevation,
-                    best_params["azimuth_angle"], strike_h
-                )
-                best_params["elevation_angle"] = rounded_elevation
-                best_params["landing_x"] = land_x_rounded
-                best_params["landing_z"] = land_z_rounded
-                best_params["error"] = math.sqrt(
-                    (land_x_rounded - target_x) ** 2 + (land_z_rounded - target_z) ** 2
-                )
-
-            return True, best_params
+            self._round_best_elevation(
+                best_params, target_x, target_z, release_h, strike_h
+            )
+            yield final((True, best_params))
+            return
 
         if best_params["error"] < 0.30:
-            # print(f"Refining search. Initial best error: {best_params['error']:.3f}m")
-            refine_steps = 15  # เพิ่มขั้นตอนการปรับแต่งสำหรับความแม่นยำที่ดีขึ้น
-            az_ref_min = best_params["azimuth_angle"] - 1.5
-            az_ref_max = best_params["azimuth_angle"] + 1.5
-            el_ref_min = best_params["elevation_angle"] - 1.5
-            el_ref_max = best_params["elevation_angle"] + 1.5
-            vel_ref_min = best_params["velocity"] - 0.2  # ลดช่วงการค้นหาแต่เพิ่มความละเอียด
-            vel_ref_max = best_params["velocity"] + 0.2
-
-            az_r_range = (
-                np.linspace(az_ref_min, az_ref_max, refine_steps)
-                if "azimuth_angle" not in fixed_params
-                else [best_params["azimuth_angle"]]
-            )
-            el_r_range = (
-                np.linspace(el_ref_min, el_ref_max, refine_steps)
-                if "elevation_angle" not in fixed_params
-                else [best_params["elevation_angle"]]
-            )
-            vel_r_range = (
-                np.linspace(vel_ref_min, vel_ref_max, refine_steps)
-                if "velocity" not in fixed_params
-                else [best_params["velocity"]]
-            )
-
-            az_r_range = np.clip(
-                az_r_range,
-                self.striker_settings.azimuth_angle_min,
-                self.striker_settings.azimuth_angle_max,
-            )
-            el_r_range = np.clip(
-                el_r_range,
-                self.striker_settings.angle_elevation_min,
-                self.striker_settings.angle_elevation_max,
-            )
-            vel_r_range = np.clip(
-                vel_r_range,
-                self.striker_settings.velocity_min,
-                self.striker_settings.velocity_max,
-            )
-
-            for az_r in az_r_range:
-                cur_az_r = fixed_params.get("azimuth_angle", az_r)
-                for el_r in el_r_range:
-                    cur_el_r = fixed_params.get("elevation_angle", el_r)
-                    for vel_r in vel_r_range:
-                        cur_vel_r = fixed_params.get("velocity", vel_r)
-                        land_x_r, land_z_r = self.ball_physics.get_landing_position(
-                            release_h, cur_vel_r, cur_el_r, cur_az_r, strike_h
-                        )
-                        error_r = math.sqrt(
-                            (land_x_r - target_x) ** 2 + (land_z_r - target_z) ** 2
-                        )
-                        if error_r < best_params["error"]:
-                            best_params.update(
-                                {
-                                    "error": error_r,
-                                    "azimuth_angle": cur_az_r,
-                                    "elevation_angle": cur_el_r,
-                                    "velocity": cur_vel_r,
-                                    "landing_x": land_x_r,
-                                    "landing_z": land_z_r,                                }
-                            )
+            # ปรับละเอียดด้วย Levenberg-Marquardt แทน grid 15x15x15 รอบจุดที่ดีที่สุด
+            with timed_stage("refine"):
+                for iteration, evaluations in self._iter_levenberg_marquardt(
+                    best_params, target_x, target_z, release_h, strike_h, fixed_params
+                ):
+                    yield self._search_event(
+                        "refine",
+                        best_params,
+                        iteration=iteration,
+                        evaluations=evaluations,
+                    )
 
             if best_params["error"] < tolerance:
                 required_voltage = self.striker_settings.convert_velocity_to_power(
                     best_params["velocity"]
                 )
                 best_params["required_voltage"] = required_voltage
+                self._round_best_elevation(
+                    best_params, target_x, target_z, release_h, strike_h
+                )
+                yield final((True, best_params))
+                return
 
-                # ปัดมุมเงยให้เป็นทวีคูณของ 5 องศาที่ใกล้ที่สุด
-                original_elevation = best_params["elevation_angle"]
-                rounded_elevation = round(original_elevation / 5) * 5
-                # ตรวจสอบว่าค่าที่ปัดแล้วยังอยู่ในช่วงที่อนุญาตหรือไม่
-                if rounded_elevation < self.striker_settings.angle_elevation_min:
-                    rounded_elevation = self.striker_settings.angle_elevation_min
-                elif rounded_elevation > self.striker_settings.angle_elevation_max:
-                    rounded_elevation = self.striker_settings.angle_elevation_max
-
-                # คำนวณใหม่ด้วยมุมเงยที่ปัดแล้ว
-                if rounded_elevation != original_elevation:
-                    land_x_rounded, land_z_rounded = self.ball_physics.get_landing_position(
-                        release_h, best_params["velocity"], rounded_elevation,
-                        best_params["azimuth_angle"], strike_h
-                    )
-                    best_params["elevation_angle"] = rounded_elevation
-                    best_params["landing_x"] = land_x_rounded
-                    best_params["landing_z"] = land_z_rounded
-                    best_params["error"] = math.sqrt(
-                        (land_x_rounded - target_x) ** 2 + (land_z_rounded - target_z) ** 2
-                    )
-
-                return True, best_params
-
-        return False, (
-            f"Could not find optimal parameters within {tolerance*100:.0f}cm. "
-            f"Best error: {best_params['error']:.2f}m. "
-            f"Params: Az:{best_params['azimuth_angle']:.1f}, El:{best_params['elevation_angle']:.1f}, Vel:{best_params['velocity']:.1f}"
+        yield final(
+            (
+                False,
+                f"Could not find optimal parameters within {tolerance*100:.0f}cm. "
+                f"Best error: {best_params['error']:.2f}m. "
+                f"Params: Az:{best_params['azimuth_angle']:.1f}, El:{best_params['elevation_angle']:.1f}, Vel:{best_params['velocity']:.1f}",
+            )
         )
 
     def find_multiple_optimal_solutions(
-        self, target_x, target_z, fixed_params=None, max_solutions=5
+        self,
+        target_x,
+        target_z,
+        fixed_params=None,
+        max_solutions=5,
+        progress_callback=None,
     ):
         """
         หาทางเลือกหลายๆ แบบสำหรับการตีไปยังเป้าหมายเดียวกัน
         Returns: (success, solutions_list or error_message)
+
+        progress_callback(progress) ถูกเรียกระหว่างคำนวณ grid ด้วย dict ที่มี
+        cells_done, cells_total, best_error และ partial_solutions (จุดบน grid
+        ที่ดีที่สุดจนถึงตอนนี้ มุมเงยยังไม่ถูกปัด)
         """
         if fixed_params is None:
             fixed_params = {}
@@ -940,69 +4198,45 @@ class Simulation:
         el_range = np.linspace(el_min_s, el_max_s, el_steps)
         vel_range = np.linspace(vel_min_s, vel_max_s, vel_steps)
 
-        # เก็บผลลัพธ์ทั้งหมดที่อยู่ใน tolerance
-        candidate_solutions = []
-
-        for az in az_range:
-            cur_az = fixed_params.get("azimuth_angle", az)
-            for el in el_range:
-                cur_el = fixed_params.get("elevation_angle", el)
-                for vel in vel_range:
-                    cur_vel = fixed_params.get("velocity", vel)
-                    land_x, land_z = self.ball_physics.get_landing_position(
-                        release_h, cur_vel, cur_el, cur_az, strike_h
-                    )
-                    error = math.sqrt(
-                        (land_x - target_x) ** 2 + (land_z - target_z) ** 2
+        on_chunk = None
+        if progress_callback is not None:
+            partial = []
+
+            def on_chunk(cells_done, cells_total, vels, els, azs, land_x, land_z):
+                errors = np.sqrt((land_x - target_x) ** 2 + (land_z - target_z) ** 2)
+                for i in np.argsort(errors)[:max_solutions]:
+                    partial.append(
+                        {
+                            "elevation_angle": float(els[i]),
+                            "azimuth_angle": float(azs[i]),
+                            "velocity": float(vels[i]),
+                            "error": float(errors[i]),
+                            "landing_x": float(land_x[i]),
+                            "landing_z": float(land_z[i]),
+                        }
                     )
+                partial.sort(key=lambda p: p["error"])
+                del partial[max_solutions:]
+                progress_callback(
+                    {
+                        "cells_done": int(cells_done),
+                        "cells_total": int(cells_total),
+                        "best_error": partial[0]["error"] if partial else None,
+                        "partial_solutions": list(partial),
+                    }
+                )
 
-                    if error < tolerance:
-                        required_voltage = (
-                            self.striker_settings.convert_velocity_to_power(cur_vel)
-                        )
+        # คำนวณจุดตกของทั้ง grid ครั้งเดียว แล้วใช้ซ้ำในรอบที่ขยาย tolerance
+        with timed_stage("coarse_grid"):
+            grid = self._evaluate_landing_grid(
+                release_h, strike_h, az_range, el_range, vel_range, on_chunk=on_chunk
+            )
 
-                        # ปัดมุมเงยให้เป็นทวีคูณของ 5 องศาที่ใกล้ที่สุด
-                        original_elevation = cur_el
-                        rounded_elevation = round(original_elevation / 5) * 5
-                        # ตรวจสอบว่าค่าที่ปัดแล้วยังอยู่ในช่วงที่อนุญาตหรือไม่
-                        if rounded_elevation < self.striker_settings.angle_elevation_min:
-                            rounded_elevation = self.striker_settings.angle_elevation_min
-                        elif rounded_elevation > self.striker_settings.angle_elevation_max:
-                            rounded_elevation = self.striker_settings.angle_elevation_max
-
-                        # คำนวณใหม่ด้วยมุมเงยที่ปัดแล้ว
-                        if rounded_elevation != original_elevation:
-                            land_x_rounded, land_z_rounded = self.ball_physics.get_landing_position(
-                                release_h, cur_vel, rounded_elevation, cur_az, strike_h
-                            )
-                            final_error = math.sqrt(
-                                (land_x_rounded - target_x) ** 2 + (land_z_rounded - target_z) ** 2
-                            )
-                            # ใช้ค่าที่ปัดแล้วถ้ายังอยู่ใน tolerance
-                            if final_error < tolerance:
-                                candidate_solutions.append(
-                                    {
-                                        "elevation_angle": rounded_elevation,
-                                        "azimuth_angle": cur_az,
-                                        "velocity": cur_vel,
-                                        "required_voltage": required_voltage,
-                                        "error": final_error,
-                                        "landing_x": land_x_rounded,
-                                        "landing_z": land_z_rounded,
-                                    }
-                                )
-                        else:
-                            candidate_solutions.append(
-                                {
-                                    "elevation_angle": rounded_elevation,
-                                    "azimuth_angle": cur_az,
-                                    "velocity": cur_vel,
-                                    "required_voltage": required_voltage,
-                                    "error": error,
-                                    "landing_x": land_x,
-                                    "landing_z": land_z,
-                                }
-                            )
+        # เก็บผลลัพธ์ทั้งหมดที่อยู่ใน tolerance
+        with timed_stage("candidates"):
+            candidate_solutions = self._collect_grid_candidates(
+                target_x, target_z, tolerance, release_h, strike_h, grid
+            )
 
         if not candidate_solutions:
             return False, "ไม่พบทางเลือกใดๆ ที่เหมาะสม โปรดปรับเป้าหมายหรือขยายช่วงการค้นหา"
@@ -1035,58 +4269,12 @@ class Simulation:
             # สร้าง tolerance ใหม่และหยุด recursion ถ้าไม่ได้ผล
             new_tolerance = min(tolerance * 1.5, 0.15)
             if new_tolerance > tolerance:  # ป้องกัน infinite recursion
-                # ค้นหาใหม่ด้วย tolerance ที่ขยายแล้ว โดยไม่ recursion
-                expanded_solutions = []
-                for az in az_range:
-                    cur_az = fixed_params.get("azimuth_angle", az)
-                    for el in el_range:
-                        cur_el = fixed_params.get("elevation_angle", el)
-                        for vel in vel_range:
-                            cur_vel = fixed_params.get("velocity", vel)
-                            land_x, land_z = self.ball_physics.get_landing_position(
-                                release_h, cur_vel, cur_el, cur_az, strike_h
-                            )
-                            error = math.sqrt(
-                                (land_x - target_x) ** 2 + (land_z - target_z) ** 2
-                            )
+                # ค้นหาใหม่ด้วย tolerance ที่ขยายแล้ว โดยใช้จุดตกจากรอบแรก
+                with timed_stage("expanded_tolerance"):
+                    expanded_solutions = self._collect_grid_candidates(
+                        target_x, target_z, new_tolerance, release_h, strike_h, grid
+                    )
 
-                            if error < new_tolerance:
-                                required_voltage = self.striker_settings.convert_velocity_to_power(cur_vel)
-                                original_elevation = cur_el
-                                rounded_elevation = round(original_elevation / 5) * 5
-                                if rounded_elevation < self.striker_settings.angle_elevation_min:
-                                    rounded_elevation = self.striker_settings.angle_elevation_min
-                                elif rounded_elevation > self.striker_settings.angle_elevation_max:
-                                    rounded_elevation = self.striker_settings.angle_elevation_max
-                                
-                                if rounded_elevation != original_elevation:
-                                    land_x_rounded, land_z_rounded = self.ball_physics.get_landing_position(
-                                        release_h, cur_vel, rounded_elevation, cur_az, strike_h
-                                    )
-                                    final_error = math.sqrt(
-                                        (land_x_rounded - target_x) ** 2 + (land_z_rounded - target_z) ** 2
-                                    )
-                                    if final_error < new_tolerance:
-                                        expanded_solutions.append({
-                                            "elevation_angle": rounded_elevation,
-                                            "azimuth_angle": cur_az,
-                                            "velocity": cur_vel,
-                                            "required_voltage": required_voltage,
-                                            "error": final_error,
-                                            "landing_x": land_x_rounded,
-                                            "landing_z": land_z_rounded,
-                                        })
-                                else:
-                                    expanded_solutions.append({
-                                        "elevation_angle": rounded_elevation,
-                                        "azimuth_angle": cur_az,
-                                        "velocity": cur_vel,
-                                        "required_voltage": required_voltage,
-                                        "error": error,
-                                        "landing_x": land_x,
-                                        "landing_z": land_z,
-                                    })
-                
                 # เรียงและเลือกทางเลือกจาก expanded_solutions
                 expanded_solutions.sort(key=lambda x: x["error"])
                 for candidate in expanded_solutions:
@@ -1105,6 +4293,295 @@ class Simulation:
 
         return True, solutions
 
+    def _monte_carlo_strike_heights(self, shot, timing_errors):
+        """Strike heights when the striker fires timing_errors seconds late.
+
+        The ball falls freely from release_height; firing late means it has
+        dropped further (clipped at the floor).
+        """
+        gravity = self.ball_physics.gravity
+        fall_time = math.sqrt(
+            max(0.0, 2.0 * (shot.release_height - shot.strike_height) / gravity)
+        )
+        strike_times = np.maximum(fall_time + timing_errors, 0.0)
+        return np.maximum(
+            shot.release_height - 0.5 * gravity * strike_times**2, 0.0
+        )
+
+    @staticmethod
+    def _dispersion_ellipse(land_x, land_z, confidence):
+        """Covariance ellipse of the landing points containing `confidence` of them.
+
+        Assumes a 2-D normal spread; the semi-axes are sqrt(chi2 * eigenvalue)
+        with chi2 = -2 ln(1 - confidence), the 2 degree-of-freedom quantile.
+        """
+        covariance = np.cov(np.vstack([land_x, land_z]))
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        scale = -2.0 * math.log(1.0 - confidence)
+        major_x, major_z = eigenvectors[:, 1]
+        return {
+            "center_x": float(land_x.mean()),
+            "center_z": float(land_z.mean()),
+            "std_x": float(math.sqrt(covariance[0, 0])),
+            "std_z": float(math.sqrt(covariance[1, 1])),
+            "covariance_xz": float(covariance[0, 1]),
+            "semi_major": float(math.sqrt(scale * max(eigenvalues[1], 0.0))),
+            "semi_minor": float(math.sqrt(scale * max(eigenvalues[0], 0.0))),
+            # ทิศของแกนยาว วัดแบบเดียวกับมุม azimuth (จากแกน +z ไปทาง +x), อยู่ในช่วง (-90, 90]
+            "azimuth_deg": float(
+                (math.degrees(math.atan2(major_x, major_z)) + 90.0) % 180.0 - 90.0
+            ),
+            "confidence": confidence,
+        }
+
+    def _jittered_landings(
+        self, shot, noise_model, deviates, velocities, elevations, azimuths
+    ):
+        """Landing points of nominal shots under the jitter in deviates.
+
+        deviates is a (4, n_samples) block of standard normals for voltage,
+        elevation, azimuth and timing. Every nominal (velocity, elevation,
+        azimuth) reuses the same block (common random numbers), so
+        differences between them come from the shots and not from the
+        draws. Nominal values of shape S give landings of shape
+        S + (n_samples,), from one calculate_landing_batch call.
+        """
+        voltage_noise, elevation_noise, azimuth_noise, timing_noise = deviates
+        volts_per_velocity = self.striker_settings.convert_velocity_to_power(1.0)
+        velocities = np.asarray(velocities, dtype=float)[..., np.newaxis]
+        voltages = (
+            velocities * volts_per_velocity + noise_model.voltage_std * voltage_noise
+        )
+        land_x, land_z, _ = self.ball_physics.calculate_landing_batch(
+            shot.release_height,
+            np.maximum(voltages / volts_per_velocity, 0.0),
+            np.asarray(elevations, dtype=float)[..., np.newaxis]
+            + noise_model.elevation_std * elevation_noise,
+            np.asarray(azimuths, dtype=float)[..., np.newaxis]
+            + noise_model.azimuth_std * azimuth_noise,
+            self._monte_carlo_strike_heights(
+                shot, noise_model.timing_std * timing_noise
+            ),
+        )
+        return land_x, land_z
+
+    def monte_carlo(self, shot, noise_model, n_samples, seed=0, confidence=0.95):
+        """Hit probabilities of shot under striker jitter.
+
+        Draws n_samples perturbed shots from noise_model with a seeded RNG
+        (the same seed gives the same result), lands them all in one
+        calculate_landing_batch call and classifies them with
+        TargetArea.get_zones_for_positions. Returns (True, result) with
+        per-zone probabilities and the dispersion ellipse, or (False, error
+        message).
+        """
+        n_samples = int(n_samples)
+        if n_samples < 2:
+            return False, "n_samples must be at least 2"
+
+        deviates = np.random.default_rng(seed).standard_normal((4, n_samples))
+        land_x, land_z = self._jittered_landings(
+            shot,
+            noise_model,
+            deviates,
+            shot.strike_velocity,
+            shot.strike_angle_elevation,
+            shot.strike_azimuth_angle,
+        )
+        zone_ids = self.target_area.get_zones_for_positions(land_x, land_z)
+        zones = self.target_area.zones
+        # ช่องแรกของ bincount คือจำนวนที่ไม่ตกในโซนใดเลย (zone id -1)
+        hits = np.bincount(zone_ids + 1, minlength=len(zones) + 1)
+
+        return True, {
+            "n_samples": n_samples,
+            "seed": seed,
+            "zones": [
+                {
+                    "zone_index": i,
+                    "id": zone.id,
+                    "hits": int(hits[i + 1]),
+                    "probability": float(hits[i + 1] / n_samples),
+                }
+                for i, zone in enumerate(zones)
+            ],
+            "miss_probability": float(hits[0] / n_samples),
+            "ellipse": self._dispersion_ellipse(land_x, land_z, confidence),
+        }
+
+    def _hit_probabilities(self, shot, noise_model, deviates, zone_index, candidates):
+        """Monte Carlo hit probability of each candidate (velocity, elevation, azimuth) row."""
+        land_x, land_z = self._jittered_landings(
+            shot, noise_model, deviates, *candidates.T
+        )
+        hits = self.target_area.get_zones_for_positions(land_x, land_z) == zone_index
+        return hits.mean(axis=-1)
+
+    def optimize_hit_probability(
+        self, zone_id, noise_model, n_samples=2000, fixed_params=None, seed=0
+    ):
+        """Legal shot with the highest Monte Carlo hit probability for a zone.
+
+        Unlike calculate_optimal_parameters this does not aim at a point.
+        1. Land a grid of nominal shots: 5 deg elevation steps,
+           HIT_SEARCH_AZIMUTH_STEP azimuth, HIT_SEARCH_VOLTAGE_STEP voltage.
+        2. Per elevation, keep the HIT_SEARCH_PER_ELEVATION shots landing
+           deepest inside the zone.
+        3. Score those with HIT_SEARCH_SCREEN_SAMPLES jittered samples.
+        4. Rescore the HIT_SEARCH_FINALISTS best with n_samples.
+        5. Pattern-search azimuth and voltage around the winner for
+           HIT_SEARCH_REFINE_ROUNDS rounds, halving the step when no
+           neighbour is better. Elevation stays on its 5 deg step.
+        Every Monte Carlo round uses the same common random numbers from
+        seed.
+        Returns (True, result) or (False, error message).
+        """
+        fixed_params = fixed_params or {}
+        zone_index = next(
+            (i for i, zone in enumerate(self.target_area.zones) if zone.id == zone_id),
+            None,
+        )
+        if zone_index is None:
+            return False, f"Unknown zone id: {zone_id}"
+        zone = self.target_area.zones[zone_index]
+        n_samples = int(n_samples)
+        if n_samples < 2:
+            return False, "n_samples must be at least 2"
+
+        settings = self.striker_settings
+        shot = ShotConfig(
+            release_height=settings.release_height, strike_height=settings.strike_height
+        )
+        el_range = (
+            np.array([fixed_params["elevation_angle"]], dtype=float)
+            if "elevation_angle" in fixed_params
+            else np.arange(
+                settings.angle_elevation_min, settings.angle_elevation_max + 1e-9, 5.0
+            )
+        )
+        az_range = (
+            np.array([fixed_params["azimuth_angle"]], dtype=float)
+            if "azimuth_angle" in fixed_params
+            # เริ่มกริดที่ทวีคูณของขั้น เพื่อให้มี azimuth 0 อยู่ในกริดเสมอ
+            else np.arange(
+                math.ceil(settings.azimuth_angle_min / self.HIT_SEARCH_AZIMUTH_STEP)
+                * self.HIT_SEARCH_AZIMUTH_STEP,
+                settings.azimuth_angle_max + 1e-9,
+                self.HIT_SEARCH_AZIMUTH_STEP,
+            )
+        )
+        if "velocity" in fixed_params:
+            vel_range = np.array([fixed_params["velocity"]], dtype=float)
+        else:
+            voltages = np.arange(
+                settings.convert_velocity_to_power(settings.velocity_min),
+                settings.convert_velocity_to_power(settings.velocity_max) + 1e-9,
+                self.HIT_SEARCH_VOLTAGE_STEP,
+            )
+            vel_range = voltages / settings.convert_velocity_to_power(1.0)
+
+        el_grid, az_grid, vel_grid = np.meshgrid(
+            el_range, az_range, vel_range, indexing="ij"
+        )
+        land_x, land_z, _ = self.ball_physics.calculate_landing_batch(
+            shot.release_height, vel_grid, el_grid, az_grid, shot.strike_height
+        )
+        # นับเฉพาะจุดที่ถูกจัดเข้าโซนนี้จริง (โซนที่อยู่ก่อนในรายการอาจทับอยู่)
+        margins = np.where(
+            self.target_area.get_zones_for_positions(land_x, land_z) == zone_index,
+            zone.inner_margin(land_x, land_z),
+            -np.inf,
+        ).reshape(len(el_range), -1)
+        # index ของช็อตที่ลึกในโซนที่สุดในแต่ละมุมเงย (เฉพาะที่ตกในโซนจริง), เสมอกันเลือก |azimuth| น้อย
+        order = np.lexsort(
+            (np.abs(az_grid).reshape(margins.shape), -np.round(margins, 3)), axis=-1
+        )[:, : self.HIT_SEARCH_PER_ELEVATION]
+        rows = np.repeat(np.arange(len(el_range)), order.shape[1])
+        flat = np.ravel_multi_index((rows, order.ravel()), margins.shape)
+        flat = flat[margins.ravel()[flat] > 0]
+        if flat.size == 0:
+            return False, f"No legal shot lands in zone {zone_id}"
+        candidates = np.column_stack(
+            [vel_grid.ravel()[flat], el_grid.ravel()[flat], az_grid.ravel()[flat]]
+        )
+        candidate_margins = margins.ravel()[flat]
+
+        deviates = np.random.default_rng(seed).standard_normal((4, n_samples))
+        screen = self._hit_probabilities(
+            shot,
+            noise_model,
+            deviates[:, : self.HIT_SEARCH_SCREEN_SAMPLES],
+            zone_index,
+            candidates,
+        )
+        # เรียงตามความน่าจะเป็น เสมอกันใช้ระยะห่างจากขอบโซน (ละเอียดระดับ mm) แล้วจึง |azimuth| ที่น้อยกว่า
+        tie_breaks = (np.abs(candidates[:, 2]), -np.round(candidate_margins, 3))
+        finalists = np.lexsort((*tie_breaks, -screen))[: self.HIT_SEARCH_FINALISTS]
+        probabilities = self._hit_probabilities(
+            shot, noise_model, deviates, zone_index, candidates[finalists]
+        )
+        winner = np.lexsort(
+            (*(key[finalists] for key in tie_breaks), -probabilities)
+        )[0]
+        point = candidates[finalists[winner]]
+        probability = float(probabilities[winner])
+
+        steps = np.array(
+            [
+                0.0
+                if "velocity" in fixed_params
+                else 0.5
+                * self.HIT_SEARCH_VOLTAGE_STEP
+                / settings.convert_velocity_to_power(1.0),
+                0.0,
+                0.0
+                if "azimuth_angle" in fixed_params
+                else 0.5 * self.HIT_SEARCH_AZIMUTH_STEP,
+            ]
+        )
+        lower = np.array(
+            [settings.velocity_min, point[1], settings.azimuth_angle_min]
+        )
+        upper = np.array(
+            [settings.velocity_max, point[1], settings.azimuth_angle_max]
+        )
+        for _ in range(self.HIT_SEARCH_REFINE_ROUNDS):
+            if not steps.any():
+                break
+            moves = np.diag(steps)[steps > 0]
+            neighbours = np.clip(point + np.vstack([moves, -moves]), lower, upper)
+            neighbour_probabilities = self._hit_probabilities(
+                shot, noise_model, deviates, zone_index, neighbours
+            )
+            if neighbour_probabilities.max() > probability:
+                point = neighbours[neighbour_probabilities.argmax()]
+                probability = float(neighbour_probabilities.max())
+            else:
+                steps = steps / 2.0
+
+        velocity, elevation, azimuth = point.tolist()
+        nominal_x, nominal_z = self.ball_physics.get_landing_position(
+            shot.release_height, velocity, elevation, azimuth, shot.strike_height
+        )
+        return True, {
+            "zone_id": zone_id,
+            "elevation_angle": elevation,
+            "azimuth_angle": azimuth,
+            "velocity": velocity,
+            "required_voltage": settings.convert_velocity_to_power(velocity),
+            "hit_probability": probability,
+            # ส่วนเบี่ยงเบนมาตรฐานของค่าประมาณ (binomial)
+            "hit_probability_stderr": math.sqrt(
+                probability * (1.0 - probability) / n_samples
+            ),
+            "landing_x": nominal_x,
+            "landing_z": nominal_z,
+            "zone_margin": float(zone.inner_margin(nominal_x, nominal_z)),
+            "n_samples": n_samples,
+            "candidates_screened": int(len(candidates)),
+            "solver": "hit_probability",
+        }
+
     def save_settings(self, filename):
         settings_data = {
             "striker_settings": self.striker_settings.get_settings(),
@@ -1156,13 +4633,191 @@ class Simulation:
             return False, f"Error loading settings: {str(e)}"
 
 
+def simulate_shot(shot, physics, target_area, show_ideal=False):
+    """Simulate one shot without touching any shared state.
+
+    Returns (True, result dict) or (False, error message).
+    """
+    sim = Simulation.from_configs(shot, physics, target_area)
+    sim.toggle_ideal_comparison(show_ideal)
+    success, message = sim.start_simulation()
+    if not success:
+        return False, message
+    result = {
+        "landing_position": sim.landing_position,
+        "landing_distance_radial": sim.landing_distance_radial,
+        "trajectory_x": sim.trajectory_x,
+        "trajectory_y": sim.trajectory_y,
+        "trajectory_z": sim.trajectory_z,
+        "target_zone": sim.target_zone,
+        "strike_time": sim.strike_time,
+        "first_contact_position": sim.first_contact_position,
+        "rest_position": sim.rest_position,
+        "bounce_count": sim.bounce_count,
+        "message": message,
+    }
+    if show_ideal:
+        result.update(
+            {
+                "ideal_trajectory_x": sim.ideal_trajectory_x,
+                "ideal_trajectory_y": sim.ideal_trajectory_y,
+                "ideal_trajectory_z": sim.ideal_trajectory_z,
+                "ideal_landing_position": sim.ideal_landing_position,
+            }
+        )
+    return True, result
+
+
+def landing_sensitivity(shot, physics):
+    """Landing point of shot and its Jacobian from the sensitivity equations.
+
+    Returns (landing_x, landing_z, jacobian) where jacobian rows are x and z
+    and columns are (velocity, elevation, azimuth), angles in degrees.
+    """
+    ball_physics = physics.make_ball_physics()
+    landing_x, landing_z, _, jacobian = ball_physics.calculate_landing(
+        shot.release_height,
+        shot.strike_velocity,
+        shot.strike_angle_elevation,
+        shot.strike_azimuth_angle,
+        shot.strike_height,
+        with_sensitivities=True,
+    )
+    return landing_x, landing_z, jacobian
+
+
+# พารามิเตอร์ที่ landing_sweep กวาดได้ (ชื่อฟิลด์ของ ShotConfig / PhysicsConfig)
+SWEEP_PARAMETERS = (
+    "strike_velocity",
+    "strike_angle_elevation",
+    "strike_azimuth_angle",
+    "release_height",
+    "strike_height",
+    "drag_coefficient",
+)
+
+
+def landing_sweep(shot, physics, axes):
+    """Landing map of shot with some of its parameters swept over a grid.
+
+    axes maps names from SWEEP_PARAMETERS to 1-D value arrays: one axis is a
+    line sweep, two give a heatmap, more a full grid. Other parameters keep
+    their value from shot / physics. Every cell goes through one
+    calculate_landing_batch call. Returns (landing_x, landing_z,
+    flight_time), each shaped (len(values) for values in axes.values()).
+    """
+    unknown = [name for name in axes if name not in SWEEP_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter: {', '.join(unknown)}")
+
+    values = [np.asarray(axis_values, dtype=float) for axis_values in axes.values()]
+    shape = tuple(axis_values.size for axis_values in values)
+    grids = dict(zip(axes, np.meshgrid(*values, indexing="ij", sparse=True)))
+    ball_physics = physics.make_ball_physics()
+    landing = ball_physics.calculate_landing_batch(
+        shot.release_height,
+        grids.get("strike_velocity", shot.strike_velocity),
+        grids.get("strike_angle_elevation", shot.strike_angle_elevation),
+        grids.get("strike_azimuth_angle", shot.strike_azimuth_angle),
+        grids.get("strike_height", shot.strike_height),
+        drag_coefficients=grids.get("drag_coefficient"),
+    )
+    # จุดตกไม่ขึ้นกับ release_height (ลูกถูกตีที่ strike_height เสมอ) จึงขยายให้ครบทุกแกน
+    return tuple(np.broadcast_to(result, shape) for result in landing)
+
+
+def monte_carlo_shot(shot, physics, target_area, noise_model, n_samples, seed=0):
+    """Request-scoped Simulation.monte_carlo."""
+    sim = Simulation.from_configs(shot, physics, target_area)
+    return sim.monte_carlo(shot, noise_model, n_samples, seed=seed)
+
+
+def optimize_zone_shot(
+    zone_id,
+    shot,
+    physics,
+    target_area,
+    noise_model,
+    fixed_params=None,
+    n_samples=2000,
+    seed=0,
+):
+    """Request-scoped Simulation.optimize_hit_probability."""
+    sim = Simulation.from_configs(shot, physics, target_area)
+    return sim.optimize_hit_probability(
+        zone_id, noise_model, n_samples=n_samples, fixed_params=fixed_params, seed=seed
+    )
+
+
+def optimize_shot(
+    target_x,
+    target_z,
+    shot,
+    physics,
+    fixed_params=None,
+    solver="table",
+    grid_executor=None,
+    grid_workers=1,
+):
+    """Request-scoped Simulation.calculate_optimal_parameters."""
+    sim = Simulation.from_configs(
+        shot, physics, grid_executor=grid_executor, grid_workers=grid_workers
+    )
+    return sim.calculate_optimal_parameters(
+        target_x, target_z, fixed_params=fixed_params, solver=solver
+    )
+
+
+def iter_optimize_shot(
+    target_x,
+    target_z,
+    shot,
+    physics,
+    fixed_params=None,
+    solver="grid",
+    grid_executor=None,
+    grid_workers=1,
+):
+    """Request-scoped Simulation.iter_optimal_parameters."""
+    sim = Simulation.from_configs(
+        shot, physics, grid_executor=grid_executor, grid_workers=grid_workers
+    )
+    return sim.iter_optimal_parameters(
+        target_x, target_z, fixed_params=fixed_params, solver=solver
+    )
+
+
+def find_shot_options(
+    target_x,
+    target_z,
+    shot,
+    physics,
+    fixed_params=None,
+    max_solutions=5,
+    grid_executor=None,
+    grid_workers=1,
+    progress_callback=None,
+):
+    """Request-scoped Simulation.find_multiple_optimal_solutions."""
+    sim = Simulation.from_configs(
+        shot, physics, grid_executor=grid_executor, grid_workers=grid_workers
+    )
+    return sim.find_multiple_optimal_solutions(
+        target_x,
+        target_z,
+        fixed_params=fixed_params,
+        max_solutions=max_solutions,
+        progress_callback=progress_callback,
+    )
+
+
 def main():
     sim = Simulation()
     sim.target_area.load_field_configuration("extra2")
     print(f"Field: {sim.target_area.field_type}, Zones: {len(sim.target_area.zones)}")
     for zone in sim.target_area.zones:
         print(
-            f"  {zone.get('id')}: Target Point ({zone.get('target_point',{}).get('x',0):.2f}, {zone.get('target_point',{}).get('z',0):.2f})"
+            f"  {zone.id}: Target Point ({zone.target_x:.2f}, {zone.target_z:.2f})"
         )
 
     sim.striker_settings.strike_angle_elevation = 30
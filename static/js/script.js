@@ -4,7 +4,10 @@ let trajectoryChartTopView = null;
 let fieldChart2D = null;
 
 let currentRawZonesData = [];
+let currentZonesEtag = null; // zones_etag ของ currentRawZonesData (ส่งกลับไปเพื่อไม่ต้องรับโซนซ้ำ)
 let currentFieldType = "standard";
+// trajectory จาก /api/calculate: float32 แบบ base64 และลดจำนวนจุดที่ฝั่งเซิร์ฟเวอร์
+const TRAJECTORY_MAX_POINTS = 400;
 let fieldInfoExpanded = false;
 
 const zoneColors = [
@@ -472,6 +475,7 @@ function fetchFieldInfo() {
       }
       if (data.zones_data && Array.isArray(data.zones_data)) {
         currentRawZonesData = data.zones_data;
+        currentZonesEtag = data.zones_etag || null;
         console.log(
           "CurrentRawZonesData SET in fetchFieldInfo:",
           JSON.parse(JSON.stringify(currentRawZonesData))
@@ -548,6 +552,7 @@ function handleFieldTypeChange() {
       console.log("Response from change_field:", data);
       if (data.zones_data && Array.isArray(data.zones_data)) {
         currentRawZonesData = data.zones_data;
+        currentZonesEtag = data.zones_etag || null;
         console.log(
           "CurrentRawZonesData SET in handleFieldTypeChange:",
           JSON.parse(JSON.stringify(currentRawZonesData))
@@ -622,6 +627,9 @@ function startSimulation() {
       drag_coefficient: getPhysicsSetting("drag-coefficient", 0.67),
       elasticity: getPhysicsSetting("elasticity", 0.4),
     },
+    trajectory_format: "float32",
+    max_points: TRAJECTORY_MAX_POINTS,
+    zones_etag: currentZonesEtag,
   };
   addDebugInfo("request", payload);
   setButtonDisabled("start-btn", true);
@@ -667,6 +675,56 @@ function startSimulation() {
     });
 }
 
+// แสดงจุดตกที่ดีที่สุดจนถึงตอนนี้บนกราฟมุมบน ระหว่างที่งาน optimize ยังค้นหาอยู่
+function drawOptimizeCandidate(landingX, landingZ) {
+  if (!trajectoryChartTopView) return;
+  trajectoryChartTopView.data.datasets[3].data = [{ x: landingX, y: landingZ }];
+  trajectoryChartTopView.update("none");
+}
+
+// poll งาน optimize จนเสร็จ แล้วคืนผลลัพธ์รูปแบบเดียวกับ /api/optimize_multiple
+// onProgress(progress) ถูกเรียกทุกครั้งที่งานรายงานความคืบหน้า
+function pollOptimizeJob(statusUrl, onProgress = null, intervalMs = 200) {
+  return new Promise((resolve, reject) => {
+    const poll = () => {
+      fetch(statusUrl)
+        .then((response) =>
+          response.json().then((job) => ({ ok: response.ok, job }))
+        )
+        .then(({ ok, job }) => {
+          if (!ok) {
+            throw new Error(job.error || "ไม่พบงานที่ระบุ");
+          }
+          if (job.status === "done") {
+            resolve(job.result);
+            return;
+          }
+          if (job.status === "failed") {
+            resolve({ error: job.error });
+            return;
+          }
+          if (job.progress) {
+            const percent = Math.round(
+              (job.progress.cells_done / job.progress.cells_total) * 100
+            );
+            const bestError =
+              job.progress.best_error !== null
+                ? `, คลาดเคลื่อนดีที่สุด ${job.progress.best_error.toFixed(3)} m`
+                : "";
+            showCustomMessage(
+              `กำลังหาค่าที่เหมาะสม... ${percent}%${bestError}`,
+              "info"
+            );
+            if (onProgress) onProgress(job.progress);
+          }
+          setTimeout(poll, intervalMs);
+        })
+        .catch(reject);
+    };
+    poll();
+  });
+}
+
 function optimizeSettings() {
   // อ่านค่า Physics จาก localStorage หรือใช้ค่า default (เหมือนใน startSimulation)
   const getPhysicsSetting = (id, defaultValue) => {
@@ -707,7 +765,10 @@ function optimizeSettings() {
   // เพิ่ม max_solutions parameter สำหรับทางเลือกหลายแบบ
   payload.max_solutions = 5;
 
-  fetch("/api/optimize_multiple", {
+  // ส่งเป็นงานเบื้องหลังแล้ว poll สถานะ เพื่อไม่ให้ request ค้างระหว่างค้นหา
+  // จุดตกที่ดีที่สุดระหว่างค้นหามาจาก partial_solutions ของงานเดียวกันนี้
+  // จึงค้นหาเพียงครั้งเดียว และจุดที่แสดงมาจากการค้นหาเดียวกับผลที่นำไปใช้
+  fetch("/api/jobs/optimize_multiple", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(payload),
@@ -722,6 +783,12 @@ function optimizeSettings() {
       }
       return response.json();
     })
+    .then((job) =>
+      pollOptimizeJob(job.status_url, (progress) => {
+        const best = (progress.partial_solutions || [])[0];
+        if (best) drawOptimizeCandidate(best.landing_x, best.landing_z);
+      })
+    )
     .then((result) => {
       addDebugInfo("response", result);
       if (result.error) {
@@ -738,6 +805,10 @@ function optimizeSettings() {
 
         // ใช้ทางเลือกแรก (ที่ดีที่สุด) สำหรับการอัปเดตค่าหลัก
         const bestSolution = result.solutions[0];
+        drawOptimizeCandidate(
+          bestSolution.actual_landing_x,
+          bestSolution.actual_landing_z
+        );
 
         if (
           !payload.fixed_params.elevation_angle &&
@@ -971,6 +1042,11 @@ function applySolution(solutionIndex) {
 }
 
 function updateSimulationResultsUI(result) {
+  // โซนถูกส่งมาเฉพาะเมื่อ zones_etag ไม่ตรงกับที่มีอยู่
+  if (Array.isArray(result.target_zones_data)) {
+    currentRawZonesData = result.target_zones_data;
+    currentZonesEtag = result.zones_etag || null;
+  }
   document.getElementById("landing-position-x").textContent =
     result.landing_position_x.toFixed(3) + " m";
   document.getElementById("landing-position-z").textContent =
@@ -999,9 +1075,9 @@ function updateSimulationResultsUI(result) {
   }
 
   updateTrajectoryCharts(
-    result.trajectory_x,
-    result.trajectory_y,
-    result.trajectory_z,
+    decodeTrajectory(result.trajectory_x),
+    decodeTrajectory(result.trajectory_y),
+    decodeTrajectory(result.trajectory_z),
     result.target_zones_data
   );
 
@@ -1013,9 +1089,9 @@ function updateSimulationResultsUI(result) {
       result.ideal_landing_position_z.toFixed(3) + " m";
     idealGroup.style.display = "grid";
     updateIdealTrajectoryCharts(
-      result.ideal_trajectory_x,
-      result.ideal_trajectory_y,
-      result.ideal_trajectory_z
+      decodeTrajectory(result.ideal_trajectory_x),
+      decodeTrajectory(result.ideal_trajectory_y),
+      decodeTrajectory(result.ideal_trajectory_z)
     );
   } else if (idealGroup) {
     idealGroup.style.display = "none";
@@ -1143,12 +1219,19 @@ function validateNumericInputAgainstRange(inputElement) {
   }
 }
 
+// trajectory แบบ "float32" มาเป็น base64 ของ float32 little-endian; แบบ "json" เป็น array อยู่แล้ว
+function decodeTrajectory(values) {
+  if (typeof values !== "string") return values;
+  const bytes = Uint8Array.from(atob(values), (c) => c.charCodeAt(0));
+  return new Float32Array(bytes.buffer);
+}
+
 function updateTrajectoryCharts(trajX, trajY, trajZ, zonesDataFromCalc) {
   if (!trajX || !trajY || !trajZ) return;
   const activeZones = zonesDataFromCalc || currentRawZonesData;
 
   if (trajectoryChartSideView) {
-    const sideViewData = trajZ.map((z, i) => ({ x: z, y: trajY[i] }));
+    const sideViewData = Array.from(trajZ, (z, i) => ({ x: z, y: trajY[i] }));
     trajectoryChartSideView.data.datasets[0].data = sideViewData;
     if (sideViewData.length > 0) {
       const landingPoint = sideViewData[sideViewData.length - 1];
@@ -1163,7 +1246,7 @@ function updateTrajectoryCharts(trajX, trajY, trajZ, zonesDataFromCalc) {
   }
 
   if (trajectoryChartTopView) {
-    const topViewData = trajX.map((x, i) => ({ x: x, y: trajZ[i] }));
+    const topViewData = Array.from(trajX, (x, i) => ({ x: x, y: trajZ[i] }));
     trajectoryChartTopView.data.datasets[0].data = topViewData;
     if (topViewData.length > 0) {
       const landingPoint = topViewData[topViewData.length - 1];
@@ -1182,13 +1265,13 @@ function updateIdealTrajectoryCharts(idealX, idealY, idealZ) {
   if (!idealX || !idealY || !idealZ) return;
 
   if (trajectoryChartSideView && trajectoryChartSideView.data.datasets[1]) {
-    const idealSideData = idealZ.map((z, i) => ({ x: z, y: idealY[i] }));
+    const idealSideData = Array.from(idealZ, (z, i) => ({ x: z, y: idealY[i] }));
     trajectoryChartSideView.data.datasets[1].data = idealSideData;
     trajectoryChartSideView.data.datasets[1].hidden = false;
     trajectoryChartSideView.update();
   }
   if (trajectoryChartTopView && trajectoryChartTopView.data.datasets[1]) {
-    const idealTopData = idealX.map((x, i) => ({ x: x, y: idealZ[i] }));
+    const idealTopData = Array.from(idealX, (x, i) => ({ x: x, y: idealZ[i] }));
     trajectoryChartTopView.data.datasets[1].data = idealTopData;
     trajectoryChartTopView.data.datasets[1].hidden = false;
     trajectoryChartTopView.update();
@@ -1703,6 +1786,15 @@ function setupTrajectoryChartTopView() {
           pointStyle: "crossRot",
           showLine: false,
         },
+        {
+          label: "จุดตกระหว่างค้นหา (X-Z)",
+          data: [],
+          backgroundColor: "#e91e63",
+          borderColor: "#e91e63",
+          pointRadius: 6,
+          pointStyle: "circle",
+          showLine: false,
+        },
       ],
     },
     options: {